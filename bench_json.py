@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark: record page serialisation
+Compares the old response path (to_dict records, FastAPI's
+jsonable_encoder + stdlib json), to_dict with orjson, and the columnar
+records_json encoder, and checks they produce the same records.
+
+Usage: python bench_json.py [rows ...]   (default: 5000 100000)
+"""
+
+import json
+import sys
+import time
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from mandi_fixtures import sample_goi_records
+from mandi_ingest import compact_goi_frame, display_frame
+from mandi_json import dumps, encode_payload, orjson, records_json
+
+REPEATS = 3
+
+
+def best_time(fn):
+    best, result = None, None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [5000, 100000]
+    print(f"Fast encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}\n")
+    print(f"{'Rows':>8}  {'Method':<42} {'Time (ms)':>10} {'MB':>7} {'Speedup':>8}")
+    print('-' * 80)
+
+    for rows in sizes:
+        df, _ = compact_goi_frame(pd.DataFrame(sample_goi_records(rows)))
+        methods = [
+            ("to_dict + jsonable_encoder + json (old)", lambda: json.dumps(
+                jsonable_encoder({'data': display_frame(df).to_dict(orient='records')}),
+                ensure_ascii=False, separators=(",", ":")).encode('utf-8')),
+            ("to_dict + dumps", lambda: dumps({'data': display_frame(df).to_dict(orient='records')})),
+            ("records_json (columnar)", lambda: encode_payload({'data': records_json(df)})),
+        ]
+        baseline, expected = None, None
+        for name, fn in methods:
+            seconds, body = best_time(fn)
+            decoded = json.loads(body)
+            assert expected is None or decoded == expected, f"{name} output differs"
+            expected = decoded
+            baseline = baseline or seconds
+            print(f"{rows:>8}  {name:<42} {seconds * 1000:>10.1f} {len(body) / 1e6:>7.2f} {baseline / seconds:>7.1f}x")
+        print()
+
+    print("✅ All methods produced identical records")
+
+
+if __name__ == "__main__":
+    main()
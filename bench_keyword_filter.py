@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark: keyword_filter row scan vs prebuilt KeywordIndex
+Checks both paths return identical rows, then times each query
+
+Usage: python bench_keyword_filter.py [rows]
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+from mandi_fixtures import sample_goi_records
+from mandi_index import KeywordIndex, tokenize_query
+from mandi_app_service import keyword_filter_scan
+
+QUERIES = ['Paddy', 'Telangana,Paddy', 'Karimnagar,Paddy,Cotton', 'apmc', 'a', 'tomato hybrid', 'zzz']
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    df = pd.DataFrame(sample_goi_records(rows))
+
+    build_time, index = timed(lambda: KeywordIndex(df), repeat=3)
+    print(f"Rows: {rows} | index build: {build_time * 1000:.1f} ms | tokens: {len(index.vocab)}\n")
+    print(f"{'Query':<28} {'Matches':>8} {'Scan (ms)':>10} {'Index (ms)':>11} {'Speedup':>8}")
+    print('-' * 70)
+
+    for query in QUERIES:
+        keywords = tokenize_query(query)
+        scan_time, expected = timed(lambda: keyword_filter_scan(df, keywords), repeat=3)
+        index_time, actual = timed(lambda: df[index.mask(keywords)])
+        assert expected.equals(actual), f"Result mismatch for {query!r}"
+        print(f"{query:<28} {len(actual):>8} {scan_time * 1000:>10.2f} {index_time * 1000:>11.3f} "
+              f"{scan_time / index_time:>7.0f}x")
+
+    print('\n✅ Indexed results identical to row scan for all queries')
+
+
+if __name__ == "__main__":
+    main()
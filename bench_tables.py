@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: mandi table parsing throughput (rows/second)
+The old BeautifulSoup find_all('tr') / get_text loop against the shared
+extractor in mandi_tables (stdlib tokenizer, plus lxml when installed),
+over the saved-HTML fixture corpus and a large synthetic price page.
+
+Usage: python bench_tables.py [rows]   (default: 10000 rows in the large page)
+"""
+
+import html as html_lib
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from mandi_fixtures import HTML_FIXTURE_DIR, sample_goi_records
+from mandi_tables import COMMODITYMARKETLIVE_SCHEMA, COMMODITYONLINE_SCHEMA, lxml
+
+REPEATS = 3
+
+
+def bs4_records(html, schema):
+    """The per-scraper BeautifulSoup loops, generalised over a schema"""
+    soup = BeautifulSoup(html, 'html.parser')
+    tables = soup.find_all('table')
+    records = []
+    for table in tables[:1] if schema.first_table_only else tables:
+        for row in table.find_all('tr')[schema.header_rows:]:
+            cols = [c.get_text(strip=True) for c in row.find_all('td')]
+            if len(cols) >= schema.min_cells and all(cols[i] for i in schema.required):
+                records.append({**{f: cols[i] for f, i in schema.columns.items()}, **schema.constants})
+    return records
+
+
+def large_page(rows):
+    """A CommodityOnline-style page with one big price table"""
+    body = ''.join(
+        f"<tr><td>{r['state']}</td><td>{r['district']}</td><td>{html_lib.escape(r['market'])}</td>"
+        f"<td>{html_lib.escape(r['commodity'])}</td><td>{r['min_price']}</td><td>{r['max_price']}</td>"
+        f"<td><span class=\"avg\">{r['modal_price']}</span></td></tr>\n"
+        for r in sample_goi_records(rows)
+    )
+    return ("<html><body><table><thead><tr><th>State</th><th>District</th><th>Market</th><th>Commodity</th>"
+            "<th>Min Price</th><th>Max Price</th><th>Avg Price</th></tr></thead>"
+            f"<tbody>{body}</tbody></table></body></html>")
+
+
+def corpus():
+    """(name, html, schema) for every saved page"""
+    pages = []
+    for name in sorted(os.listdir(HTML_FIXTURE_DIR)):
+        schema = COMMODITYMARKETLIVE_SCHEMA if name.startswith('commoditymarketlive') else COMMODITYONLINE_SCHEMA
+        with open(os.path.join(HTML_FIXTURE_DIR, name), encoding='utf-8') as f:
+            pages.append((name, f.read(), schema))
+    return pages
+
+
+def best_rate(fn, rows):
+    best = min(_timed(fn) for _ in range(REPEATS))
+    return best, rows / best if best else float('inf')
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    pages = corpus()
+    # Messy pages are read like a browser would, which BeautifulSoup's
+    # html.parser does not; they are only checked for backend agreement
+    messy = [(h, s) for name, h, s in pages if 'messy' in name]
+    if lxml is not None:
+        assert all(s.extract(h, parser='lxml') == s.extract(h, parser='html.parser') for h, s in messy)
+    workloads = [('fixture corpus x50', [(h, s) for name, h, s in pages if 'messy' not in name] * 50),
+                 (f'large page ({rows} rows)', [(large_page(rows), COMMODITYONLINE_SCHEMA)])]
+    methods = [('BeautifulSoup html.parser (old)', lambda h, s: bs4_records(h, s)),
+               ('mandi_tables html.parser', lambda h, s: s.extract(h, parser='html.parser'))]
+    if lxml is not None:
+        methods.append(('mandi_tables lxml', lambda h, s: s.extract(h, parser='lxml')))
+    else:
+        print("(lxml not installed: skipping the lxml backend)\n")
+
+    print(f"{'Workload':<26} {'Method':<34} {'Time (ms)':>10} {'Rows/s':>12} {'Speedup':>8}")
+    print('-' * 94)
+    for workload, pages in workloads:
+        expected = [bs4_records(h, s) for h, s in pages]  # The old loops are the reference output
+        records = sum(len(r) for r in expected)
+        baseline = None
+        for name, parse in methods:
+            if name.startswith('mandi'):
+                assert [parse(h, s) for h, s in pages] == expected, f"{name} differs from BeautifulSoup"
+            seconds, rate = best_rate(lambda: [parse(h, s) for h, s in pages], records)
+            baseline = baseline or seconds
+            print(f"{workload:<26} {name:<34} {seconds * 1000:>10.1f} {rate:>12,.0f} {baseline / seconds:>7.1f}x")
+        print()
+
+    print("✅ Extractor output matches BeautifulSoup on every workload")
+
+
+if __name__ == "__main__":
+    main()
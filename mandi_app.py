@@ -1,18 +1,29 @@
 import time
-import math
 import threading
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, Query
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
+import numpy as np
 import sys
 import io
 
+from mandi_cache import LRUCache, SingleFlight
+from mandi_browser import (
+    BrowserPool, BrowserUnavailable, PageTimeout, chrome_driver_factory, document_ready, register_pool,
+    rows_present
+)
+from mandi_geo import GridIndex, MarketGazetteer
+from mandi_ingest import IngestError, fetch_all_records
+from mandi_scheduler import RefreshScheduler
+from mandi_sources import fan_out
+from mandi_tables import COMMODITYMARKETLIVE_SCHEMA, COMMODITYONLINE_SCHEMA
+
 # Fix encoding for Windows console
 if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -38,80 +49,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Cache system for API responses (5 minute TTL)
-cache_data = {
-    "last_update": None,
-    "data": None,
-    "commodity": None
-}
+# Per-commodity views of the GOI price table for /scrape-govt-prices,
+# keyed by (index version, commodity); see govt_price_view
 CACHE_TTL_SECONDS = 300  # 5 minutes
+GOV_PRICE_VIEWS = LRUCache(maxsize=128, ttl=CACHE_TTL_SECONDS)
 
 # Government API Configuration
 GOV_API_URL = "https://api.data.gov.in/resource/9ef84268-d588-465a-a5c5-75b41702e833"
 GOV_API_KEY = "579b464db66ec23bdd000001be3a36438c6e470044a4a3c57de4bd91"
 
+COMMODITYONLINE_URL = 'https://www.commodityonline.com/mandi'
+COMMODITYMARKETLIVE_URL = 'https://www.commoditymarketlive.com/mandi-commodities'
+
+# Warm headless Chrome sessions shared by the Selenium scrapers
+# (recycled after max_pages loads or on a crash; see mandi_browser)
+BROWSER_POOL = register_pool(BrowserPool(chrome_driver_factory(), size=2, max_pages=50, name='chrome'))
+UC_BROWSER_POOL = register_pool(BrowserPool(chrome_driver_factory(undetected=True), size=1, max_pages=25,
+                                            name='undetected-chrome'))
+
 # Cache system for fast responses
 CACHE = {
     'agmarknet': {'data': None, 'timestamp': None},
     'commodity': {'data': None, 'timestamp': None},
     'gov_api': {'data': None, 'timestamp': None},
+    'commoditymarketlive': {'data': None, 'timestamp': None},
 }
 CACHE_TTL = 300  # 5 minutes
+# Per-source overrides: a Selenium page load costs far more than a GET
+SOURCE_CACHE_TTL = {
+    'commoditymarketlive': 600,
+}
 
 ### --------------- Helper functions --------------
-def fetch_government_commodity_prices(commodity: str = None, limit: int = 5000):
-    """
-    Fetch real commodity prices from India's government data.gov.in API
-    This is the official source for APMC market data across India
-    """
-    try:
-        params = {
-            "api-key": GOV_API_KEY,
-            "format": "json",
-            "limit": limit
-        }
-        
-        print(f"🔄 Fetching from Government API (data.gov.in)...")
-        response = requests.get(GOV_API_URL, params=params, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"⚠️ Government API returned {response.status_code}")
-            return None
-        
-        data = response.json()
-        records = data.get("records", [])
-        print(f"✅ Got {len(records)} records from Government API")
-        
-        # Transform to standard format
-        transformed = []
-        for record in records:
-            try:
-                item = {
-                    'Commodity': record.get('commodity', 'N/A'),
-                    'State': record.get('state', 'N/A'),
-                    'District': record.get('district', 'N/A'),
-                    'Market': record.get('market', 'N/A'),
-                    'Min Price': str(record.get('min_price', '—')),
-                    'Max Price': str(record.get('max_price', '—')),
-                    'Modal Price': str(record.get('modal_price', '—')),
-                    'Avg Price': str(record.get('arrival_price', '—')),
-                    'Date': record.get('arrival_date', datetime.now().strftime('%Y-%m-%d')),
-                    'Source': 'Government (data.gov.in)'
-                }
-                
-                # Filter by commodity if specified
-                if not commodity or commodity.lower() in item['Commodity'].lower():
-                    transformed.append(item)
-            except Exception as e:
-                print(f"Error transforming record: {e}")
-                continue
-        
-        return transformed if transformed else None
-    
-    except Exception as e:
-        print(f"❌ Error fetching from Government API: {e}")
-        return None
-
 def keyword_filter(df, query):
     """
     Smart keyword filtering for multi-word searches
@@ -135,13 +104,6 @@ def keyword_filter(df, query):
     
     return df[mask].drop(columns=["_combined"])
 
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
-
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -149,143 +111,57 @@ HEADERS = {
 }
 
 ### --------------- Basic requests-based scrapers --------------
-def scrape_commoditymarketlive_all():
+def scrape_commoditymarketlive_all(pool=None):
     """
     Scrape all commodities from CommodityMarketLive mandi-commodities page
-    Using Selenium for JavaScript-rendered content
+    Using a pooled headless Chrome session for JavaScript-rendered content
     """
+    pool = pool or BROWSER_POOL
     try:
-        from selenium import webdriver
-        from selenium.webdriver.support.wait import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        from selenium.webdriver.common.by import By
-        from webdriver_manager.chrome import ChromeDriverManager
-        from selenium.webdriver.chrome.service import Service
-        import time
-    except ImportError:
-        print('Selenium not installed. Install with: pip install selenium webdriver-manager')
+        html = pool.fetch(COMMODITYMARKETLIVE_URL, wait_for=rows_present('table tr', 2), timeout=20)
+    except BrowserUnavailable as e:
+        print(f'CommodityMarketLive browser unavailable: {e}')
         return []
-    
-    url = 'https://www.commoditymarketlive.com/mandi-commodities'
-    driver = None
-    try:
-        options = webdriver.ChromeOptions()
-        options.add_argument('--start-maximized')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.get(url)
-        
-        # Wait for tables to load
-        wait = WebDriverWait(driver, 20)
-        wait.until(EC.presence_of_all_elements_located((By.TAG_NAME, "table")))
-        time.sleep(2)
-        
-        # Parse page
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        rows = []
-        
-        tables = soup.find_all('table')
-        for table in tables:
-            rows_html = table.find_all('tr')[1:]  # Skip header
-            
-            for row in rows_html:
-                cols = row.find_all('td')
-                if len(cols) >= 4:
-                    try:
-                        commodity_name = cols[0].get_text(strip=True)
-                        market = cols[1].get_text(strip=True)
-                        price_info = cols[2].get_text(strip=True)
-                        trend = cols[3].get_text(strip=True) if len(cols) > 3 else "N/A"
-                        
-                        if commodity_name and market and price_info:
-                            rows.append({
-                                'Commodity': commodity_name,
-                                'Market': market,
-                                'Price': price_info,
-                                'Trend': trend,
-                                'Source': 'CommodityMarketLive'
-                            })
-                    except:
-                        continue
-        
-        print(f'Successfully scraped {len(rows)} rows from CommodityMarketLive')
-        return rows
-        
     except Exception as e:
         print(f'CommodityMarketLive fetch error: {e}')
         return []
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+    
+    rows = COMMODITYMARKETLIVE_SCHEMA.extract(html)
+    print(f'Successfully scraped {len(rows)} rows from CommodityMarketLive')
+    return rows
 
 def scrape_commoditymarketlive_sample():
     """Return sample data from CommodityMarketLive"""
     return SAMPLE_COMMODITY_DATA
 
-def scrape_commodityonline_requests():
+def scrape_commodityonline_requests(timeout=15):
     """Try scraping commodityonline using requests (may be blocked with 403)."""
-    url = 'https://www.commodityonline.com/mandi'
+    url = COMMODITYONLINE_URL
     try:
-        res = requests.get(url, headers=HEADERS, timeout=15)
+        res = requests.get(url, headers=HEADERS, timeout=timeout)
         res.raise_for_status()
     except Exception as e:
         print('CommodityOnline requests fetch error:', e)
         return []
-    soup = BeautifulSoup(res.text, 'html.parser')
-    table = soup.find('table')
-    data = []
-    if not table:
-        return data
-    for row in table.find_all('tr')[1:]:
-        cols = [c.get_text(strip=True) for c in row.find_all('td')]
-        if len(cols) >= 7:
-            data.append({
-                'State': cols[0], 'District': cols[1], 'Market': cols[2], 'Commodity': cols[3],
-                'Min Price': cols[4], 'Max Price': cols[5], 'Avg Price': cols[6], 'Source': 'CommodityOnline'
-            })
-    return data
+    return COMMODITYONLINE_SCHEMA.extract(res.text)
 
 ### --------------- Optional Selenium fallback --------------
-def scrape_with_undetected_chrome(url, selector_table=True, wait_seconds=6):
-    """Use undetected-chromedriver to fetch JS-rendered pages. Requires undetected-chromedriver installed."""
+def scrape_with_undetected_chrome(url, selector_table=True, wait_seconds=6, pool=None):
+    """
+    Use undetected-chromedriver to fetch JS-rendered pages. Requires undetected-chromedriver installed.
+    Waits up to wait_seconds for table rows (or document ready) in a pooled session
+    """
+    pool = pool or UC_BROWSER_POOL
+    wait_for = rows_present('table tr', 2) if selector_table else document_ready
     try:
-        import undetected_chromedriver as uc
-        from bs4 import BeautifulSoup
-    except Exception as e:
+        html = pool.fetch(url, wait_for=wait_for, timeout=wait_seconds)
+    except BrowserUnavailable as e:
         print('undetected_chromedriver not available:', e)
         return []
-    options = uc.ChromeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    driver = uc.Chrome(options=options)
-    try:
-        driver.get(url)
-        time.sleep(wait_seconds)
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        table = soup.find('table')
-        if not table:
-            return []
-        data = []
-        for row in table.find_all('tr')[1:]:
-            cols = [c.get_text(strip=True) for c in row.find_all('td')]
-            if len(cols) >= 7:
-                data.append({
-                    'State': cols[0], 'District': cols[1], 'Market': cols[2], 'Commodity': cols[3],
-                    'Min Price': cols[4], 'Max Price': cols[5], 'Avg Price': cols[6], 'Source': url
-                })
-        return data
-    finally:
-        try:
-            driver.quit()
-        except:
-            pass
+    except PageTimeout:
+        print(f'No table rendered on {url} within {wait_seconds}s')
+        return []
+    return COMMODITYONLINE_SCHEMA.extract(html, Source=url)
 
 ### --------------- GPS / Market database --------------
 MARKET_GPS = {
@@ -385,7 +261,7 @@ def is_cache_valid(cache_type: str) -> bool:
     if cache_entry['data'] is None or cache_entry['timestamp'] is None:
         return False
     age = (datetime.now() - cache_entry['timestamp']).total_seconds()
-    return age < CACHE_TTL
+    return age < SOURCE_CACHE_TTL.get(cache_type, CACHE_TTL)
 
 def get_cached_or_live_data(cache_type: str, fetch_fn):
     """Get cached data if valid, otherwise fetch and cache"""
@@ -407,26 +283,416 @@ def get_cached_or_live_data(cache_type: str, fetch_fn):
             return SAMPLE_COMMODITY_DATA
         return []
 
-### --------------- Aggregation function --------------
-def get_combined_mandi_list(use_selenium=False, state='Telangana', district='Karimnagar'):
-    all_data = []
-    try:
-        all_data += scrape_agmarknet_with_filters(state=state, district=district)
-    except Exception as e:
-        print('Error scraping Agmarknet:', e)
+### --------------- Coalesced live scrapes --------------
+# Concurrent requests for the same source share one scrape (the pages are
+# fetched whole and filtered afterwards, so the key is just the source);
+# finished scrapes are kept in CACHE[source] for its TTL
+SCRAPE_FLIGHTS = SingleFlight()
+SCRAPE_CACHE_HITS = {'commoditymarketlive': 0, 'commodity': 0}
+
+def cached_scrape(source: str, fetch_fn, force: bool = False):
+    """
+    fetch_fn() rows for source, served from CACHE while fresh
+    Misses arriving together run fetch_fn once; empty results are not cached
+    force: scrape even if the cache is fresh (scheduled refreshes)
+    """
+    if not force and is_cache_valid(source):
+        SCRAPE_CACHE_HITS[source] = SCRAPE_CACHE_HITS.get(source, 0) + 1
+        return CACHE[source]['data']
+
+    def scrape():
+        if not force and is_cache_valid(source):  # Filled by a flight that finished just before this one
+            return CACHE[source]['data']
+        data = fetch_fn()
+        if data:
+            CACHE[source] = {'data': data, 'timestamp': datetime.now()}
+        return data
+
+    return SCRAPE_FLIGHTS.do(source, scrape)
+
+def scrape_stats() -> Dict:
+    """Cache state and executed vs coalesced scrape counts per source"""
+    sources = {}
+    for source, hits in SCRAPE_CACHE_HITS.items():
+        entry = CACHE[source]
+        sources[source] = {
+            'cached': is_cache_valid(source),
+            'records': len(entry['data']) if entry['data'] is not None else 0,
+            'age_seconds': round((datetime.now() - entry['timestamp']).total_seconds(), 1) if entry['timestamp'] else None,
+            'ttl_seconds': SOURCE_CACHE_TTL.get(source, CACHE_TTL),
+            'cache_hits': hits,
+        }
+    return {'sources': sources, 'flights': SCRAPE_FLIGHTS.stats()}
+
+### --------------- GOI price table + spatial market index --------------
+# CACHE['gov_api'] holds the full GOI price table as a DataFrame; /mandi
+# answers from it instead of scraping on every request
+GAZETTEER = MarketGazetteer.load(extra_markets=MARKET_GPS)
+COLD_START_WAIT_SECONDS = 30  # How long the first request waits for the table
+
+# Spatial index over the markets of the current price table:
+# table (the DataFrame it was built from), markets [(state, district, market,
+# precision)], rows [row positions per market], grid (GridIndex)
+NEARBY_INDEX = {'table': None, 'markets': [], 'rows': [], 'grid': None}
+
+def _refresh_price_table() -> bool:
+    """Fetch the GOI table into CACHE['gov_api']; keeps the old one on failure"""
     try:
-        data = scrape_commodityonline_requests()
-        if not data and use_selenium:
-            data = scrape_with_undetected_chrome('https://www.commodityonline.com/mandi')
-        all_data += data
+        df, stats = fetch_all_records(GOV_API_URL, GOV_API_KEY, timeout=10)
+        if not df.empty:
+            CACHE['gov_api'] = {'data': df, 'timestamp': datetime.now()}
+            return True
+    except IngestError as e:
+        print(f"⚠️ Government price table refresh incomplete: {e}")
     except Exception as e:
-        print('Error scraping CommodityOnline:', e)
-    return all_data
+        print(f"❌ Government price table refresh failed: {e}")
+    return False
+
+def get_price_table() -> pd.DataFrame:
+    """
+    Cached GOI price table, kept fresh by the 'gov_api' scheduler job;
+    a table found past CACHE_TTL triggers that job early while the old
+    table keeps being served. Only a cold start waits for the fetch
+    """
+    entry = CACHE['gov_api']
+    if entry['data'] is not None:
+        if not is_cache_valid('gov_api'):
+            REFRESH_SCHEDULER.trigger('gov_api')
+        return entry['data']
+    
+    REFRESH_SCHEDULER.trigger('gov_api')
+    REFRESH_SCHEDULER.wait('gov_api', COLD_START_WAIT_SECONDS)
+    data = CACHE['gov_api']['data']
+    return data if data is not None else pd.DataFrame()
+
+def get_nearby_index(df: pd.DataFrame) -> Dict:
+    """
+    Locate every distinct market of the price table once (per table) and
+    bucket the located ones into a GridIndex
+    A new table gets a new index dict, swapped in whole: readers holding
+    the old one never see a half-rebuilt table or grid
+    """
+    global NEARBY_INDEX
+    index = NEARBY_INDEX
+    if index['table'] is df:
+        return index
+    
+    markets, rows, lats, lons = [], [], [], []
+    if not df.empty and 'market' in df.columns:
+        keys = [c for c in ('state', 'district', 'market') if c in df.columns]
+        for key, positions in df.groupby(keys, sort=False).indices.items():
+            key = dict(zip(keys, key if isinstance(key, tuple) else (key,)))
+            found = GAZETTEER.locate(key['market'], key.get('district'), key.get('state'))
+            if not found:
+                continue
+            lat, lon, precision = found
+            markets.append((key.get('state'), key.get('district'), key['market'], precision))
+            rows.append(positions)
+            lats.append(lat)
+            lons.append(lon)
+    
+    NEARBY_INDEX = index = {'table': df, 'markets': markets, 'rows': rows, 'grid': GridIndex(lats, lons)}
+    print(f"📍 Located {len(markets)} markets of the price table")
+    return index
+
+def price_records(df: pd.DataFrame) -> List[Dict]:
+    """GOI rows in the /scrape-govt-prices display format"""
+    out = pd.DataFrame({
+        'Commodity': df.get('commodity', 'N/A'),
+        'State': df.get('state', 'N/A'),
+        'District': df.get('district', 'N/A'),
+        'Market': df.get('market', 'N/A'),
+        'Min Price': df.get('min_price', '—'),
+        'Max Price': df.get('max_price', '—'),
+        'Modal Price': df.get('modal_price', '—'),
+        'Date': df.get('arrival_date', ''),
+    }, index=df.index)
+    out['Source'] = 'Government (data.gov.in)'
+    return out.astype(object).where(out.notna(), None).to_dict(orient='records')
+
+### --------------- Commodity views for /scrape-govt-prices --------------
+# Display records of the current price table, built once per table, and
+# commodity name -> row positions. A commodity query matches every name
+# containing it (case-insensitive), like the old per-request filter did.
+GOV_COMMODITY_INDEX = {'table': None, 'version': 0, 'records': [], 'commodities': {}}
+GOV_COMMODITY_INDEX_LOCK = threading.Lock()
+
+def govt_price_records(df: pd.DataFrame) -> List[Dict]:
+    """GOI rows as /scrape-govt-prices has always shown them (prices as strings)"""
+    n = len(df)
+    def text(col, default):
+        return df[col].astype(str).tolist() if col in df.columns else [default] * n
+    columns = {
+        'Commodity': text('commodity', 'N/A'),
+        'State': text('state', 'N/A'),
+        'District': text('district', 'N/A'),
+        'Market': text('market', 'N/A'),
+        'Min Price': text('min_price', '—'),
+        'Max Price': text('max_price', '—'),
+        'Modal Price': text('modal_price', '—'),
+        'Avg Price': text('arrival_price', '—'),
+        'Date': text('arrival_date', datetime.now().strftime('%Y-%m-%d')),
+        'Source': ['Government (data.gov.in)'] * n,
+    }
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+def build_govt_commodity_index(df: pd.DataFrame) -> Dict:
+    """Display records plus commodity name -> row positions for df"""
+    commodities = {}
+    if 'commodity' in df.columns:
+        groups = df.groupby('commodity', sort=False).indices
+        commodities = {str(name): positions for name, positions in groups.items()}
+    return {'table': df, 'records': govt_price_records(df), 'commodities': commodities}
+
+def get_govt_commodity_index(df: pd.DataFrame) -> Dict:
+    """
+    The index for the current price table, rebuilt (once) when the table changes
+    A new index is a new dict swapped in with one assignment, never updated
+    in place, so readers holding the old one always see a consistent index
+    """
+    global GOV_COMMODITY_INDEX
+    index = GOV_COMMODITY_INDEX
+    if index['table'] is df:
+        return index
+    with GOV_COMMODITY_INDEX_LOCK:
+        index = GOV_COMMODITY_INDEX
+        if index['table'] is not df:
+            fresh = build_govt_commodity_index(df)
+            fresh['version'] = index['version'] + 1
+            GOV_COMMODITY_INDEX = index = fresh
+            GOV_PRICE_VIEWS.clear()  # Views of the previous table
+            print(f"📇 Indexed {len(index['records'])} government records, {len(index['commodities'])} commodities")
+    return index
+
+def commodity_rows(index: Dict, commodity: Optional[str]) -> List[Dict]:
+    """Records whose commodity contains commodity (all records if it is empty), in table order"""
+    query = (commodity or '').strip().lower()
+    if not query:
+        return index['records']
+    groups = [positions for name, positions in index['commodities'].items() if query in name.lower()]
+    if not groups:
+        return []
+    positions = np.sort(np.concatenate(groups)) if len(groups) > 1 else groups[0]
+    records = index['records']
+    return [records[i] for i in positions]
+
+def govt_price_view(commodity: Optional[str]):
+    """
+    (records, from_cache, table age in seconds) for a commodity query
+    against the shared price table; filtered views are kept in
+    GOV_PRICE_VIEWS (LRU, CACHE_TTL_SECONDS)
+    """
+    df = get_price_table()
+    timestamp = CACHE['gov_api']['timestamp']
+    age = int((datetime.now() - timestamp).total_seconds()) if timestamp else None
+    if df.empty:
+        return [], False, age
+    index = get_govt_commodity_index(df)
+    key = (index['version'], (commodity or '').strip().lower())
+    records = GOV_PRICE_VIEWS.get(key)
+    if records is not None:
+        return records, True, age
+    records = commodity_rows(index, commodity)
+    GOV_PRICE_VIEWS.put(key, records)
+    return records, False, age
+
+### --------------- Best-market finder --------------
+# GOI prices are Rs per quintal; transport is costed per quintal per road km
+DEFAULT_TRANSPORT_COST_PER_QUINTAL_KM = 0.5
+# Road distance is estimated as straight-line distance times this factor
+ROAD_DISTANCE_FACTOR = 1.3
+
+# Per-commodity candidate markets for the current price table:
+# table, nearby (the get_nearby_index market ids refer to), commodities
+# {normalised name: {'name', 'market_ids', 'prices', 'dates', 'grid'}}
+BEST_MARKET_INDEX = {'table': None, 'nearby': None, 'commodities': {}}
+
+def get_best_market_index(df: pd.DataFrame) -> Dict:
+    """
+    Precompute, per commodity, every located market selling it with its
+    latest modal price (median over that day's varieties/grades) and a
+    GridIndex over those markets. Rebuilt once per price table into a new
+    dict (swapped in whole) that also holds the nearby index its market
+    ids refer to
+    """
+    global BEST_MARKET_INDEX
+    index = BEST_MARKET_INDEX
+    if index['table'] is df:
+        return index
+    
+    nearby = get_nearby_index(df)
+    commodities = {}
+    if nearby['markets'] and all(c in df.columns for c in ('commodity', 'modal_price')):
+        row_market = np.full(len(df), -1, dtype=np.int64)
+        for market_id, rows in enumerate(nearby['rows']):
+            row_market[rows] = market_id
+        
+        table = pd.DataFrame({
+            'commodity': df['commodity'].astype(str).str.strip(),
+            'market': row_market,
+            'date': pd.to_datetime(df.get('arrival_date'), format='%d/%m/%Y', errors='coerce'),
+            'price': pd.to_numeric(df['modal_price'], errors='coerce'),
+        })
+        table = table[(table['market'] >= 0) & table['price'].notna()]
+        latest = table.groupby(['commodity', 'market'])['date'].transform('max')
+        table = table[(table['date'] == latest) | latest.isna()]
+        table = table.groupby(['commodity', 'market'], sort=False).agg(
+            price=('price', 'median'), date=('date', 'max')
+        ).reset_index()
+        
+        grid = nearby['grid']
+        for name, group in table.groupby('commodity', sort=False):
+            market_ids = group['market'].to_numpy()
+            commodities.setdefault(name.lower(), []).append({
+                'name': name,
+                'market_ids': market_ids,
+                'prices': group['price'].to_numpy(dtype=np.float64),
+                'dates': group['date'].dt.strftime('%d/%m/%Y').to_numpy(),
+                'grid': GridIndex(grid.lats[market_ids], grid.lons[market_ids]),
+            })
+    
+    BEST_MARKET_INDEX = index = {'table': df, 'nearby': nearby, 'commodities': commodities}
+    print(f"📍 Best-market candidates precomputed for {len(commodities)} commodities")
+    return index
+
+def rank_markets(df: pd.DataFrame, latitude: float, longitude: float, commodity: str,
+                 quantity_quintals: float, radius_km: float, cost_per_quintal_km: float,
+                 limit: int) -> List[Dict]:
+    """
+    Markets within radius_km selling commodity, ranked by net realisable
+    price: modal price minus transport cost per quintal to get there
+    A commodity name matching no commodity exactly matches by substring
+    ("paddy" -> every Paddy(Dhan) commodity)
+    """
+    index = get_best_market_index(df)  # The only index reference used below
+    markets = index['nearby']['markets']
+    key = commodity.strip().lower()
+    candidate_sets = index['commodities'].get(key) or [
+        candidates
+        for name, sets in index['commodities'].items() if key in name
+        for candidates in sets
+    ]
+    
+    ranked = []
+    for candidates in candidate_sets:
+        ids, dists = candidates['grid'].within(latitude, longitude, radius_km / ROAD_DISTANCE_FACTOR)
+        road_km = dists * ROAD_DISTANCE_FACTOR
+        transport = road_km * cost_per_quintal_km
+        net = candidates['prices'][ids] - transport
+        for i, market_id in enumerate(candidates['market_ids'][ids]):
+            state, district, market, precision = markets[market_id]
+            ranked.append({
+                'Market': market,
+                'District': district,
+                'State': state,
+                'Commodity': candidates['name'],
+                'Modal Price': round(float(candidates['prices'][ids[i]]), 2),
+                'Date': candidates['dates'][ids[i]],
+                'Road_km': round(float(road_km[i]), 1),
+                'Transport_cost_per_quintal': round(float(transport[i]), 2),
+                'Net_price_per_quintal': round(float(net[i]), 2),
+                'Net_total': round(float(net[i]) * quantity_quintals, 2),
+                'Location_precision': precision,
+            })
+    ranked.sort(key=lambda r: (-r['Net_price_per_quintal'], r['Road_km']))
+    return ranked[:limit]
+
+### --------------- Aggregation function --------------
+### --------------- Combined sources (concurrent fan-out) --------------
+# Every source runs at once; whatever has arrived by the overall deadline is
+# returned, so the worst case is the deadline rather than the sum of timeouts
+COMBINED_DEADLINE_SECONDS = 20.0
+SOURCE_TIMEOUT_SECONDS = {
+    'commoditymarketlive': 20.0,  # Pooled Chrome page load
+    'commodityonline': 15.0,
+    'commodityonline_chrome': 20.0,  # Only started if the requests scrape comes back empty
+}
+
+def scheduled_rows(job: str, source: str, timeout: float) -> List[Dict]:
+    """
+    Rows of a scrape cache entry; a stale entry triggers the scheduler job
+    that refreshes it and waits up to timeout for that run. Never scrapes
+    itself, so a job that is backing off just serves what is cached
+    """
+    if not is_cache_valid(source):
+        REFRESH_SCHEDULER.trigger(job)
+        REFRESH_SCHEDULER.wait(job, timeout)
+    return CACHE[source]['data'] or []
+
+def get_combined_mandi_list(use_selenium=False, deadline_seconds=COMBINED_DEADLINE_SECONDS):
+    """
+    CommodityMarketLive and CommodityOnline fetched concurrently through
+    the refresh scheduler
+    Returns data, count, elapsed_ms, complete (no source timed out) and
+    sources: status, records and elapsed_ms per source
+    """
+    started = time.time()
+    timeouts = SOURCE_TIMEOUT_SECONDS
+    
+    def source(name, cache_key):
+        return (name, lambda: scheduled_rows(name, cache_key, timeouts[name]), timeouts[name])
+    
+    sources = [source('commoditymarketlive', 'commoditymarketlive'), source('commodityonline', 'commodity')]
+    fallbacks = {}
+    if use_selenium:
+        # Fills the same cache entry, so one Chrome scrape serves later requests too
+        fallbacks['commodityonline'] = source('commodityonline_chrome', 'commodity')
+    
+    data, statuses = fan_out(sources, deadline_seconds, fallbacks)
+    all_data = [row for name in statuses for row in data.get(name, [])]
+    elapsed_ms = round((time.time() - started) * 1000, 1)
+    summary = ', '.join(f"{name}={entry['status']}" for name, entry in statuses.items())
+    print(f"✅ Combined: {len(all_data)} records in {elapsed_ms} ms ({summary})")
+    return {
+        'data': all_data,
+        'count': len(all_data),
+        'sources': statuses,
+        'complete': all(s['status'] != 'timeout' for s in statuses.values()),
+        'elapsed_ms': elapsed_ms,
+    }
+
+### --------------- Refresh scheduler --------------
+# Every upstream refresh runs here: fixed interval (+/- 10% jitter), doubling
+# retry delays after failures, one run per source at a time. Endpoints only
+# trigger() a job when they find its data stale. Browser (Selenium) scrapes
+# are on-demand only, so an idle server never starts Chrome.
+REFRESH_RETRY_SECONDS = 60
+REFRESH_MAX_BACKOFF_SECONDS = 3600
+
+def add_refresh_jobs(scheduler: RefreshScheduler) -> RefreshScheduler:
+    """Register every upstream refresh job on scheduler"""
+    backoff = {'retry_seconds': REFRESH_RETRY_SECONDS, 'max_backoff': REFRESH_MAX_BACKOFF_SECONDS}
+    scheduler.add('gov_api', _refresh_price_table, interval=CACHE_TTL, **backoff)
+    scheduler.add('commodityonline',
+                  lambda: cached_scrape('commodity', scrape_commodityonline_requests, force=True),
+                  interval=CACHE_TTL, **backoff)
+    scheduler.add('commoditymarketlive',
+                  lambda: cached_scrape('commoditymarketlive', scrape_commoditymarketlive_all, force=True),
+                  interval=None, **backoff)
+    scheduler.add('commodityonline_chrome',
+                  lambda: cached_scrape('commodity', lambda: scrape_with_undetected_chrome(COMMODITYONLINE_URL),
+                                        force=True),
+                  interval=None, **backoff)
+    return scheduler
+
+REFRESH_SCHEDULER = add_refresh_jobs(RefreshScheduler('mandi-refresh'))
+
+@app.on_event("startup")
+async def start_refresh_scheduler():
+    REFRESH_SCHEDULER.start()
+
+@app.on_event("shutdown")
+async def stop_refresh_scheduler():
+    REFRESH_SCHEDULER.stop()
 
 ### --------------- FastAPI endpoints --------------
 class Location(BaseModel):
     latitude: float
     longitude: float
+    radius_km: float = 100.0
+    k: Optional[int] = Field(None, ge=1)  # Only the k nearest markets
+    commodity: Optional[str] = None
 
 @app.get('/scrape-agmarknet', response_class=JSONResponse)
 async def scrape_commodity_market_live_endpoint(
@@ -447,9 +713,10 @@ async def scrape_commodity_market_live_endpoint(
     print(f"   District: {district}\n")
     
     try:
-        # Try live Selenium scraping first
-        print(f"⏳ Attempting live CommodityMarketLive scrape with Selenium...")
-        live_data = scrape_commoditymarketlive_all()
+        # Cached rows, or an on-demand Selenium scrape run by the refresh scheduler
+        print(f"⏳ Reading CommodityMarketLive through the refresh scheduler...")
+        live_data = await run_in_threadpool(scheduled_rows, 'commoditymarketlive', 'commoditymarketlive',
+                                            SOURCE_TIMEOUT_SECONDS['commoditymarketlive'])
         
         if live_data and len(live_data) > 0:
             print(f"✅ SUCCESS: Scraped {len(live_data)} records from live CommodityMarketLive")
@@ -480,19 +747,6 @@ async def scrape_commodity_market_live_endpoint(
     print(f"✅ Returning {len(sample_data)} records")
     return {'data': sample_data, 'count': len(sample_data)}
 
-def _background_scrape_agmarknet(state, district, market, commodity_group, commodity, grade, variety):
-    """Background task to scrape without blocking response"""
-    try:
-        print(f"🔄 Background: Scraping agmarknet...")
-        data = scrape_agmarknet_with_filters(state, district, market, commodity_group, commodity, grade, variety)
-        if data:
-            CACHE['agmarknet'] = {'data': data, 'timestamp': datetime.now()}
-            print(f"✅ Background: Agmarknet cache updated with {len(data)} records")
-        else:
-            print("⚠️ Background: Agmarknet scraping returned empty, keeping sample data")
-    except Exception as e:
-        print(f"❌ Background: Error scraping agmarknet: {e}")
-
 @app.get('/scrape-govt-prices', response_class=JSONResponse)
 async def scrape_govt_prices_endpoint(commodity: str = None):
     """
@@ -500,40 +754,23 @@ async def scrape_govt_prices_endpoint(commodity: str = None):
     Uses data.gov.in official APMC market data
     Example: /scrape-govt-prices?commodity=Paddy
     """
-    import time
-    now = time.time()
-    
     print(f"\n🔄 GOVERNMENT API REQUEST:")
     print(f"   Commodity: {commodity or 'All'}\n")
     
-    # Check cache first
-    if cache_data["data"] and cache_data["last_update"]:
-        age = now - cache_data["last_update"]
-        if age < CACHE_TTL_SECONDS and (not commodity or cache_data.get("commodity") == commodity):
-            print(f"✅ Returning cached data (age: {int(age)}s / {CACHE_TTL_SECONDS}s TTL)")
-            return {
-                'data': cache_data["data"],
-                'count': len(cache_data["data"]),
-                'source': 'cache',
-                'age_seconds': int(age)
-            }
-    
     try:
-        print(f"⏳ Fetching from Government API (data.gov.in)...")
-        gov_data = fetch_government_commodity_prices(commodity=commodity)
+        gov_data, cached, age = await run_in_threadpool(govt_price_view, commodity)
         
         if gov_data:
-            print(f"✅ SUCCESS: Got {len(gov_data)} records from Government API")
-            # Update cache
-            cache_data["data"] = gov_data
-            cache_data["last_update"] = now
-            cache_data["commodity"] = commodity
-            
+            if cached:
+                print(f"✅ Returning cached view: {len(gov_data)} records (table age: {age}s)")
+            else:
+                print(f"✅ SUCCESS: {len(gov_data)} records from the Government API table (age: {age}s)")
             return {
                 'data': gov_data,
                 'count': len(gov_data),
-                'source': 'government_api',
-                'cached': False
+                'source': 'cache' if cached else 'government_api',
+                'cached': cached,
+                'age_seconds': age
             }
         else:
             print(f"⚠️ Government API returned no data, trying sample data...")
@@ -577,8 +814,9 @@ async def scrape_commodity_endpoint(commodity: str = 'Paddy'):
     print(f"   Commodity: {commodity}\n")
     
     try:
-        print(f"⏳ Starting live CommodityOnline scrape...")
-        data = scrape_commodityonline_requests()
+        print(f"⏳ Reading CommodityOnline through the refresh scheduler...")
+        data = await run_in_threadpool(scheduled_rows, 'commodityonline', 'commodity',
+                                       SOURCE_TIMEOUT_SECONDS['commodityonline'])
         
         # Filter by commodity if specified
         if commodity and commodity.lower() != 'all':
@@ -599,19 +837,6 @@ async def scrape_commodity_endpoint(commodity: str = 'Paddy'):
         # Fallback to sample data on error
         return {'data': SAMPLE_COMMODITY_DATA, 'count': len(SAMPLE_COMMODITY_DATA)}
 
-def _background_scrape_commodity():
-    """Background task to scrape without blocking response"""
-    try:
-        print(f"🔄 Background: Scraping commodity...")
-        data = scrape_commodityonline_requests()
-        if data:
-            CACHE['commodity'] = {'data': data, 'timestamp': datetime.now()}
-            print(f"✅ Background: Commodity cache updated with {len(data)} records")
-        else:
-            print("⚠️ Background: Commodity scraping returned empty, keeping sample data")
-    except Exception as e:
-        print(f"❌ Background: Error scraping commodity: {e}")
-
 @app.get('/scrape-all', response_class=JSONResponse)
 async def scrape_all_endpoint():
     """
@@ -636,18 +861,37 @@ async def scrape_all_endpoint():
     
     all_data = agmarknet_data + commodity_data
     
-    # Start background refresh if caches are expired or empty
-    if not is_cache_valid('agmarknet') or not is_cache_valid('commodity'):
-        threading.Thread(target=_background_refresh_all, daemon=True).start()
+    # Ask the scheduler for an early CommodityOnline refresh if it is stale
+    # (no-op while one is running or backing off)
+    if not is_cache_valid('commodity'):
+        REFRESH_SCHEDULER.trigger('commodityonline')
     
     return {'data': all_data, 'count': len(all_data)}
 
-def _background_refresh_all():
-    """Background task to refresh both sources"""
-    if not is_cache_valid('agmarknet'):
-        _background_scrape_agmarknet('Telangana', 'Karimnagar', 'All Markets', 'All Commodity Groups', 'All Commodities', 'All Grades', 'All Variety')
-    if not is_cache_valid('commodity'):
-        _background_scrape_commodity()
+@app.get('/scrape-combined', response_class=JSONResponse)
+async def scrape_combined_endpoint(
+    use_selenium: bool = False,
+    deadline_seconds: float = COMBINED_DEADLINE_SECONDS
+):
+    """
+    Every live source at once via the refresh scheduler (cached rows when
+    fresh), answered by the deadline at the latest, with per-source status
+    and timing
+    Example: /scrape-combined?deadline_seconds=10
+    """
+    deadline_seconds = max(1.0, min(deadline_seconds, 60.0))
+    return await run_in_threadpool(get_combined_mandi_list, use_selenium, deadline_seconds)
+
+@app.get('/scrape-stats', response_class=JSONResponse)
+async def scrape_stats_endpoint():
+    """Scrape cache freshness, executed vs coalesced scrapes, price view cache and browser pool usage"""
+    return {**scrape_stats(), 'govt_price_views': GOV_PRICE_VIEWS.stats(),
+            'browser_pools': [BROWSER_POOL.stats(), UC_BROWSER_POOL.stats()]}
+
+@app.get('/scheduler', response_class=JSONResponse)
+async def scheduler_endpoint():
+    """Refresh jobs: next run, last duration and outcome, backoff state"""
+    return REFRESH_SCHEDULER.status()
 
 @app.get('/', response_class=HTMLResponse)
 async def index():
@@ -799,28 +1043,72 @@ async function scrapeAgmarknet(event) {
 
 @app.post('/mandi')
 async def mandi_nearby(location: Location):
+    """
+    Mandi prices near a location, nearest market first
+    Markets within radius_km (default 100); with k, only the k nearest
+    of them. Optional commodity filter (substring, case-insensitive)
+    Answered from the cached GOI price table and the spatial market index
+    """
+    # A cold start waits on the GOI fetch, so keep it off the event loop
+    return JSONResponse(content=await run_in_threadpool(nearby_mandis, location))
+
+def nearby_mandis(location: Location) -> Dict:
+    """Body of /mandi"""
     user_lat = location.latitude
     user_lon = location.longitude
-    mandi_list = get_combined_mandi_list(use_selenium=False)
+    df = get_price_table()
+    index = get_nearby_index(df)
+    
+    if location.k:
+        ids, dists = index['grid'].nearest(user_lat, user_lon, location.k, max_km=location.radius_km)
+    else:
+        ids, dists = index['grid'].within(user_lat, user_lon, location.radius_km)
+    
     results = []
-    for m in mandi_list:
-        market = m.get('Market') or m.get('market') or m.get('Market')
-        if not market:
-            market = m.get('Market') or m.get('Market')
-        gps = MARKET_GPS.get(market)
-        if not gps:
-            for k,v in MARKET_GPS.items():
-                if k.lower() in (market or '').lower():
-                    gps = v; break
-        if not gps:
-            continue
-        dist = haversine_km(user_lat, user_lon, gps[0], gps[1])
-        if dist <= 100.0:
-            res = dict(m)
-            res['Distance_km'] = round(dist,2)
+    commodity = (location.commodity or '').strip().lower()
+    for market_id, dist in zip(ids, dists):
+        rows = df.iloc[index['rows'][market_id]]
+        if commodity and 'commodity' in rows.columns:
+            rows = rows[rows['commodity'].astype(str).str.lower().str.contains(commodity, regex=False)]
+        for res in price_records(rows):
+            res['Distance_km'] = round(float(dist), 2)
+            res['Location_precision'] = index['markets'][market_id][3]
             results.append(res)
-    results = sorted(results, key=lambda x: x['Distance_km'])
-    return JSONResponse(content={'nearby_mandis': results, 'count': len(results)})
+    return {
+        'nearby_mandis': results,
+        'count': len(results),
+        'markets': len(ids),
+        'radius_km': location.radius_km
+    }
+
+@app.get('/best-market', response_class=JSONResponse)
+async def best_market_endpoint(
+    latitude: float,
+    longitude: float,
+    commodity: str,
+    quantity_quintals: float = Query(10.0, gt=0),
+    radius_km: float = Query(150.0, gt=0),
+    cost_per_quintal_km: float = Query(DEFAULT_TRANSPORT_COST_PER_QUINTAL_KM, ge=0),
+    limit: int = 10
+):
+    """
+    Where to sell: markets within radius_km ranked by modal price minus
+    estimated transport cost (cost_per_quintal_km x road km)
+    Example: /best-market?latitude=18.44&longitude=79.13&commodity=Paddy&quantity_quintals=25
+    """
+    started = time.time()
+    df = await run_in_threadpool(get_price_table)
+    results = await run_in_threadpool(rank_markets, df, latitude, longitude, commodity, quantity_quintals,
+                                      radius_km, cost_per_quintal_km, max(1, min(limit, 100)))
+    return {
+        'data': results,
+        'count': len(results),
+        'commodity': commodity,
+        'quantity_quintals': quantity_quintals,
+        'radius_km': radius_km,
+        'cost_per_quintal_km': cost_per_quintal_km,
+        'elapsed_ms': round((time.time() - started) * 1000, 2)
+    }
 
 ### --------------- Command Line Interface for Terminal Scraping --------------
 def print_table(data, title=""):
@@ -6,20 +6,39 @@ Runs on port 8001
 """
 
 import time
-import math
+import datetime
 import threading
 import json
 import os
 from typing import List, Dict, Optional
-from fastapi import FastAPI, Request, Form, Query
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, Query, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import requests
 from bs4 import BeautifulSoup
+import numpy as np
 import pandas as pd
 import uvicorn
 
+from mandi_cache import LRUCache
+from mandi_scheduler import RefreshScheduler
+from mandi_http import (
+    QueryPopularity, accepted_encodings, canonical_query, compress_body, etag_matches, make_etag,
+    pick_variant, variants_size
+)
+from mandi_store import HistoryStore, load_snapshot, save_snapshot
+from mandi_json import encode_payload, records_json, records_ndjson
+from mandi_index import (
+    GroupIndex, KeywordIndex, PrefixIndex, PriceAggregates, normalize_value, tokenize_query
+)
+from mandi_search import RankedIndex
+from mandi_ingest import (
+    GOI_DATE_FIELD, GOI_DATE_FORMAT, IngestError, SnapshotDelta, compact_goi_frame, dataset_tag,
+    display_frame, fetch_all_records, merge_typed_frames, record_hashes
+)
+
 app = FastAPI(
     title="Mandi Price Finder", 
     description="Fetches commodity prices from Government of India API with smart keyword filtering"
@@ -32,16 +51,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the snapshot state and totals sent as headers
+    expose_headers=["ETag", "X-Dataset-Version", "X-Snapshot-Age", "X-Snapshot-Stale", "X-Total-Count"],
 )
 
 # Startup event to preload data in background
 @app.on_event("startup")
 async def startup_event():
     """Preload data when server starts"""
-    # Start background data loading
-    thread = threading.Thread(target=preload_data_background, daemon=True)
-    thread.start()
-    print("[APP] Background data loader thread started")
+    # Serve the last saved snapshot straight away; the scheduler refreshes
+    # it right away and then every CACHE_TTL_SECONDS
+    warm_start()
+    REFRESH_SCHEDULER.start()
+    print("[APP] Refresh scheduler started")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    REFRESH_SCHEDULER.stop()
 
 # ============================================================================
 # Configuration
@@ -49,6 +76,8 @@ async def startup_event():
 
 GOI_API_URL = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
 GOI_API_KEY = "579b464db66ec23bdd000001be3a36438c6e470044a4a3c57de4bd91"
+GOI_PAGE_SIZE = 1000  # Records per API page
+GOI_FETCH_WORKERS = 4  # Concurrent page requests
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -70,86 +99,408 @@ def load_geography():
 
 load_geography()
 
-# ============================================================================
-# Helper functions
-# ============================================================================
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    """Calculate distance between two coordinates using Haversine formula"""
-    R = 6371.0
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
-
 # ============================================================================
 # API Functions (from Streamlit market_price.py)
 # ============================================================================
 
 # Global cache for GOI API data
+# Readers never wait on the upstream call: refreshes run in one background
+# thread and swap in a new snapshot under CACHE_LOCK when they finish
 CACHED_DATA = None
 CACHE_LOCK = threading.Lock()
 CACHE_TIMESTAMP = None
+# Indexes derived from CACHED_DATA, built (or patched by a delta) whenever
+# the cache is refreshed and swapped in together with it
+# (see build_cached_indexes / apply_cached_delta)
+CACHED_INDEXES = {}
+# Every snapshot carries a content tag in CACHED_DATA.attrs['dataset_version']
+# (see dataset_tag): ETags, cursors and cache keys all derive from it, so
+# they stay valid across restarts only while the data is the same
+
+CACHE_TTL_SECONDS = 3600  # Snapshot is considered stale after 1 hour
+REFRESH_RETRY_SECONDS = 60  # First retry after a failure, doubling per failure
+REFRESH_MAX_BACKOFF_SECONDS = 900
+REFRESH_TIMEOUT_SECONDS = 20  # Per GOI page request
+COLD_START_WAIT_SECONDS = 30  # How long the first request waits for data
+
+# Keyword query results (matched row positions), keyed by the normalised
+# keyword set and dataset version, so entries die with their snapshot
+KEYWORD_RESULT_CACHE = LRUCache(maxsize=512)
+
+# Encoded + compressed response bodies of the unfiltered and popular
+# queries, keyed by dataset version, path and query (see conditional_json)
+# Bounded by the bytes held, since one unfiltered body can be megabytes
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE = LRUCache(maxsize=1024, maxbytes=RESPONSE_CACHE_MAX_BYTES, sizeof=variants_size)
+QUERY_POPULARITY = QueryPopularity()
+POPULAR_MIN_HITS = 3  # Requests before a filtered query's bodies are kept
+PRECOMPRESS_TOP_QUERIES = 16  # Popular queries re-encoded after each refresh
+
+# Every refresh is also appended to an on-disk price history (used by /history)
+HISTORY_DB_PATH = os.environ.get(
+    'MANDI_HISTORY_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'data', 'mandi_history.db')
+)
+HISTORY_STORE = None
+
+
+def get_history_store() -> HistoryStore:
+    """Open the history store on first use"""
+    global HISTORY_STORE
+    if HISTORY_STORE is None:
+        HISTORY_STORE = HistoryStore(HISTORY_DB_PATH)
+    return HISTORY_STORE
+
+# Last good snapshot (typed table + indexes) for fast warm starts
+SNAPSHOT_PATH = os.environ.get(
+    'MANDI_SNAPSHOT',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'data', 'mandi_snapshot.pkl')
+)
 
-def fetch_and_cache_data(limit: int = 5000, timeout_seconds: int = 15) -> pd.DataFrame:
+# Layout of the pickled snapshot payload; older layouts are ignored on boot
+SNAPSHOT_FORMAT = 4
+
+# A refresh that changes at most this fraction of the rows is applied as a
+# delta to the current snapshot; larger changes rebuild it from scratch
+DELTA_MAX_FRACTION = 0.5
+
+# Columns with exact-match hash indexes (used by /prices)
+GROUP_INDEX_FIELDS = ['state', 'district', 'market', 'commodity', 'variety']
+
+# Names offered by /suggest
+SUGGEST_FIELDS = ['commodity', 'market', 'district', 'state']
+
+REFRESH_STATE = {
+    "in_progress": False,
+    "last_attempt": None,
+    "last_error": None,
+    "last_duration_seconds": None,
+    "last_ingest": None,
+}
+
+# Owns the GOI refresh: every CACHE_TTL_SECONDS (+/- 10%), backing off after
+# failures, one run at a time; requests only ever trigger() it
+REFRESH_SCHEDULER = RefreshScheduler('service-refresh')
+
+
+def update_refresh_state(**fields):
+    """Set REFRESH_STATE fields together under CACHE_LOCK"""
+    with CACHE_LOCK:
+        REFRESH_STATE.update(fields)
+
+
+def cache_age_seconds() -> Optional[float]:
+    """Age of the current snapshot in seconds (None if nothing cached yet)"""
+    if CACHE_TIMESTAMP is None:
+        return None
+    return (datetime.datetime.now() - CACHE_TIMESTAMP).total_seconds()
+
+
+def cache_status() -> Dict:
+    """Snapshot age and refresh state, reported alongside every response"""
+    age = cache_age_seconds()
+    with CACHE_LOCK:
+        refresh = dict(REFRESH_STATE)
+        df = CACHED_DATA
+    return {
+        "records": len(df) if df is not None else 0,
+        "dataset_version": df.attrs.get('dataset_version') if df is not None else None,
+        "age_seconds": int(age) if age is not None else None,
+        "stale": age is None or age >= CACHE_TTL_SECONDS,
+        "refreshing": refresh["in_progress"],
+        "last_error": refresh["last_error"],
+        "last_ingest": refresh["last_ingest"],
+        "query_cache": KEYWORD_RESULT_CACHE.stats(),
+    }
+
+
+def snapshot_info(df: pd.DataFrame) -> Dict:
     """
-    Fetch and cache commodity price data from GOI API
-    Returns cached data if available, uses timeout for fetching
+    Snapshot identity reported in cacheable response bodies
+    Age and refresh state change without a new dataset version, so they
+    go in response headers instead (see cache_headers)
     """
-    global CACHED_DATA, CACHE_TIMESTAMP
+    return {
+        "records": len(df),
+        "dataset_version": df.attrs.get('dataset_version'),
+    }
+
+
+def build_cached_indexes(df: pd.DataFrame, raw_df: pd.DataFrame, hashes) -> Dict:
+    """
+    Build every index derived from a freshly fetched snapshot
+    df is the typed table, raw_df the same rows as delivered by the API,
+    hashes their record hashes (kept to diff the next refresh against)
+    """
+    return {
+        'keyword': KeywordIndex(df, text_df=raw_df),
+        'groups': GroupIndex(df, GROUP_INDEX_FIELDS),
+        'aggregates': PriceAggregates(df),
+        'ranked': RankedIndex(df),
+        'suggest': build_suggest_index(df),
+        'hashes': hashes,
+    }
+
+
+def build_suggest_index(df: Optional[pd.DataFrame]) -> PrefixIndex:
+    """
+    Typeahead index over live GOI names (ranked by row count) plus every
+    state and district from GEOGRAPHY_DATA not seen in the live data
+    """
+    names = {field: {} for field in SUGGEST_FIELDS}
+    if df is not None:
+        for field in SUGGEST_FIELDS:
+            if field in df.columns:
+                counts = df[field].value_counts()
+                names[field] = {str(value): int(count) for value, count in counts.items() if count}
+    
+    geography = {
+        'state': GEOGRAPHY_DATA.get('states', []),
+        'district': [d for districts in GEOGRAPHY_DATA.get('stateDistricts', {}).values() for d in districts],
+    }
+    for field, values in geography.items():
+        seen = {normalize_value(v) for v in names[field]}
+        for value in values:
+            if isinstance(value, str) and normalize_value(value) not in seen:
+                seen.add(normalize_value(value))
+                names[field][value] = 0
+    return PrefixIndex(names)
+
+
+def apply_cached_delta(previous: pd.DataFrame, indexes: Dict, raw_df: pd.DataFrame,
+                       delta: SnapshotDelta):
+    """
+    Derive the next snapshot from the current one and a delta
+    Only inserted/updated rows are compacted and tokenised; kept rows are
+    renumbered in the indexes and only the aggregate groups of commodities
+    touched by the delta are recomputed. The ranked and suggest indexes are
+    rebuilt; both work per distinct name, never per row
+    Returns (typed table, indexes); the current ones are left untouched
+    """
+    added_raw = raw_df.iloc[delta.added]
+    added, _ = compact_goi_frame(added_raw)
+    df = merge_typed_frames(previous, delta.kept, added)
+    added = df.iloc[len(delta.kept):]
+    
+    groups = indexes['groups'].apply_delta(df, delta.remap, added)
     
+    touched = set()
+    if 'commodity' in df.columns:
+        dropped = previous['commodity'].iloc[np.flatnonzero(delta.remap < 0)]
+        touched = {normalize_value(v) for v in dropped.unique()}
+        touched |= {normalize_value(v) for v in added['commodity'].unique()}
+    rows = [groups.lookup('commodity', c) for c in touched]
+    rows = np.sort(np.concatenate(rows)) if rows else GroupIndex.EMPTY
+    
+    return df, {
+        'keyword': indexes['keyword'].apply_delta(df, delta.remap, added_raw),
+        'groups': groups,
+        'aggregates': indexes['aggregates'].apply_delta(df, touched, rows),
+        'ranked': RankedIndex(df),
+        'suggest': build_suggest_index(df),
+        'hashes': (delta.keys, delta.contents),
+    }
+
+
+def install_snapshot(df: pd.DataFrame, indexes: Dict, timestamp: datetime.datetime,
+                     version: Optional[str] = None):
+    """
+    Swap in a new snapshot and its indexes in one step
+    version defaults to the content tag of indexes['hashes']
+    """
+    global CACHED_DATA, CACHE_TIMESTAMP, CACHED_INDEXES
+    
+    df.attrs['dataset_version'] = version if version is not None else dataset_tag(indexes['hashes'])
     with CACHE_LOCK:
-        # Return cached data if available and less than 1 hour old
-        if CACHED_DATA is not None and not CACHED_DATA.empty:
-            import datetime
-            if CACHE_TIMESTAMP and (datetime.datetime.now() - CACHE_TIMESTAMP).seconds < 3600:
-                print(f"[API] Using cached data ({len(CACHED_DATA)} records)")
-                return CACHED_DATA
+        CACHED_DATA = df
+        CACHED_INDEXES = indexes
+        CACHE_TIMESTAMP = timestamp
+    KEYWORD_RESULT_CACHE.clear()
+    RESPONSE_CACHE.clear()
+
+
+def warm_start() -> bool:
+    """
+    Serve the last saved snapshot immediately on boot
+    It keeps its original timestamp, so it counts as stale once past the
+    TTL and the background refresh replaces it
+    """
+    payload = load_snapshot(SNAPSHOT_PATH)
+    if payload is None:
+        print("[Snapshot] No warm-start snapshot, waiting for first fetch")
+        return False
+    
+    try:
+        if payload.get('format') != SNAPSHOT_FORMAT:
+            raise KeyError(f"format {payload.get('format')}, expected {SNAPSHOT_FORMAT}")
+        df, indexes = payload['data'], payload['indexes']
+        install_snapshot(df, indexes, payload['timestamp'])
+    except Exception as e:  # Stale pickle from another pandas/code version, missing keys...
+        print(f"[Snapshot] ❌ Ignoring incompatible snapshot: {e!r}")
+        return False
+    
+    print(f"[Snapshot] Warm start with {len(df)} records from {payload['timestamp']:%Y-%m-%d %H:%M} "
+          f"(loaded in {payload['load_seconds']}s)")
+    return True
+
+
+def persist_snapshot(df: pd.DataFrame, indexes: Dict, timestamp: datetime.datetime):
+    """Write the warm-start snapshot; a failed write only costs the next warm start"""
+    try:
+        saved = save_snapshot(SNAPSHOT_PATH, {
+            'format': SNAPSHOT_FORMAT, 'data': df, 'indexes': indexes, 'timestamp': timestamp
+        })
+        print(f"[Snapshot] Saved {saved['bytes'] / 1e6:.1f} MB in {saved['seconds']}s")
+    except Exception as e:
+        print(f"[Snapshot] ❌ Could not save warm-start snapshot: {e}")
+
+
+def refresh_cache(limit: Optional[int] = None, timeout_seconds: int = 15) -> bool:
+    """
+    Fetch the full GOI dataset and swap it in as the new snapshot
+    Pages are fetched concurrently; limit caps the record count (None = all)
+    Records are diffed against the current snapshot by key/content hash:
+    no changes keeps the snapshot, small changes are applied as a delta,
+    anything else is rebuilt from scratch
+    The upstream calls run without holding CACHE_LOCK
+    Returns True if the snapshot was refreshed
+    """
+    global CACHE_TIMESTAMP
+    
+    print(f"[API] Fetching fresh data from GOI API (limit={limit or 'all'}, timeout={timeout_seconds}s per page)...")
+    started = time.time()
+    
+    try:
+        raw_df, stats = fetch_all_records(
+            GOI_API_URL, GOI_API_KEY,
+            page_size=GOI_PAGE_SIZE,
+            max_workers=GOI_FETCH_WORKERS,
+            timeout=timeout_seconds,
+            max_records=limit,
+            headers=HEADERS
+        )
+        hashes = record_hashes(raw_df)
         
-        print(f"[API] Fetching fresh data from GOI API (limit={limit}, timeout={timeout_seconds}s)...")
+        with CACHE_LOCK:
+            previous, previous_indexes = CACHED_DATA, CACHED_INDEXES
+        delta = None
+        if (previous is not None and 'hashes' in previous_indexes
+                and list(previous.columns) == list(raw_df.columns)):
+            delta = SnapshotDelta(previous_indexes['hashes'], hashes)
+            stats["delta"] = delta.summary()
+            print(f"[API] Delta vs current snapshot: {delta.inserted} inserted, {delta.updated} updated, "
+                  f"{delta.deleted} deleted, {delta.unchanged} unchanged")
         
-        params = {
-            "api-key": GOI_API_KEY,
-            "format": "json",
-            "limit": limit
-        }
+        if delta is not None and delta.changed == 0:
+            # Same data: keep the snapshot (and its version, cursors and
+            # cached query results), just mark it fresh again
+            timestamp = datetime.datetime.now()
+            with CACHE_LOCK:
+                CACHE_TIMESTAMP = timestamp
+                REFRESH_STATE.update(last_error=None, last_ingest=stats)
+            print(f"[API] ✅ No changes in {len(raw_df)} records, snapshot kept")
+            # Re-save so a restart does not load it as stale
+            persist_snapshot(previous, previous_indexes, timestamp)
+            return True
+        
+        if delta is not None and delta.changed <= DELTA_MAX_FRACTION * max(len(raw_df), 1):
+            df, indexes = apply_cached_delta(previous, previous_indexes, raw_df, delta)
+            changed_rows = df.iloc[delta.unchanged:]
+            stats["applied"] = "delta"
+        else:
+            # Typed, categorical table for serving; keyword index built from
+            # the raw text so keyword matching is unchanged
+            df, memory_report = compact_goi_frame(raw_df)
+            indexes = build_cached_indexes(df, raw_df, hashes)
+            stats["memory"] = memory_report
+            changed_rows = df
+            stats["applied"] = "full"
+        del raw_df
+        
+        timestamp = datetime.datetime.now()
+        install_snapshot(df, indexes, timestamp)
+        update_refresh_state(last_error=None, last_ingest=stats)
+        
+        print(f"[API] ✅ Successfully fetched {len(df)} records from GOI API ({stats['applied']} update)")
+        print(f"[API] Indexed {len(indexes['keyword'].vocab)} distinct tokens")
         
         try:
-            response = requests.get(GOI_API_URL, params=params, timeout=timeout_seconds, headers=HEADERS)
-            
-            if response.status_code != 200:
-                print(f"[API] API returned {response.status_code}")
-                return CACHED_DATA if CACHED_DATA is not None else pd.DataFrame()
-            
-            data = response.json()
-            records = data.get("records", [])
-            CACHED_DATA = pd.DataFrame(records)
-            CACHE_TIMESTAMP = __import__('datetime').datetime.now()
-            
-            print(f"[API] ✅ Successfully fetched {len(CACHED_DATA)} records from GOI API")
-            return CACHED_DATA
-            
-        except requests.exceptions.Timeout:
-            print(f"[API] ⏳ Timeout fetching from GOI API (>{timeout_seconds}s)")
-            return CACHED_DATA if CACHED_DATA is not None else pd.DataFrame()
+            written = get_history_store().append(changed_rows)
+            print(f"[History] Upserted {written} records into {HISTORY_DB_PATH}")
         except Exception as e:
-            print(f"[API] ❌ Fetch error: {e}")
-            return CACHED_DATA if CACHED_DATA is not None else pd.DataFrame()
+            print(f"[History] ❌ Could not persist snapshot: {e}")
+        
+        persist_snapshot(df, indexes, timestamp)
+        return True
+        
+    except IngestError as e:
+        print(f"[API] ⏳ Incomplete fetch from GOI API, keeping previous snapshot: {e}")
+        update_refresh_state(last_error=str(e))
+        return False
+    except Exception as e:
+        print(f"[API] ❌ Fetch error: {e}")
+        update_refresh_state(last_error=str(e))
+        return False
+    finally:
+        update_refresh_state(last_duration_seconds=round(time.time() - started, 2))
+
+
+def run_scheduled_refresh() -> bool:
+    """The 'goi_api' scheduler job: refresh the snapshot, then re-encode popular responses"""
+    update_refresh_state(in_progress=True, last_attempt=time.time())
+    try:
+        refreshed = refresh_cache(timeout_seconds=REFRESH_TIMEOUT_SECONDS)
+    finally:
+        update_refresh_state(in_progress=False)
+    if refreshed:
+        precompress_responses()
+    return refreshed
+
 
-def fetch_data(limit: int = 5000) -> pd.DataFrame:
+REFRESH_SCHEDULER.add('goi_api', run_scheduled_refresh, interval=CACHE_TTL_SECONDS,
+                      retry_seconds=REFRESH_RETRY_SECONDS, max_backoff=REFRESH_MAX_BACKOFF_SECONDS)
+
+
+def start_background_refresh() -> bool:
     """
-    Fetch commodity price data from GOI API
-    Uses cached data if available, fetches fresh with timeout
+    Ask the scheduler for a GOI refresh now
+    Refused while one is running or while failures are backing off
+    Returns True if a new refresh was started
     """
-    return fetch_and_cache_data(limit, timeout_seconds=15)
+    started = REFRESH_SCHEDULER.trigger('goi_api')
+    if started:
+        print("[API] Background refresh started")
+    return started
 
-def preload_data_background():
-    """Preload data in background thread"""
-    print("[API] Starting background data preload...")
-    try:
-        fetch_and_cache_data(limit=5000, timeout_seconds=20)
-    except Exception as e:
-        print(f"[API] Background preload failed: {e}")
+
+def fetch_and_cache_data() -> pd.DataFrame:
+    """
+    Fetch and cache commodity price data from GOI API
+    Stale-while-revalidate: returns the current snapshot immediately; the
+    scheduler refreshes it on its own, and a snapshot found past the TTL
+    triggers a refresh early. Only a cold start (nothing cached yet) waits,
+    up to COLD_START_WAIT_SECONDS, for the in-flight refresh.
+    """
+    df = CACHED_DATA
+    age = cache_age_seconds()
+    
+    if df is not None and not df.empty:
+        if age is not None and age >= CACHE_TTL_SECONDS:
+            start_background_refresh()
+        return df
+    
+    # Cold start: join the in-flight refresh instead of starting another fetch
+    start_background_refresh()
+    REFRESH_SCHEDULER.wait('goi_api', COLD_START_WAIT_SECONDS)
+    return CACHED_DATA if CACHED_DATA is not None else pd.DataFrame()
+
+def fetch_data() -> pd.DataFrame:
+    """
+    Fetch commodity price data from GOI API
+    Uses cached data if available, refreshes in the background when stale
+    A cold start blocks: async handlers call it through run_in_threadpool
+    """
+    return fetch_and_cache_data()
 
 
 def keyword_filter(df: pd.DataFrame, query: str) -> pd.DataFrame:
@@ -159,27 +510,292 @@ def keyword_filter(df: pd.DataFrame, query: str) -> pd.DataFrame:
     
     Splits query by space, comma, dot
     Returns rows where ANY keyword matches ANY column (case-insensitive)
+    Uses the prebuilt keyword index when df is the cached dataset
     """
-    if df.empty or not query.strip():
+    positions = keyword_match_positions(df, query)
+    if positions is None:
         return df
+    return df.iloc[positions]
+
+
+def keyword_match_positions(df: pd.DataFrame, query: Optional[str]) -> Optional[np.ndarray]:
+    """
+    Row positions in df matching the keyword query (sorted ascending)
+    Returns None when there is nothing to filter (every row matches)
+    """
+    if df.empty or not query or not query.strip():
+        return None
     
-    # Split text by space, comma, dot
-    raw = query.replace(",", " ").replace(".", " ").split()
-    keywords = [k.lower().strip() for k in raw if k.strip()]
+    keywords = tokenize_query(query)
     
     if not keywords:
-        return df
+        return None
+    
+    index = CACHED_INDEXES.get('keyword')
+    if index is None or index.df is not df:
+        positions = np.flatnonzero(keyword_scan_mask(df, keywords))
+        print(f"[Filter] Query '{query}' matched {len(positions)} records (keywords: {keywords}, scan)")
+        return positions
     
+    # OR logic ignores keyword order and repeats, so the sorted set is the key
+    cache_key = (df.attrs.get('dataset_version'), tuple(sorted(set(keywords))))
+    positions = KEYWORD_RESULT_CACHE.get(cache_key)
+    if positions is None:
+        positions = np.flatnonzero(index.mask(keywords))
+        positions.flags.writeable = False
+        KEYWORD_RESULT_CACHE.put(cache_key, positions)
+    
+    print(f"[Filter] Query '{query}' matched {len(positions)} records (keywords: {keywords})")
+    return positions
+
+
+def keyword_scan_mask(df: pd.DataFrame, keywords: List[str]) -> np.ndarray:
+    """
+    Row-by-row keyword scan (the original keyword_filter implementation)
+    Used for frames that have no prebuilt index
+    """
     # Convert every row to one combined string
-    df_copy = df.copy()
-    df_copy["_combined"] = df_copy.apply(lambda row: " ".join(map(str, row)).lower(), axis=1)
+    combined = df.apply(lambda row: " ".join(map(str, row)).lower(), axis=1)
     
     # OR LOGIC: match if ANY keyword appears in the combined string
-    mask = df_copy["_combined"].apply(lambda text: any(k in text for k in keywords))
+    return combined.apply(lambda text: any(k in text for k in keywords)).to_numpy(dtype=bool)
+
+
+def keyword_filter_scan(df: pd.DataFrame, keywords: List[str]) -> pd.DataFrame:
+    """Filter df by full row scan, bypassing the index (used for benchmarks)"""
+    if df.empty:
+        return df
+    return df[keyword_scan_mask(df, keywords)]
+
+# ============================================================================
+# Pagination and field projection
+# ============================================================================
+
+MAX_PAGE_SIZE = 5000
+
+
+def parse_fields(df: pd.DataFrame, fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields= projection, rejecting unknown columns
+    Repeated names are kept once, in first-seen order
+    """
+    if not fields or not fields.strip() or df.empty:
+        return None
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in df.columns]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(map(str, df.columns))}"
+        )
+    return requested
+
+
+def parse_cursor(df: pd.DataFrame, cursor: str) -> int:
+    """
+    Decode a keyset cursor ("<dataset_version>:<last_row_position>")
+    Cursors from another dataset version are rejected
+    """
+    version, _, after = cursor.rpartition(":")
+    try:
+        after = int(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    if not version or after < -1:
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    if version != str(df.attrs.get('dataset_version')):
+        raise HTTPException(status_code=410, detail="Cursor expired: dataset was refreshed, restart from the first page")
+    return after
+
+
+def page_bounds(df: pd.DataFrame, positions: Optional[np.ndarray], limit: Optional[int] = None,
+                offset: int = 0, cursor: Optional[str] = None):
+    """
+    Resolve limit/offset/cursor into (start, stop, total) over the matched rows
+    positions are the matched row positions (None = all rows)
+    """
+    total = len(df) if positions is None else len(positions)
     
-    result = df_copy[mask].drop(columns=["_combined"])
-    print(f"[Filter] Query '{query}' matched {len(result)} records (keywords: {keywords})")
-    return result
+    start = offset
+    if cursor:
+        after = parse_cursor(df, cursor)
+        if positions is None:
+            start = after + 1
+        else:
+            start = int(np.searchsorted(positions, after, side="right"))
+    start = min(start, total)
+    stop = total if limit is None else min(start + limit, total)
+    return start, stop, total
+
+
+def rows_between(df: pd.DataFrame, positions: Optional[np.ndarray], start: int, stop: int) -> pd.DataFrame:
+    """Matched rows start..stop as a DataFrame slice"""
+    if positions is None:
+        return df.iloc[start:stop]
+    return df.iloc[positions[start:stop]]
+
+
+def paginate(df: pd.DataFrame, positions: Optional[np.ndarray], limit: Optional[int] = None,
+             offset: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None) -> Dict:
+    """
+    Slice one page out of the matched rows and project the requested fields
+    The total is known from positions without materialising any records;
+    the page itself is encoded straight from the columns (records_json),
+    never converted to dicts.
+    """
+    columns = parse_fields(df, fields)
+    start, stop, total = page_bounds(df, positions, limit, offset, cursor)
+    
+    page = rows_between(df, positions, start, stop)
+    if columns:
+        page = page[columns]
+    
+    if positions is None:
+        last_position = stop - 1
+    else:
+        last_position = int(positions[stop - 1]) if stop > start else None
+    
+    has_more = stop < total
+    version = df.attrs.get('dataset_version')
+    return {
+        'data': records_json(page),
+        'count': stop - start,
+        'total': total,
+        'offset': start,
+        'limit': limit,
+        'next_offset': stop if has_more else None,
+        'next_cursor': f"{version}:{last_position}" if has_more and version is not None else None,
+    }
+
+# ============================================================================
+# NDJSON streaming
+# ============================================================================
+
+NDJSON_CHUNK_ROWS = 2000  # Rows encoded per yielded chunk
+
+
+def iter_ndjson(df: pd.DataFrame, positions: Optional[np.ndarray], start: int, stop: int,
+                columns: Optional[List[str]] = None, chunk_rows: int = NDJSON_CHUNK_ROWS):
+    """
+    Yield matched rows as newline-delimited JSON, one chunk at a time
+    Each chunk is encoded straight from the cached table by records_ndjson,
+    so lines match the JSON endpoints' records byte for byte and memory
+    stays at one chunk regardless of the result size
+    """
+    for chunk_start in range(start, stop, chunk_rows):
+        chunk = rows_between(df, positions, chunk_start, min(chunk_start + chunk_rows, stop))
+        if columns:
+            chunk = chunk[columns]
+        yield records_ndjson(chunk)
+
+
+def ndjson_response(df: pd.DataFrame, positions: Optional[np.ndarray], limit: Optional[int] = None,
+                    offset: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None) -> StreamingResponse:
+    """StreamingResponse for format=ndjson; totals go in response headers"""
+    columns = parse_fields(df, fields)
+    start, stop, total = page_bounds(df, positions, limit, offset, cursor)
+    headers = {
+        "X-Total-Count": str(total),
+        "X-Dataset-Version": str(df.attrs.get('dataset_version', 0)),
+    }
+    return StreamingResponse(
+        iter_ndjson(df, positions, start, stop, columns),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+
+# ============================================================================
+# Ranked search
+# ============================================================================
+
+SEARCH_TOP_K = 50  # Ranked results returned when no limit is given
+
+
+def ranked_search(df: pd.DataFrame, query: str, limit: Optional[int] = None, offset: int = 0,
+                  fields: Optional[str] = None, match: str = "any", phrase: bool = False,
+                  fuzzy: bool = True) -> Dict:
+    """
+    Best matches for query by BM25 score over market, district, commodity
+    and variety, tolerant of typos; each record carries its score
+    Only the top offset + limit rows are selected, so deep pages cost more
+    """
+    columns = parse_fields(df, fields)
+    index = CACHED_INDEXES.get('ranked')
+    if index is None or index.df is not df:
+        index = RankedIndex(df)
+    
+    k = offset + (limit or SEARCH_TOP_K)
+    positions, scores, total = index.search(query, k, match_all=(match == "all"), phrase=phrase, fuzzy=fuzzy)
+    positions, scores = positions[offset:], scores[offset:]
+    
+    page = df.iloc[positions]
+    if columns:
+        page = page[columns]
+    records = display_frame(page).to_dict(orient='records')
+    for record, score in zip(records, scores):
+        record['score'] = round(float(score), 3)
+    
+    print(f"[Search] Ranked query '{query}' matched {total} records (words: {index.parse(query)})")
+    stop = offset + len(records)
+    return {
+        'data': records,
+        'count': len(records),
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': stop if stop < total else None,
+        'next_cursor': None,
+    }
+
+# ============================================================================
+# Structured filtering
+# ============================================================================
+
+def parse_date_param(value: Optional[str], name: str) -> Optional[pd.Timestamp]:
+    """Parse a dd/mm/yyyy or yyyy-mm-dd query parameter"""
+    if not value:
+        return None
+    for fmt in (GOI_DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return pd.Timestamp(datetime.datetime.strptime(value.strip(), fmt))
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail=f"{name} must be dd/mm/yyyy or yyyy-mm-dd")
+
+
+def structured_positions(df: pd.DataFrame, filters: Dict[str, Optional[str]],
+                         min_price: Optional[float] = None, max_price: Optional[float] = None,
+                         date_from: Optional[pd.Timestamp] = None,
+                         date_to: Optional[pd.Timestamp] = None) -> Optional[np.ndarray]:
+    """
+    Row positions matching every exact filter and range (AND)
+    Exact filters go through the group hash indexes, then the modal price
+    and arrival date ranges are applied vectorised to the candidates only
+    Returns None when nothing is filtered
+    """
+    groups = CACHED_INDEXES.get('groups')
+    if groups is None or groups.df is not df:
+        groups = GroupIndex(df, GROUP_INDEX_FIELDS)
+    
+    positions = groups.positions(filters)
+    ranges = [
+        ('modal_price', min_price, max_price),
+        (GOI_DATE_FIELD, date_from, date_to),
+    ]
+    for col, low, high in ranges:
+        if (low is None and high is None) or col not in df.columns:
+            continue
+        if positions is None:
+            positions = np.arange(len(df))
+        values = df[col].to_numpy()[positions]
+        keep = np.ones(len(positions), dtype=bool)
+        if low is not None:
+            keep &= values >= (np.datetime64(low) if col == GOI_DATE_FIELD else low)
+        if high is not None:
+            keep &= values <= (np.datetime64(high) if col == GOI_DATE_FIELD else high)
+        positions = positions[keep]
+    return positions
+
 
 # ============================================================================
 # Aggregation function
@@ -193,14 +809,14 @@ def get_combined_mandi_list() -> List[Dict]:
     print('[Aggregator] Fetching commodity prices...')
     
     try:
-        df = fetch_data(limit=5000)
+        df = fetch_data()
         
         if df.empty:
             print('[Aggregator] No data fetched')
             return []
         
         # Convert DataFrame to list of dicts
-        data = df.to_dict(orient='records')
+        data = display_frame(df).to_dict(orient='records')
         print(f'[Aggregator] Got {len(data)} records for serving')
         return data
         
@@ -208,6 +824,195 @@ def get_combined_mandi_list() -> List[Dict]:
         print(f'[Aggregator] Error: {e}')
         return []
 
+# ============================================================================
+# Conditional GET + precompressed responses
+# ============================================================================
+
+
+def response_etag(request: Request, df: pd.DataFrame) -> Optional[str]:
+    """ETag for this request against df (None before the first snapshot)"""
+    version = df.attrs.get('dataset_version')
+    if version is None:
+        return None
+    return make_etag(version, request.url.path, canonical_query(request.query_params.multi_items()))
+
+
+def cache_headers(etag: Optional[str], df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Validator headers; no-cache makes clients revalidate with If-None-Match
+    Snapshot age and staleness are reported here, not in the cached bodies
+    """
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag:
+        headers["ETag"] = etag
+        headers["X-Dataset-Version"] = str(df.attrs.get('dataset_version'))
+    age = cache_age_seconds()
+    if age is not None:
+        headers["X-Snapshot-Age"] = str(int(age))
+        headers["X-Snapshot-Stale"] = "true" if age >= CACHE_TTL_SECONDS else "false"
+    return headers
+
+
+def conditional_json(request: Request, df: pd.DataFrame, build, **args) -> Response:
+    """
+    JSON response for build(df, **args), tagged with an ETag from the
+    dataset version and query
+    A matching If-None-Match is answered with 304 before anything is built.
+    Bodies of the unfiltered query, and of any query requested
+    POPULAR_MIN_HITS times, are encoded and compressed once per dataset
+    version and re-served from RESPONSE_CACHE
+    """
+    path = request.url.path
+    query = canonical_query(request.query_params.multi_items())
+    hits = QUERY_POPULARITY.record((path, query), args)
+    etag = response_etag(request, df)
+    headers = cache_headers(etag, df)
+
+    if etag and etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    accept = request.headers.get('accept-encoding')
+    key = (df.attrs.get('dataset_version'), path, query)
+    variants = RESPONSE_CACHE.get(key) if etag else None
+    if variants is None:
+        body = encode_payload(build(df, **args))
+        if etag and (not query or hits >= POPULAR_MIN_HITS):
+            variants = compress_body(body)
+            RESPONSE_CACHE.put(key, variants)
+        else:
+            variants = compress_body(body, accepted_encodings(accept)[:1])
+
+    encoding, body = pick_variant(variants, accept)
+    if encoding != 'identity':
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def precompress_responses():
+    """
+    Encode and compress the unfiltered /scrape-all listing and the most
+    requested queries for the current snapshot, so the first requests after
+    a refresh are already served from RESPONSE_CACHE
+    """
+    df = CACHED_DATA
+    version = df.attrs.get('dataset_version') if df is not None else None
+    if version is None:
+        return
+
+    started = time.time()
+    wanted = [(('/scrape-all', ''), {})] + [
+        (key, args) for key, args, count in QUERY_POPULARITY.top(PRECOMPRESS_TOP_QUERIES)
+        if count >= POPULAR_MIN_HITS
+    ]
+    built = 0
+    for (path, query), args in wanted:
+        build = PAYLOAD_BUILDERS.get(path)
+        key = (version, path, query)
+        if build is None or key in RESPONSE_CACHE:
+            continue
+        try:
+            RESPONSE_CACHE.put(key, compress_body(encode_payload(build(df, **args))))
+            built += 1
+        except Exception as e:
+            print(f"[Cache] ❌ Could not precompress {path}?{query}: {e}")
+    print(f"[Cache] Precompressed {built} responses for dataset v{version} in {time.time() - started:.2f}s")
+
+# ============================================================================
+# Response payloads
+# ============================================================================
+
+def scrape_all_payload(df: pd.DataFrame, query: Optional[str] = None, limit: Optional[int] = None,
+                       offset: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None) -> Dict:
+    """Body of /scrape-all (json format)"""
+    positions = keyword_match_positions(df, query)
+    return {
+        **paginate(df, positions, limit, offset, cursor, fields),
+        'query': query if query else 'none',
+        'source': 'Government of India API',
+        'cache': snapshot_info(df)
+    }
+
+
+def search_payload(df: pd.DataFrame, query: str, limit: Optional[int] = None, offset: int = 0,
+                   cursor: Optional[str] = None, fields: Optional[str] = None, mode: str = "keyword",
+                   match: str = "any", phrase: bool = False, fuzzy: bool = True) -> Dict:
+    """Body of /search"""
+    if mode == "ranked":
+        return {
+            **ranked_search(df, query, limit, offset, fields, match, phrase, fuzzy),
+            'query': query,
+            'mode': mode,
+            'source': 'Government of India API',
+            'cache': snapshot_info(df)
+        }
+
+    positions = keyword_match_positions(df, query)
+    return {
+        **paginate(df, positions, limit, offset, cursor, fields),
+        'query': query,
+        'source': 'Government of India API',
+        'cache': snapshot_info(df)
+    }
+
+
+def prices_payload(df: pd.DataFrame, filters: Dict[str, Optional[str]], min_price: Optional[float] = None,
+                   max_price: Optional[float] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                   cursor: Optional[str] = None, fields: Optional[str] = None) -> Dict:
+    """Body of /prices"""
+    date_low = parse_date_param(date_from, 'date_from')
+    date_high = parse_date_param(date_to, 'date_to')
+    positions = structured_positions(df, filters, min_price, max_price, date_low, date_high)
+
+    applied = {k: v for k, v in filters.items() if v is not None and v.strip()}
+    applied.update({k: v for k, v in [('min_price', min_price), ('max_price', max_price),
+                                       ('date_from', date_from), ('date_to', date_to)] if v is not None})
+    return {
+        **paginate(df, positions, limit, offset, cursor, fields),
+        'filters': applied,
+        'source': 'Government of India API',
+        'cache': snapshot_info(df)
+    }
+
+
+def aggregates_payload(df: pd.DataFrame, commodity: Optional[str] = None, state: Optional[str] = None,
+                       district: Optional[str] = None, by: Optional[str] = None) -> Dict:
+    """Body of /aggregates"""
+    table = CACHED_INDEXES.get('aggregates')
+    if table is None or table.df is not df:
+        table = PriceAggregates(df)
+
+    if not commodity:
+        data = table.all('commodity')
+    elif district:
+        found = table.get('district', commodity, district)
+        data = [found] if found else []
+    elif state:
+        found = table.get('state', commodity, state)
+        data = [found] if found else []
+    elif by:
+        data = table.for_commodity(by, commodity)
+    else:
+        found = table.get('commodity', commodity)
+        data = [found] if found else []
+
+    return {
+        'data': data,
+        'count': len(data),
+        'source': 'Government of India API',
+        'cache': snapshot_info(df)
+    }
+
+
+# Builders for the cacheable GET endpoints, used to re-encode popular
+# queries after a refresh (see precompress_responses)
+PAYLOAD_BUILDERS = {
+    '/scrape-all': scrape_all_payload,
+    '/search': search_payload,
+    '/prices': prices_payload,
+    '/aggregates': aggregates_payload,
+}
+
 # ============================================================================
 # FastAPI Endpoints
 # ============================================================================
@@ -215,12 +1020,25 @@ def get_combined_mandi_list() -> List[Dict]:
 @app.get('/health')
 async def health():
     """Health check endpoint"""
-    return {"status": "ok", "service": "Mandi Price Finder", "version": "2.0"}
+    return {"status": "ok", "service": "Mandi Price Finder", "version": "2.0", "cache": cache_status(),
+            "response_cache": RESPONSE_CACHE.stats()}
+
+
+@app.get('/scheduler')
+async def scheduler_status():
+    """Refresh jobs: next run, last duration and outcome, backoff state"""
+    return REFRESH_SCHEDULER.status()
 
 
 @app.get('/scrape-all')
 async def scrape_all(
-    query: Optional[str] = Query(None, description="Optional keyword filter (e.g., 'Telangana,Paddy')")
+    request: Request,
+    query: Optional[str] = Query(None, description="Optional keyword filter (e.g., 'Telangana,Paddy')"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (default: all matches)"),
+    offset: int = Query(0, ge=0, description="Number of matches to skip"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (e.g., 'market,commodity,modal_price')"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="'ndjson' streams one record per line")
 ):
     """
     Fetch all commodity prices with optional keyword filtering
@@ -230,66 +1048,187 @@ async def scrape_all(
     - /scrape-all?query=Paddy (filter for Paddy)
     - /scrape-all?query=Telangana,Paddy (multi-keyword: Telangana OR Paddy)
     - /scrape-all?query=Karimnagar,Paddy (district and commodity)
+    - /scrape-all?limit=100&fields=market,commodity,modal_price (first page, 3 columns)
+    - /scrape-all?format=ndjson (stream every record, one JSON object per line)
     """
     print(f'[API] Request: /scrape-all with query={query}')
     
     # Fetch all data
-    df = fetch_data(limit=5000)
+    df = await run_in_threadpool(fetch_data)
     
-    # Apply keyword filter if provided
-    if query and query.strip():
-        df = keyword_filter(df, query)
+    if format == "ndjson":
+        etag = response_etag(request, df)
+        if etag and etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=cache_headers(etag, df))
+        positions = keyword_match_positions(df, query)
+        response = ndjson_response(df, positions, limit, offset, cursor, fields)
+        response.headers.update(cache_headers(etag, df))
+        return response
     
-    data = df.to_dict(orient='records')
-    return {
-        'data': data,
-        'count': len(data),
-        'query': query if query else 'none',
-        'source': 'Government of India API'
-    }
+    return conditional_json(request, df, scrape_all_payload, query=query, limit=limit,
+                            offset=offset, cursor=cursor, fields=fields)
 
 
 @app.get('/search')
 async def search(
-    query: str = Query(..., description="Search keywords (e.g., 'Telangana,Karimnagar,Paddy')")
+    request: Request,
+    query: str = Query(..., description="Search keywords (e.g., 'Telangana,Karimnagar,Paddy')"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (default: all matches)"),
+    offset: int = Query(0, ge=0, description="Number of matches to skip"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (e.g., 'market,commodity,modal_price')"),
+    mode: str = Query("keyword", pattern="^(keyword|ranked)$", description="'ranked' scores matches and tolerates typos"),
+    match: str = Query("any", pattern="^(any|all)$", description="Ranked mode: 'all' requires every word to match"),
+    phrase: bool = Query(False, description="Ranked mode: words must appear in order within one field"),
+    fuzzy: bool = Query(True, description="Ranked mode: match misspelt words to the closest known names")
 ):
     """
     Search commodity prices with keyword filtering
     
     Example:
     - /search?query=Telangana,Paddy,Karimnagar
+    - /search?query=Paddy&limit=50&cursor=<next_cursor> (keyset pagination)
+    - /search?query=tamato Karimnager&mode=ranked (best matches first, typos tolerated)
+    - /search?query=ground nut&mode=ranked&match=all
     """
-    print(f'[API] Request: /search with query={query}')
+    print(f'[API] Request: /search with query={query} mode={mode}')
     
-    # Fetch and filter
-    df = fetch_data(limit=5000)
-    result = keyword_filter(df, query)
+    if mode == "ranked" and cursor:
+        raise HTTPException(status_code=400, detail="Ranked results page by offset, not cursor")
     
-    data = result.to_dict(orient='records')
-    return {
-        'data': data,
-        'count': len(data),
-        'query': query,
-        'source': 'Government of India API'
-    }
+    # Fetch and filter
+    df = await run_in_threadpool(fetch_data)
+    return conditional_json(request, df, search_payload, query=query, limit=limit, offset=offset,
+                            cursor=cursor, fields=fields, mode=mode, match=match, phrase=phrase,
+                            fuzzy=fuzzy)
 
 
 @app.post('/filter')
-async def filter_data(query: str = Form(..., description="Keywords to filter by")):
+async def filter_data(
+    query: str = Form(..., description="Keywords to filter by"),
+    limit: Optional[int] = Form(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (default: all matches)"),
+    offset: int = Form(0, ge=0, description="Number of matches to skip"),
+    cursor: Optional[str] = Form(None, description="Keyset cursor from a previous response's next_cursor"),
+    fields: Optional[str] = Form(None, description="Comma-separated columns to return")
+):
     """
     POST endpoint for filtering (useful for form submissions)
     """
     print(f'[API] Request: POST /filter with query={query}')
     
-    df = fetch_data(limit=5000)
-    result = keyword_filter(df, query)
+    df = await run_in_threadpool(fetch_data)
+    positions = keyword_match_positions(df, query)
     
-    data = result.to_dict(orient='records')
-    return {
-        'data': data,
-        'count': len(data),
+    return Response(encode_payload({
+        **paginate(df, positions, limit, offset, cursor, fields),
         'query': query,
-        'source': 'Government of India API'
+        'source': 'Government of India API',
+        'cache': cache_status()
+    }), media_type="application/json")
+
+
+@app.get('/prices')
+async def prices(
+    request: Request,
+    state: Optional[str] = Query(None, description="Exact state (e.g., 'Telangana')"),
+    district: Optional[str] = Query(None, description="Exact district (e.g., 'Karimnagar')"),
+    market: Optional[str] = Query(None, description="Exact market name"),
+    commodity: Optional[str] = Query(None, description="Exact commodity (e.g., 'Paddy(Dhan)(Common)')"),
+    variety: Optional[str] = Query(None, description="Exact variety"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum modal price (Rs/quintal)"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum modal price (Rs/quintal)"),
+    date_from: Optional[str] = Query(None, description="Earliest arrival date (dd/mm/yyyy or yyyy-mm-dd)"),
+    date_to: Optional[str] = Query(None, description="Latest arrival date (dd/mm/yyyy or yyyy-mm-dd)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (default: all matches)"),
+    offset: int = Query(0, ge=0, description="Number of matches to skip"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
+):
+    """
+    Structured price lookup - every filter must match (AND logic)
+    Exact filters are case-insensitive; the price range applies to modal_price
+    
+    Examples:
+    - /prices?state=Telangana&commodity=Cotton
+    - /prices?district=Karimnagar&min_price=2000&max_price=2500
+    - /prices?commodity=Tomato&date_from=2024-01-01&date_to=2024-01-31
+    """
+    print(f'[API] Request: /prices state={state} district={district} market={market} '
+          f'commodity={commodity} variety={variety} price={min_price}-{max_price} date={date_from}-{date_to}')
+    
+    filters = {
+        'state': state,
+        'district': district,
+        'market': market,
+        'commodity': commodity,
+        'variety': variety,
+    }
+    # Reject bad dates before touching the data
+    parse_date_param(date_from, 'date_from')
+    parse_date_param(date_to, 'date_to')
+    
+    df = await run_in_threadpool(fetch_data)
+    return conditional_json(request, df, prices_payload, filters=filters, min_price=min_price,
+                            max_price=max_price, date_from=date_from, date_to=date_to, limit=limit,
+                            offset=offset, cursor=cursor, fields=fields)
+
+
+@app.get('/aggregates')
+async def aggregates(
+    request: Request,
+    commodity: Optional[str] = Query(None, description="Commodity (e.g., 'Cotton'); omit for every commodity"),
+    state: Optional[str] = Query(None, description="Narrow to one state"),
+    district: Optional[str] = Query(None, description="Narrow to one district"),
+    by: Optional[str] = Query(None, pattern="^(state|district)$", description="Break a commodity down by 'state' or 'district'")
+):
+    """
+    Precomputed modal price statistics (min, max, median, mean, market count)
+    Computed once per dataset refresh, so every lookup is a dict access
+    
+    Examples:
+    - /aggregates (every commodity)
+    - /aggregates?commodity=Cotton
+    - /aggregates?commodity=Cotton&by=state
+    - /aggregates?commodity=Cotton&district=Karimnagar
+    """
+    if state and district:
+        raise HTTPException(status_code=400, detail="Pass state or district, not both")
+    df = await run_in_threadpool(fetch_data)
+    return conditional_json(request, df, aggregates_payload, commodity=commodity, state=state,
+                            district=district, by=by)
+
+
+@app.get('/history')
+async def history(
+    commodity: str = Query(..., description="Commodity (e.g., 'Cotton')"),
+    market: Optional[str] = Query(None, description="Market name; omit for every market"),
+    date_from: Optional[str] = Query(None, alias="from", description="Earliest arrival date (dd/mm/yyyy or yyyy-mm-dd)"),
+    date_to: Optional[str] = Query(None, alias="to", description="Latest arrival date (dd/mm/yyyy or yyyy-mm-dd)"),
+    limit: int = Query(5000, ge=1, le=50000, description="Maximum rows returned")
+):
+    """
+    Historical prices from every dataset refresh, plus a daily trend
+    Dates in this response are ISO (yyyy-mm-dd) for charting
+    
+    Examples:
+    - /history?commodity=Cotton
+    - /history?commodity=Cotton&market=Warangal&from=2024-01-01&to=2024-03-31
+    """
+    low = parse_date_param(date_from, 'from')
+    high = parse_date_param(date_to, 'to')
+    low = low.strftime('%Y-%m-%d') if low is not None else None
+    high = high.strftime('%Y-%m-%d') if high is not None else None
+    
+    store = get_history_store()
+    rows = await run_in_threadpool(store.history, commodity, market, low, high, limit)
+    trend = await run_in_threadpool(store.trend, commodity, market, low, high)
+    return {
+        'data': rows,
+        'count': len(rows),
+        'trend': trend,
+        'commodity': commodity,
+        'market': market,
+        'source': 'Mandi price history'
     }
 
 
@@ -306,6 +1245,43 @@ async def get_geography():
     }
 
 
+# Geography-only typeahead, used until the first GOI snapshot arrives
+GEOGRAPHY_SUGGEST = None
+
+
+@app.get('/suggest')
+async def suggest(
+    prefix: str = Query(..., min_length=1, description="Start of a name (e.g., 'kar')"),
+    field: Optional[str] = Query(None, pattern="^(commodity|market|district|state)$", description="Only suggest this kind of name"),
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions")
+):
+    """
+    Typeahead for commodity, market, district and state names
+    Any word of a name may match ("apmc" suggests every APMC market);
+    the most frequent names in the current data come first
+    
+    Example:
+    - /suggest?prefix=kar
+    - /suggest?prefix=tom&field=commodity&limit=5
+    """
+    global GEOGRAPHY_SUGGEST
+    
+    index = CACHED_INDEXES.get('suggest')
+    if index is None:
+        # Never block a keystroke on the upstream fetch
+        if CACHED_DATA is None:
+            start_background_refresh()
+        if GEOGRAPHY_SUGGEST is None:
+            GEOGRAPHY_SUGGEST = build_suggest_index(None)
+        index = GEOGRAPHY_SUGGEST
+    
+    return {
+        'success': True,
+        'prefix': prefix,
+        'suggestions': index.suggest(prefix, limit, field),
+    }
+
+
 @app.get('/', response_class=HTMLResponse)
 async def index():
     """Web UI for testing the API"""
@@ -360,7 +1336,7 @@ async def index():
 
 <div class="container">
   <h2>📊 Option 2: Get All Commodity Data</h2>
-  <p>Fetch all available commodity price records (up to 5000 records)</p>
+  <p>Fetch all available commodity price records (full national dataset)</p>
   <form onsubmit="getAllData(event)">
     <button type="submit" id="allBtn">📊 Fetch All Data</button>
   </form>
@@ -376,12 +1352,19 @@ async def index():
     <li><code>GET /scrape-all</code> - Get all data (optional: ?query=keyword)</li>
     <li><code>GET /search?query=Telangana,Paddy</code> - Search with keywords</li>
     <li><code>POST /filter</code> - Filter endpoint (form data)</li>
+    <li><code>GET /prices?state=Telangana&commodity=Cotton</code> - Exact filters with price and date ranges (AND logic)</li>
+    <li><code>GET /aggregates?commodity=Cotton&by=state</code> - Precomputed price statistics</li>
+    <li><code>GET /history?commodity=Cotton&market=Warangal</code> - Price history and daily trend</li>
+    <li><code>GET /suggest?prefix=kar</code> - Typeahead for commodity, market, district and state names</li>
   </ul>
   <div class="examples">
     <strong>Examples:</strong><br>
     /scrape-all?query=Paddy - All Paddy records<br>
     /search?query=Telangana - All Telangana records<br>
-    /search?query=Karimnagar,Paddy - Karimnagar OR Paddy records
+    /search?query=Karimnagar,Paddy - Karimnagar OR Paddy records<br>
+    /search?query=Paddy&limit=50&fields=market,modal_price - First 50 Paddy rows, 2 columns (follow next_cursor for more)<br>
+    /search?query=tamato Karimnager&mode=ranked - Best matches first, typos tolerated<br>
+    /scrape-all?format=ndjson - Stream every record as newline-delimited JSON
   </div>
 </div>
 
@@ -505,13 +1488,19 @@ if __name__ == "__main__":
     print("[UI] Web interface: http://127.0.0.1:8001")
     print("\n[ENDPOINTS]")
     print("  GET  /health          - Service health check")
+    print("  GET  /scheduler       - Upstream refresh schedule and last run per source")
     print("  GET  /scrape-all      - Get all commodity data (optional: ?query=keyword)")
     print("  GET  /search          - Search with keywords (?query=Telangana,Paddy)")
     print("  POST /filter          - Filter endpoint (form data)")
+    print("  GET  /prices          - Exact filters + price/date ranges (?state=Telangana&commodity=Cotton)")
+    print("  GET  /aggregates      - Price statistics per commodity/state/district (?commodity=Cotton&by=state)")
+    print("  GET  /history         - Price history and trend (?commodity=Cotton&market=Warangal&from=&to=)")
     print("\n[EXAMPLES]")
     print("  http://127.0.0.1:8001/scrape-all")
     print("  http://127.0.0.1:8001/scrape-all?query=Paddy")
     print("  http://127.0.0.1:8001/search?query=Telangana,Karimnagar")
+    print("  http://127.0.0.1:8001/search?query=Paddy&limit=50&fields=market,modal_price")
+    print("  http://127.0.0.1:8001/search?query=tamato%20Karimnager&mode=ranked")
     print("\n[INFO] Fetching data from Government of India API:")
     print(f"  {GOI_API_URL}")
     print("\n[STATUS] Service starting up...")
@@ -0,0 +1,309 @@
+"""
+Mandi Browser Pool
+A fixed number of warm headless Chrome sessions shared by the Selenium
+scrapers. Sessions are reused across requests, recycled after
+max_pages page loads or when they crash, and pages are read as soon as
+an explicit wait condition holds instead of after fixed sleeps.
+
+Drivers come from a factory, so tests can plug in a fake driver that
+serves local HTML fixtures (see mandi_fixtures.FakeDriver). Waits only use
+driver.find_elements / driver.execute_script and need no Selenium import.
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Selenium's By.CSS_SELECTOR, spelled out so waits work without Selenium
+CSS_SELECTOR = "css selector"
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_PAGES = 50  # Page loads before a session is replaced
+DEFAULT_WAIT_SECONDS = 20
+WAIT_POLL_SECONDS = 0.1
+
+# A wait condition: driver -> truthy once the page is ready to read
+WaitCondition = Callable[[object], bool]
+
+
+class PageTimeout(TimeoutError):
+    """The wait condition did not hold in time (the session stays usable)"""
+
+
+class BrowserUnavailable(RuntimeError):
+    """No browser could be started (Selenium / Chrome missing) or none freed up in time"""
+
+
+# ============================================================================
+# Wait conditions
+# ============================================================================
+
+def document_ready(driver) -> bool:
+    """document.readyState is 'complete'"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def element_present(css: str) -> WaitCondition:
+    """At least one element matches css"""
+    def condition(driver) -> bool:
+        return len(driver.find_elements(CSS_SELECTOR, css)) > 0
+    return condition
+
+
+def rows_present(css: str = "table tr", min_rows: int = 2) -> WaitCondition:
+    """
+    At least min_rows elements match css; the default waits for a table
+    with a header and one rendered data row (what the old fixed sleeps
+    after "table present" were waiting for)
+    """
+    def condition(driver) -> bool:
+        return len(driver.find_elements(CSS_SELECTOR, css)) >= min_rows
+    return condition
+
+
+def wait_until(driver, condition: WaitCondition, timeout: float = DEFAULT_WAIT_SECONDS,
+               poll: float = WAIT_POLL_SECONDS):
+    """Poll condition until it holds; raises PageTimeout after timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition(driver)
+        if result:
+            return result
+        if time.monotonic() >= deadline:
+            raise PageTimeout(f"wait condition not met within {timeout}s")
+        time.sleep(poll)
+
+
+# ============================================================================
+# Chrome sessions
+# ============================================================================
+
+_CHROMEDRIVER_PATH = {}
+
+
+def _chromedriver_path() -> Optional[str]:
+    """Download / locate chromedriver once per process (None: let Selenium resolve it)"""
+    if 'path' not in _CHROMEDRIVER_PATH:
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _CHROMEDRIVER_PATH['path'] = ChromeDriverManager().install()
+        except Exception as e:
+            print(f"[Browser] webdriver-manager unavailable ({e}), using Selenium's driver lookup")
+            _CHROMEDRIVER_PATH['path'] = None
+    return _CHROMEDRIVER_PATH['path']
+
+
+def chrome_driver_factory(undetected: bool = False, page_load_timeout: float = 30):
+    """
+    Factory for headless Chrome sessions (undetected-chromedriver when
+    undetected=True). Raises BrowserUnavailable if the packages are missing
+    """
+    def create():
+        try:
+            if undetected:
+                import undetected_chromedriver as uc
+                options = uc.ChromeOptions()
+            else:
+                from selenium import webdriver
+                from selenium.webdriver.chrome.service import Service
+                options = webdriver.ChromeOptions()
+                options.add_experimental_option("excludeSwitches", ["enable-automation"])
+                options.add_experimental_option('useAutomationExtension', False)
+        except ImportError as e:
+            packages = "undetected-chromedriver" if undetected else "selenium webdriver-manager"
+            raise BrowserUnavailable(f"{e}. Install with: pip install {packages}") from e
+
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1366,900')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        # Return from get() once the DOM is parsed; explicit waits do the rest
+        options.page_load_strategy = 'eager'
+
+        if undetected:
+            driver = uc.Chrome(options=options)
+        else:
+            path = _chromedriver_path()
+            service = Service(path) if path else Service()
+            driver = webdriver.Chrome(service=service, options=options)
+        driver.set_page_load_timeout(page_load_timeout)
+        return driver
+    return create
+
+
+class _Session:
+    """One pooled driver and how many pages it has loaded"""
+
+    __slots__ = ('driver', 'pages', 'created')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created = time.time()
+
+
+class BrowserPool:
+    """
+    Up to size browser sessions, each used by one caller at a time
+    Sessions are created on first use and then kept warm; a session is
+    quit and replaced after max_pages page loads or when a call on it
+    raises anything other than PageTimeout
+    """
+
+    def __init__(self, driver_factory: Callable[[], object], size: int = DEFAULT_POOL_SIZE,
+                 max_pages: int = DEFAULT_MAX_PAGES, name: str = "chrome"):
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_pages = max_pages
+        self.name = name
+        self._idle: List[_Session] = []  # Most recently returned last
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)  # Notified when a session or a slot frees up
+        self._open = 0  # Sessions alive (idle or checked out)
+        self._closed = False
+        self.counters = {'created': 0, 'recycled': 0, 'crashed': 0, 'pages': 0, 'timeouts': 0}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _checkout(self, timeout: float) -> _Session:
+        deadline = time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise BrowserUnavailable(f"{self.name} pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BrowserUnavailable(f"no {self.name} session free within {timeout}s")
+                self._available.wait(remaining)
+
+        started = time.time()
+        try:
+            driver = self.driver_factory()
+        except Exception:
+            with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self.counters['created'] += 1
+            opened = self._open
+        print(f"[Browser] Started {self.name} session in {time.time() - started:.1f}s "
+              f"({opened}/{self.size} open)")
+        return _Session(driver)
+
+    def _discard(self, session: _Session):
+        with self._available:
+            self._open -= 1
+            self._available.notify()  # A waiter may now start a new session
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    def _checkin(self, session: _Session):
+        with self._available:
+            recycle = not self._closed and session.pages >= self.max_pages
+            keep = not self._closed and not recycle
+            if recycle:
+                self.counters['recycled'] += 1
+            if keep:
+                self._idle.append(session)
+                self._available.notify()
+        if not keep:
+            self._discard(session)
+
+    @contextmanager
+    def session(self, acquire_timeout: float = 30):
+        """
+        Borrow a driver: `with pool.session() as driver: ...`
+        Each use counts as one page load towards max_pages
+        """
+        session = self._checkout(acquire_timeout)
+        try:
+            yield session.driver
+        except PageTimeout:
+            self._count('timeouts')
+            session.pages += 1
+            self._checkin(session)
+            raise
+        except BaseException:
+            self._count('crashed')
+            self._discard(session)
+            raise
+        session.pages += 1
+        self._count('pages')
+        self._checkin(session)
+
+    def fetch(self, url: str, wait_for: Optional[WaitCondition] = None,
+              timeout: float = DEFAULT_WAIT_SECONDS, retries: int = 1) -> str:
+        """
+        Load url and return the page source once wait_for holds
+        A crashed session is replaced and the load retried up to retries
+        times; PageTimeout is raised as is
+        """
+        wait_for = wait_for or document_ready
+        for attempt in range(retries + 1):
+            try:
+                with self.session() as driver:
+                    driver.get(url)
+                    wait_until(driver, wait_for, timeout)
+                    return driver.page_source
+            except (PageTimeout, BrowserUnavailable):
+                raise
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"[Browser] {self.name} session failed on {url} ({e}), retrying with a new one")
+
+    def warm(self):
+        """Start sessions up to size ahead of the first request"""
+        sessions = []
+        try:
+            while True:
+                with self._lock:
+                    if self._open >= self.size:
+                        break
+                sessions.append(self._checkout(0))
+        finally:
+            for session in sessions:
+                self._checkin(session)
+
+    def close(self):
+        """Quit every idle session; sessions in use are quit when returned"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()  # Waiters fail fast instead of timing out
+        for session in idle:
+            self._discard(session)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'name': self.name, 'size': self.size, 'open': self._open, 'idle': len(self._idle),
+                    'max_pages': self.max_pages, **self.counters}
+
+
+_POOLS: List[BrowserPool] = []
+
+
+def register_pool(pool: BrowserPool) -> BrowserPool:
+    """Track pool so its browsers are quit at interpreter exit"""
+    _POOLS.append(pool)
+    return pool
+
+
+@atexit.register
+def _close_pools():
+    for pool in _POOLS:
+        pool.close()
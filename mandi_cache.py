@@ -0,0 +1,181 @@
+"""
+Mandi Caching Utilities
+Small thread-safe caches shared by the mandi services, and a
+single-flight helper that collapses concurrent identical calls into one
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Size-bounded least-recently-used cache with hit/miss counters
+    With ttl (seconds) entries also expire that long after they were put;
+    an expired entry counts as a miss and is dropped when next looked up
+    With maxbytes, sizeof(value) is summed over the entries and the least
+    recently used are evicted to stay under it; a value larger than
+    maxbytes on its own is not stored
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None,
+                 maxbytes: Optional[int] = None, sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof or (lambda value: 0)
+        # key -> (value, monotonic expiry time or None, size in bytes)
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key: Hashable) -> None:
+        """Remove key; call with the lock held"""
+        self.bytes -= self._data.pop(key)[2]
+
+    def _live(self, key: Hashable) -> bool:
+        """key is present and not expired (drops it if expired); call with the lock held"""
+        if key not in self._data:
+            return False
+        expires = self._data[key][1]
+        if expires is not None and time.monotonic() >= expires:
+            self._drop(key)
+            self.expirations += 1
+            return False
+        return True
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            if self._live(key):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value; ttl overrides the cache's default for this entry"""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = (value, expires, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Membership test that leaves recency and hit/miss counters untouched"""
+        with self._lock:
+            return self._live(key)
+
+    def stats(self) -> Dict:
+        """Counters for health/status endpoints"""
+        lookups = self.hits + self.misses
+        stats = {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+        }
+        if self.maxbytes is not None:
+            stats.update(bytes=self.bytes, maxbytes=self.maxbytes)
+        return stats
+
+
+class _Flight:
+    """One in-progress call and its outcome"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution
+    The first caller runs fn; callers arriving while it runs block until it
+    finishes and get the same result (or the same exception). Nothing is
+    kept once the call returns: pair it with a cache for repeat requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.counters: Dict[Hashable, Dict[str, int]] = {}
+
+    def _count(self, key: Hashable, counter: str) -> None:
+        counts = self.counters.setdefault(key, {'executed': 0, 'coalesced': 0, 'failed': 0})
+        counts[counter] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """fn() run at most once at a time per key; waiters give up after timeout (TimeoutError)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._count(key, 'executed')
+            else:
+                flight.waiters += 1
+                self._count(key, 'coalesced')
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise TimeoutError(f"in-flight call for {key!r} still running after {timeout}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._count(key, 'failed')
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def in_flight(self) -> Dict[Hashable, int]:
+        """key -> callers currently waiting on it"""
+        with self._lock:
+            return {key: flight.waiters for key, flight in self._flights.items()}
+
+    def stats(self) -> Dict:
+        """Executed vs coalesced calls, per key and in total"""
+        with self._lock:
+            per_key = {key: dict(counts) for key, counts in self.counters.items()}
+            running = {key: flight.waiters for key, flight in self._flights.items()}
+        totals = {name: sum(c[name] for c in per_key.values()) for name in ('executed', 'coalesced', 'failed')}
+        return {**totals, 'in_flight': running, 'keys': per_key}
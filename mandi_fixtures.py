@@ -0,0 +1,126 @@
+"""
+Synthetic GOI mandi records for tests and benchmarks
+Mirrors the shape of data.gov.in resource 9ef84268 (all values are strings)
+Also saved scraper pages (fixtures/html) and a fake Selenium driver serving them
+"""
+
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+HTML_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'html')
+
+STATES = {
+    'Telangana': ['Karimnagar', 'Nizamabad', 'Hyderabad', 'Warangal', 'Khammam'],
+    'Andhra Pradesh': ['Krishna', 'Guntur', 'Kurnool', 'Chittoor'],
+    'Maharashtra': ['Pune', 'Nashik', 'Solapur', 'Ahmednagar', 'Nagpur'],
+    'Karnataka': ['Belgaum', 'Mysore', 'Raichur', 'Hassan'],
+    'Uttar Pradesh': ['Agra', 'Lucknow', 'Varanasi', 'Meerut', 'Bareilly'],
+    'Punjab': ['Ludhiana', 'Amritsar', 'Bathinda'],
+}
+
+COMMODITIES = {
+    'Paddy(Dhan)(Common)': (['Common', 'Fine', 'Sona Masuri'], 2200),
+    'Cotton': (['Other', 'Medium Staple', 'Long Staple'], 6500),
+    'Tomato': (['Hybrid', 'Local', 'Deshi'], 1500),
+    'Onion': (['Red', 'Local', 'Pole'], 1800),
+    'Groundnut': (['Bold', 'Local', 'TMV-2'], 5800),
+    'Maize': (['Hybrid/Local', 'Yellow'], 2000),
+    'Wheat': (['Dara', 'Lokwan', 'Other'], 2400),
+    'Turmeric': (['Bulb', 'Finger', 'Local'], 9000),
+    'Green Chilli': (['Green Chilly', 'Other'], 3000),
+    'Soyabean': (['Yellow', 'Other'], 4500),
+}
+
+GRADES = ['FAQ', 'Local', 'Medium', 'Non-FAQ']
+
+
+def sample_goi_records(n: int = 5000, seed: int = 42, arrival_date: str = '15/01/2024') -> List[Dict]:
+    """Generate n GOI-style records with realistic repetition of values"""
+    rng = random.Random(seed)
+    states = list(STATES)
+    commodities = list(COMMODITIES)
+    records = []
+    for _ in range(n):
+        state = rng.choice(states)
+        district = rng.choice(STATES[state])
+        commodity = rng.choice(commodities)
+        varieties, base = COMMODITIES[commodity]
+        modal = int(base * rng.uniform(0.8, 1.25))
+        records.append({
+            'state': state,
+            'district': district,
+            'market': f"{district} APMC" if rng.random() < 0.6 else f"{district}({rng.randint(1, 6)})",
+            'commodity': commodity,
+            'variety': rng.choice(varieties),
+            'grade': rng.choice(GRADES),
+            'arrival_date': arrival_date,
+            'min_price': str(int(modal * rng.uniform(0.8, 0.97))),
+            'max_price': str(int(modal * rng.uniform(1.03, 1.2))),
+            'modal_price': str(modal),
+        })
+    return records
+
+
+def load_html_fixture(name: str) -> str:
+    """A saved page from fixtures/html"""
+    with open(os.path.join(HTML_FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeDriver:
+    """
+    Stand-in for a Selenium WebDriver serving saved HTML instead of a browser
+    pages maps url -> html. Rendering is simulated: for render_delay seconds
+    after get(), find_elements sees no table rows and readyState is
+    'interactive', the way a JS-rendered page looks before its data arrives.
+    Loading a url in crash_urls raises, like a dead browser session
+    """
+
+    def __init__(self, pages: Dict[str, str], render_delay: float = 0.0,
+                 crash_urls: Optional[set] = None):
+        self.pages = pages
+        self.render_delay = render_delay
+        self.crash_urls = crash_urls or set()
+        self.visited: List[str] = []
+        self.quit_called = False
+        self._html = ''
+        self._loaded_at = 0.0
+
+    def set_page_load_timeout(self, seconds: float):
+        pass
+
+    def get(self, url: str):
+        if self.quit_called:
+            raise RuntimeError("invalid session id")
+        if url in self.crash_urls:
+            raise RuntimeError("chrome not reachable")
+        self.visited.append(url)
+        self._html = self.pages.get(url, '<html><body><h1>404 Not Found</h1></body></html>')
+        self._loaded_at = time.monotonic()
+
+    def _rendered(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self.render_delay
+
+    @property
+    def page_source(self) -> str:
+        return self._html
+
+    def find_elements(self, by: str, value: str) -> list:
+        if by != 'css selector':
+            raise NotImplementedError(by)
+        found = BeautifulSoup(self._html, 'html.parser').select(value)
+        if not self._rendered():
+            found = [el for el in found if el.name != 'tr' and not el.find('tr')]
+        return found
+
+    def execute_script(self, script: str):
+        if 'readyState' in script:
+            return 'complete' if self._rendered() else 'interactive'
+        return None
+
+    def quit(self):
+        self.quit_called = True
@@ -0,0 +1,262 @@
+"""
+Mandi Market Gazetteer
+Coordinates for APMC markets and a grid index for radius / nearest-market
+queries, so nearby-mandi lookups never scan every market
+
+Coordinates come from a market gazetteer CSV when one is installed
+(state,district,market,latitude,longitude). Markets it does not list fall
+back to the built-in town / district headquarters table below, which
+resolves most GOI market names ("Karimnagar APMC", "Hassan(5)") to their
+town.
+"""
+
+import csv
+import math
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mandi_distance import EARTH_RADIUS_KM, distance_matrix
+
+GAZETTEER_PATH = os.environ.get(
+    'MANDI_GAZETTEER',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'data', 'market_gazetteer.csv')
+)
+
+# (state, town or district headquarters, latitude, longitude)
+SEED_PLACES = [
+    ('Telangana', 'Hyderabad', 17.3850, 78.4867),
+    ('Telangana', 'Karimnagar', 18.4386, 79.1288),
+    ('Telangana', 'Nizamabad', 18.6725, 78.0941),
+    ('Telangana', 'Warangal', 17.9689, 79.5941),
+    ('Telangana', 'Khammam', 17.2473, 80.1514),
+    ('Telangana', 'Adilabad', 19.6641, 78.5320),
+    ('Telangana', 'Nalgonda', 17.0575, 79.2671),
+    ('Telangana', 'Mahbubnagar', 16.7488, 78.0035),
+    ('Telangana', 'Medak', 18.0530, 78.2610),
+    ('Telangana', 'Siddipet', 18.1018, 78.8520),
+    ('Andhra Pradesh', 'Vijayawada', 16.5062, 80.6480),
+    ('Andhra Pradesh', 'Guntur', 16.3067, 80.4365),
+    ('Andhra Pradesh', 'Kurnool', 15.8281, 78.0373),
+    ('Andhra Pradesh', 'Visakhapatnam', 17.6868, 83.2185),
+    ('Andhra Pradesh', 'Nellore', 14.4426, 79.9865),
+    ('Andhra Pradesh', 'Anantapur', 14.6819, 77.6006),
+    ('Andhra Pradesh', 'Kadapa', 14.4673, 78.8242),
+    ('Andhra Pradesh', 'Chittoor', 13.2172, 79.1003),
+    ('Andhra Pradesh', 'Ongole', 15.5057, 80.0499),
+    ('Andhra Pradesh', 'Kakinada', 16.9891, 82.2475),
+    ('Maharashtra', 'Pune', 18.5204, 73.8567),
+    ('Maharashtra', 'Baramati', 18.1514, 74.5777),
+    ('Maharashtra', 'Nashik', 19.9975, 73.7898),
+    ('Maharashtra', 'Solapur', 17.6599, 75.9064),
+    ('Maharashtra', 'Nagpur', 21.1458, 79.0882),
+    ('Maharashtra', 'Aurangabad', 19.8762, 75.3433),
+    ('Maharashtra', 'Kolhapur', 16.7050, 74.2433),
+    ('Maharashtra', 'Mumbai', 19.0760, 72.8777),
+    ('Maharashtra', 'Amravati', 20.9374, 77.7796),
+    ('Maharashtra', 'Latur', 18.4088, 76.5604),
+    ('Maharashtra', 'Jalgaon', 21.0077, 75.5626),
+    ('Maharashtra', 'Ahmednagar', 19.0948, 74.7480),
+    ('Maharashtra', 'Sangli', 16.8524, 74.5815),
+    ('Karnataka', 'Bangalore', 12.9716, 77.5946),
+    ('Karnataka', 'Mysore', 12.2958, 76.6394),
+    ('Karnataka', 'Hassan', 13.0072, 76.0962),
+    ('Karnataka', 'Hubli', 15.3647, 75.1240),
+    ('Karnataka', 'Belgaum', 15.8497, 74.4977),
+    ('Karnataka', 'Davangere', 14.4644, 75.9218),
+    ('Karnataka', 'Shimoga', 13.9299, 75.5681),
+    ('Karnataka', 'Raichur', 16.2076, 77.3463),
+    ('Karnataka', 'Gulbarga', 17.3297, 76.8343),
+    ('Karnataka', 'Bellary', 15.1394, 76.9214),
+    ('Punjab', 'Ludhiana', 30.9010, 75.8573),
+    ('Punjab', 'Amritsar', 31.6340, 74.8723),
+    ('Punjab', 'Bathinda', 30.2110, 74.9455),
+    ('Punjab', 'Jalandhar', 31.3260, 75.5762),
+    ('Punjab', 'Patiala', 30.3398, 76.3869),
+    ('Punjab', 'Moga', 30.8165, 75.1717),
+    ('Punjab', 'Sangrur', 30.2458, 75.8421),
+    ('Haryana', 'Karnal', 29.6857, 76.9905),
+    ('Haryana', 'Hisar', 29.1492, 75.7217),
+    ('Haryana', 'Sirsa', 29.5349, 75.0289),
+    ('Uttar Pradesh', 'Lucknow', 26.8467, 80.9462),
+    ('Uttar Pradesh', 'Bareilly', 28.3670, 79.4304),
+    ('Uttar Pradesh', 'Agra', 27.1767, 78.0081),
+    ('Uttar Pradesh', 'Kanpur', 26.4499, 80.3319),
+    ('Uttar Pradesh', 'Varanasi', 25.3176, 82.9739),
+    ('Uttar Pradesh', 'Meerut', 28.9845, 77.7064),
+    ('Uttar Pradesh', 'Prayagraj', 25.4358, 81.8463),
+    ('Uttar Pradesh', 'Gorakhpur', 26.7606, 83.3732),
+    ('Madhya Pradesh', 'Indore', 22.7196, 75.8577),
+    ('Madhya Pradesh', 'Bhopal', 23.2599, 77.4126),
+    ('Madhya Pradesh', 'Ujjain', 23.1765, 75.7885),
+    ('Madhya Pradesh', 'Jabalpur', 23.1815, 79.9864),
+    ('Madhya Pradesh', 'Gwalior', 26.2183, 78.1828),
+    ('Gujarat', 'Ahmedabad', 23.0225, 72.5714),
+    ('Gujarat', 'Rajkot', 22.3039, 70.8022),
+    ('Gujarat', 'Surat', 21.1702, 72.8311),
+    ('Gujarat', 'Gondal', 21.9612, 70.7939),
+    ('Gujarat', 'Unjha', 23.8037, 72.3914),
+    ('Rajasthan', 'Jaipur', 26.9124, 75.7873),
+    ('Rajasthan', 'Kota', 25.2138, 75.8648),
+    ('Rajasthan', 'Jodhpur', 26.2389, 73.0243),
+    ('Rajasthan', 'Bikaner', 28.0229, 73.3119),
+    ('Tamil Nadu', 'Chennai', 13.0827, 80.2707),
+    ('Tamil Nadu', 'Coimbatore', 11.0168, 76.9558),
+    ('Tamil Nadu', 'Madurai', 9.9252, 78.1198),
+    ('Tamil Nadu', 'Salem', 11.6643, 78.1460),
+    ('Tamil Nadu', 'Erode', 11.3410, 77.7172),
+    ('Kerala', 'Ernakulam', 9.9312, 76.2673),
+    ('Kerala', 'Thiruvananthapuram', 8.5241, 76.9366),
+    ('West Bengal', 'Kolkata', 22.5726, 88.3639),
+    ('West Bengal', 'Bardhaman', 23.2324, 87.8615),
+    ('Odisha', 'Cuttack', 20.4625, 85.8830),
+    ('Odisha', 'Bhubaneswar', 20.2961, 85.8245),
+    ('Bihar', 'Patna', 25.5941, 85.1376),
+]
+
+# Words GOI appends to a town name to name its market yard
+_MARKET_SUFFIXES = re.compile(r"\b(apmc|mandi|market|yard|krishi upaj|grain|vegetable|f&v)\b")
+
+
+def place_key(name) -> str:
+    """Case- and spacing-insensitive key for a place name"""
+    return " ".join(str(name).lower().split())
+
+
+def market_base_name(market) -> str:
+    """Town part of a GOI market name, e.g. Karimnagar APMC or Hassan(5) -> karimnagar, hassan"""
+    name = re.sub(r"\(.*?\)", " ", str(market).lower())
+    name = _MARKET_SUFFIXES.sub(" ", name)
+    return " ".join(re.sub(r"[^\w\s]", " ", name).split())
+
+
+class MarketGazetteer:
+    """
+    Market and place coordinates with name resolution
+    locate() tries, in order: the market itself, the town in its name,
+    then its district; it reports which one matched as the precision
+    """
+
+    def __init__(self, markets: Optional[List[Dict]] = None, places: Optional[List[tuple]] = None):
+        # place_key(market) -> [(state key, lat, lon)]
+        self.markets: Dict[str, List[tuple]] = defaultdict(list)
+        self.places: Dict[str, List[tuple]] = defaultdict(list)
+        for row in markets or []:
+            self.markets[place_key(row['market'])].append(
+                (place_key(row.get('state') or ''), float(row['latitude']), float(row['longitude'])))
+        for state, place, lat, lon in (SEED_PLACES if places is None else places):
+            self.places[place_key(place)].append((place_key(state), lat, lon))
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH, extra_markets: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Gazetteer from the market CSV at path (if installed) plus
+        extra_markets, a {market: (lat, lon)} mapping such as MARKET_GPS
+        """
+        markets = [
+            {'market': name, 'latitude': lat, 'longitude': lon}
+            for name, (lat, lon) in (extra_markets or {}).items()
+        ]
+        if os.path.exists(path):
+            try:
+                with open(path, newline='', encoding='utf-8') as f:
+                    markets += [row for row in csv.DictReader(f) if row.get('latitude') and row.get('longitude')]
+            except (OSError, KeyError, ValueError) as e:
+                print(f"[Gazetteer] ❌ Could not read {path}: {e}")
+        gazetteer = cls(markets)
+        print(f"[Gazetteer] {sum(map(len, gazetteer.markets.values()))} markets, "
+              f"{sum(map(len, gazetteer.places.values()))} towns with coordinates")
+        return gazetteer
+
+    @staticmethod
+    def _pick(candidates: List[tuple], state: str) -> Optional[Tuple[float, float]]:
+        """Candidate in the given state, or the only candidate if the state is unknown"""
+        for cand_state, lat, lon in candidates:
+            if not cand_state or not state or cand_state == state:
+                return lat, lon
+        return None
+
+    def locate(self, market: str, district: Optional[str] = None,
+               state: Optional[str] = None) -> Optional[Tuple[float, float, str]]:
+        """(latitude, longitude, precision) for a market, precision 'market' | 'town' | 'district'"""
+        state = place_key(state or '')
+        found = self._pick(self.markets.get(place_key(market), []), state)
+        if found:
+            return found + ('market',)
+        base = market_base_name(market)
+        found = self._pick(self.markets.get(base, []), state) or self._pick(self.places.get(base, []), state)
+        if found:
+            return found + ('town',)
+        if district:
+            found = self._pick(self.places.get(place_key(district), []), state)
+            if found:
+                return found + ('district',)
+        return None
+
+
+class GridIndex:
+    """
+    Points bucketed into cell_deg x cell_deg lat/lon cells
+    A radius query visits only the cells overlapping the circle's bounding
+    box and computes exact distances for the points in them
+    """
+
+    def __init__(self, lats, lons, cell_deg: float = 0.5):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+
+        rows = np.floor(self.lats / cell_deg).astype(np.int64)
+        cols = np.floor(self.lons / cell_deg).astype(np.int64)
+        buckets = defaultdict(list)
+        for i, key in enumerate(zip(rows.tolist(), cols.tolist())):
+            buckets[key].append(i)
+        self.cells = {key: np.array(ids, dtype=np.int64) for key, ids in buckets.items()}
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Points within radius_km of (lat, lon): (ids, distances), nearest first"""
+        dlat = radius_km / 111.195
+        dlon = radius_km / (111.195 * max(math.cos(math.radians(lat)), 0.01))
+        row_lo, row_hi = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        col_lo, col_hi = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self.cells):
+            ids = [np.arange(len(self.lats))]
+        else:
+            ids = [
+                self.cells[(r, c)]
+                for r in range(row_lo, row_hi + 1)
+                for c in range(col_lo, col_hi + 1)
+                if (r, c) in self.cells
+            ]
+        if not ids:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+        ids = np.concatenate(ids)
+        dist = distance_matrix([lat], [lon], self.lats[ids], self.lons[ids])[0]
+        keep = dist <= radius_km
+        ids, dist = ids[keep], dist[keep]
+        order = np.lexsort((ids, dist))
+        return ids[order], dist[order]
+
+    def nearest(self, lat: float, lon: float, k: int,
+                max_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k points nearest to (lat, lon), optionally capped at max_km
+        Searches a growing radius; any k points found inside it are
+        guaranteed to be the k nearest overall
+        """
+        radius = self.cell_deg * 111.195
+        limit = max_km if max_km is not None else math.pi * EARTH_RADIUS_KM
+        while True:
+            radius = min(radius, limit)
+            ids, dist = self.within(lat, lon, radius)
+            if len(ids) >= k or radius >= limit:
+                return ids[:k], dist[:k]
+            radius *= 2
@@ -0,0 +1,151 @@
+"""
+Mandi HTTP Caching Helpers
+ETags for conditional GETs and precompressed response bodies, so
+unchanged datasets are answered with 304 and repeated large responses are
+served from bytes compressed once
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+try:
+    import brotli  # Optional: adds Content-Encoding: br
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Preference order when a client accepts several encodings
+ENCODING_PREFERENCE = ['br', 'gzip', 'identity']
+
+
+def canonical_query(params: Iterable[Tuple[str, str]]) -> str:
+    """Query string with parameters sorted, so equal queries share one key"""
+    return urlencode(sorted(params))
+
+
+def make_etag(version, path: str, query: str) -> str:
+    """
+    Weak ETag for a response: the dataset version plus a digest of the
+    request. Weak because one tag covers every content coding (identity,
+    gzip, br) of the same body
+    """
+    digest = hashlib.sha1(f"{path}?{query}".encode('utf-8')).hexdigest()[:16]
+    return f'W/"v{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 section 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """
+    Encodings the client accepts (q > 0) that compress_body can produce,
+    in ENCODING_PREFERENCE order (br only with the brotli package)
+    """
+    accepted = {'identity'}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if not name:
+            continue
+        if name == '*':
+            if quality > 0:
+                accepted.update(ENCODING_PREFERENCE)
+        elif quality > 0:
+            accepted.add(name)
+        else:
+            accepted.discard(name)
+    if brotli is None:
+        accepted.discard('br')
+    return [e for e in ENCODING_PREFERENCE if e in accepted]
+
+
+def compress_body(body: bytes, encodings: Optional[Iterable[str]] = None) -> Dict[str, bytes]:
+    """
+    Body variants by content coding: always identity, plus gzip and (when
+    the brotli package is installed) br for bodies worth compressing
+    encodings limits which compressed variants are produced
+    """
+    variants = {'identity': body}
+    if len(body) < MIN_COMPRESS_BYTES:
+        return variants
+    wanted = set(ENCODING_PREFERENCE if encodings is None else encodings)
+    if 'gzip' in wanted:
+        variants['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if 'br' in wanted and brotli is not None:
+        variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+def variants_size(variants: Dict[str, bytes]) -> int:
+    """Bytes held by every variant of a body (LRUCache sizeof)"""
+    return sum(len(body) for body in variants.values())
+
+
+def pick_variant(variants: Dict[str, bytes], accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+    """Best variant the client accepts: (encoding, body)"""
+    for encoding in accepted_encodings(accept_encoding):
+        if encoding in variants:
+            return encoding, variants[encoding]
+    return 'identity', variants['identity']
+
+
+class QueryPopularity:
+    """
+    Thread-safe request counts per (path, canonical query), with the parsed
+    arguments of each query so popular responses can be rebuilt ahead of time
+    Tracks at most max_keys queries; the rarer half is dropped when full
+    """
+
+    def __init__(self, max_keys: int = 2048):
+        self.max_keys = max_keys
+        self._counts: Counter = Counter()
+        self._args: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Tuple[str, str], args: Optional[Dict] = None) -> int:
+        """Count one request; returns the query's count so far"""
+        with self._lock:
+            self._counts[key] += 1
+            self._args[key] = args or {}
+            count = self._counts[key]
+            if len(self._counts) > self.max_keys:
+                self._counts = Counter(dict(self._counts.most_common(self.max_keys // 2)))
+                self._args = {k: self._args[k] for k in self._counts}
+            return count
+
+    def count(self, key: Tuple[str, str]) -> int:
+        with self._lock:
+            return self._counts.get(key, 0)
+
+    def top(self, n: int) -> List[Tuple[Tuple[str, str], Dict, int]]:
+        """The n most requested queries: (key, args, count)"""
+        with self._lock:
+            return [(key, self._args[key], count) for key, count in self._counts.most_common(n)]
@@ -0,0 +1,400 @@
+"""
+Mandi Search Indexes
+In-memory indexes and lookup tables built once per GOI dataset refresh
+Used by mandi_app_service.py so queries do not rescan every row
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+
+def tokenize_query(query: str) -> List[str]:
+    """
+    Split a keyword query the same way keyword_filter always has:
+    by space, comma and dot, lower-cased
+    """
+    raw = query.replace(",", " ").replace(".", " ").split()
+    return [k.lower().strip() for k in raw if k.strip()]
+
+
+class KeywordIndex:
+    """
+    Inverted token index over every cell of a DataFrame
+
+    Each cell is rendered with str(), lower-cased and split on whitespace.
+    A keyword never contains whitespace, so "keyword in combined row text"
+    holds exactly when the keyword is a substring of one of the row's
+    tokens. Queries therefore resolve by finding the matching vocabulary
+    tokens and taking the union of their posting lists.
+
+    Postings are stored flat (CSR): the rows of token i are
+    rows[offsets[i]:offsets[i + 1]], so a refresh delta can renumber and
+    extend them with whole-array operations (see apply_delta)
+    """
+
+    def __init__(self, df: pd.DataFrame, text_df: Optional[pd.DataFrame] = None):
+        """
+        df is the frame queries run against; text_df (same rows) supplies
+        the cell text when df holds typed columns, so matching stays on
+        the values exactly as the API delivered them
+        """
+        source = df if text_df is None else text_df
+        tokens, rows = _token_postings(source)
+        self._install(df, tokens, np.repeat(np.arange(len(tokens)), [len(r) for r in rows]),
+                      np.concatenate(rows) if rows else np.array([], dtype=np.int64))
+
+    def _install(self, df: pd.DataFrame, tokens: List[str], token_ids: np.ndarray, rows: np.ndarray):
+        """Build the sorted vocabulary, flat postings and substring blob from (token, row) pairs"""
+        self.df = df
+        self.size = len(df)
+
+        vocab = sorted(set(tokens))
+        rank = {token: i for i, token in enumerate(vocab)}
+        ids = np.array([rank[t] for t in tokens], dtype=np.int64)[token_ids]
+        # One sort over (token id, row) keys; np.unique also drops a row
+        # listed twice for a token that appears in two of its columns
+        width = max(self.size, 1)
+        keys = np.sort(ids * width + rows)
+        keys = keys[_first_of_runs(keys)]
+        ids, self.rows = np.divmod(keys, width)
+
+        # Tokens left without rows (after a delta) drop out of the vocabulary
+        used = ids[_first_of_runs(ids)]
+        if len(used) < len(vocab):
+            vocab = [vocab[i] for i in used]
+            ids = np.searchsorted(used, ids)
+        self.vocab = vocab
+        self.offsets = np.searchsorted(ids, np.arange(len(vocab) + 1))
+
+        # Substring index: every token in one newline-separated blob, so a
+        # keyword is located with C-level str.find instead of a Python loop
+        self.blob = "\n".join(self.vocab)
+        self.starts = []
+        offset = 0
+        for token in self.vocab:
+            self.starts.append(offset)
+            offset += len(token) + 1
+
+    def postings(self, token_id: int) -> np.ndarray:
+        """Sorted row positions of one vocabulary token"""
+        return self.rows[self.offsets[token_id]:self.offsets[token_id + 1]]
+
+    def apply_delta(self, df: pd.DataFrame, remap: np.ndarray, added_text: pd.DataFrame) -> "KeywordIndex":
+        """
+        Index for the next snapshot without re-tokenising unchanged rows
+        remap[old position] is the row's new position (-1 if deleted or
+        updated); added_text holds the text of the rows appended after the
+        kept ones. Returns a new index, this one stays valid for readers.
+        """
+        old_ids = np.repeat(np.arange(len(self.vocab)), np.diff(self.offsets))
+        old_rows = remap[self.rows]
+        kept = old_rows >= 0
+
+        tokens, rows = _token_postings(added_text)
+        base = len(df) - len(added_text)
+        new_ids = np.repeat(np.arange(len(tokens)), [len(r) for r in rows]) + len(self.vocab)
+
+        index = KeywordIndex.__new__(KeywordIndex)
+        index._install(
+            df,
+            self.vocab + tokens,
+            np.concatenate([old_ids[kept], new_ids]),
+            np.concatenate([old_rows[kept]] + [r + base for r in rows]),
+        )
+        return index
+
+    def matching_tokens(self, keyword: str) -> List[int]:
+        """Return ids of vocabulary tokens that contain keyword"""
+        found = []
+        pos = self.blob.find(keyword)
+        while pos != -1:
+            token_id = bisect_right(self.starts, pos) - 1
+            found.append(token_id)
+            # Skip the rest of this token; one hit is enough
+            if token_id + 1 >= len(self.starts):
+                break
+            pos = self.blob.find(keyword, self.starts[token_id + 1])
+        return found
+
+    def mask(self, keywords: List[str]) -> np.ndarray:
+        """Boolean row mask for rows matching ANY keyword (OR logic)"""
+        mask = np.zeros(self.size, dtype=bool)
+        for keyword in keywords:
+            for token_id in self.matching_tokens(keyword):
+                mask[self.postings(token_id)] = True
+        return mask
+
+
+def _first_of_runs(values: np.ndarray) -> np.ndarray:
+    """Mask of the first element of each run of equal values in a sorted array"""
+    mask = np.ones(len(values), dtype=bool)
+    mask[1:] = values[1:] != values[:-1]
+    return mask
+
+
+def _token_postings(source: pd.DataFrame):
+    """
+    (token, rows) pairs for every cell of source, as two parallel lists
+    Values repeat heavily (states, markets, commodities), so each distinct
+    value of a column is tokenised once and shares its row ids
+    """
+    tokens: List[str] = []
+    rows: List[np.ndarray] = []
+    for col in source.columns:
+        codes, uniques = pd.factorize(source[col], use_na_sentinel=False)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        for i, value in enumerate(uniques):
+            value_rows = order[bounds[i]:bounds[i + 1]]
+            for token in set(str(value).lower().split()):
+                tokens.append(token)
+                rows.append(value_rows)
+    return tokens, rows
+
+
+def normalize_value(value) -> str:
+    """Key used by GroupIndex lookups: trimmed, case-insensitive"""
+    return str(value).strip().lower()
+
+
+class GroupIndex:
+    """
+    Hash indexes for exact-match filters: per column, a dict from the
+    normalised value to the sorted row positions holding it
+    Several filters combine with AND by intersecting position arrays,
+    smallest first
+    """
+
+    EMPTY = np.array([], dtype=np.int64)
+
+    def __init__(self, df: pd.DataFrame, columns: List[str]):
+        self.df = df
+        self.size = len(df)
+        self.columns: Dict[str, Dict[str, np.ndarray]] = {}
+
+        for col in columns:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col])
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            groups: Dict[str, np.ndarray] = {}
+            for i, value in enumerate(uniques):
+                rows = order[bounds[i]:bounds[i + 1]]
+                key = normalize_value(value)
+                # Values differing only in case/spacing share one key
+                groups[key] = np.union1d(groups[key], rows) if key in groups else rows
+            self.columns[col] = groups
+
+    def apply_delta(self, df: pd.DataFrame, remap: np.ndarray, added: pd.DataFrame) -> "GroupIndex":
+        """
+        Index for the next snapshot: renumber the kept rows through remap
+        (-1 = dropped) and index only the added rows appended after them
+        Kept rows keep their relative order, so position lists stay sorted
+        """
+        base = len(df) - len(added)
+        fresh = GroupIndex(added, list(self.columns))
+        index = GroupIndex.__new__(GroupIndex)
+        index.df = df
+        index.size = len(df)
+        index.columns = {}
+        for col, old_groups in self.columns.items():
+            groups: Dict[str, np.ndarray] = {}
+            for key, rows in old_groups.items():
+                rows = remap[rows]
+                rows = rows[rows >= 0]
+                if len(rows):
+                    groups[key] = rows
+            for key, rows in fresh.columns.get(col, {}).items():
+                rows = rows + base
+                groups[key] = np.concatenate([groups[key], rows]) if key in groups else rows
+            index.columns[col] = groups
+        return index
+
+    def lookup(self, column: str, value) -> np.ndarray:
+        """Sorted row positions where column equals value"""
+        return self.columns.get(column, {}).get(normalize_value(value), self.EMPTY)
+
+    def values(self, column: str) -> Dict[str, int]:
+        """Normalised values of a column with their row counts"""
+        return {key: len(rows) for key, rows in self.columns.get(column, {}).items()}
+
+    def positions(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """
+        Row positions matching every filter (AND)
+        None and blank values are no filter; returns None when no filter
+        is left (every row matches)
+        """
+        lists = [self.lookup(col, value) for col, value in filters.items()
+                 if value is not None and normalize_value(value)]
+        if not lists:
+            return None
+        lists.sort(key=len)
+        result = lists[0]
+        for rows in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+
+class PrefixIndex:
+    """
+    Typeahead over names (commodities, markets, districts, states)
+
+    Every name is entered once per word start ("Karimnagar APMC" under
+    "karimnagar apmc" and "apmc") into one sorted array, so a prefix
+    resolves to a contiguous slice with two binary searches. Names carry
+    a precomputed rank (most frequent first), so the top N of a slice is
+    a partial sort of small integers.
+    """
+
+    def __init__(self, names: Dict[str, Dict[str, int]]):
+        """names maps field -> display name -> frequency"""
+        self.names: List[tuple] = []
+        entries = []
+        for field, values in names.items():
+            for display, count in values.items():
+                text = normalize_value(display)
+                if not text:
+                    continue
+                name_id = len(self.names)
+                self.names.append((field, display, int(count)))
+                starts = {0} | {m.end() for m in re.finditer(r"\W+", text)}
+                entries.extend((text[start:], name_id) for start in starts if start < len(text))
+        entries.sort()
+
+        self.keys = [key for key, _ in entries]
+        self.entry_names = np.array([name_id for _, name_id in entries], dtype=np.int64)
+        self.fields = np.array([field for field, _, _ in self.names], dtype=object)
+        order = sorted(range(len(self.names)), key=lambda i: (-self.names[i][2], normalize_value(self.names[i][1])))
+        self.rank = np.empty(len(self.names), dtype=np.int64)
+        self.rank[order] = np.arange(len(self.names))
+
+    def suggest(self, prefix: str, limit: int = 10, field: Optional[str] = None) -> List[Dict]:
+        """Most frequent names with a word starting with prefix"""
+        prefix = normalize_value(prefix)
+        if not prefix:
+            return []
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        ids = np.unique(self.entry_names[lo:hi])
+        if field:
+            ids = ids[self.fields[ids] == field]
+        ranks = self.rank[ids]
+        if len(ids) > limit:
+            keep = np.argpartition(ranks, limit - 1)[:limit]
+            ids, ranks = ids[keep], ranks[keep]
+        ids = ids[np.argsort(ranks)]
+        return [
+            {'value': self.names[i][1], 'field': self.names[i][0], 'count': self.names[i][2]}
+            for i in ids
+        ]
+
+
+class PriceAggregates:
+    """
+    Modal price statistics per commodity, per (commodity, state) and per
+    (commodity, district), computed once per refresh with one vectorised
+    groupby per level and stored as dicts for constant-time lookup
+    """
+
+    LEVELS = {
+        'commodity': ['commodity'],
+        'state': ['commodity', 'state'],
+        'district': ['commodity', 'district'],
+    }
+
+    def __init__(self, df: pd.DataFrame, price_field: str = 'modal_price'):
+        self.df = df
+        self.price_field = price_field
+        # level -> normalised key tuple -> stats
+        self.tables: Dict[str, Dict[tuple, Dict]] = {level: {} for level in self.LEVELS}
+        # level -> normalised commodity -> stats for every group of it
+        self.by_commodity: Dict[str, Dict[str, List[Dict]]] = {}
+        self._add_groups(df)
+        self._index_commodities()
+
+    def _add_groups(self, df: pd.DataFrame):
+        """
+        Compute stats for every group present in df into self.tables
+        Groups are formed on normalised values, so names differing only in
+        case/spacing (Paddy, PADDY) share one group shown under the first
+        spelling seen
+        """
+        price_field = self.price_field
+        for level, keys in self.LEVELS.items():
+            if df.empty or any(k not in df.columns for k in keys) or price_field not in df.columns:
+                continue
+            present = df[keys].notna().all(axis=1).to_numpy()
+            frame = df[present]
+            normalised_keys = [frame[k].map(normalize_value).rename(f"_{k}") for k in keys]
+            grouped = frame.groupby(normalised_keys, observed=True, sort=True).agg(
+                **{k: (k, 'first') for k in keys},
+                min_price=(price_field, 'min'),
+                max_price=(price_field, 'max'),
+                median_price=(price_field, 'median'),
+                mean_price=(price_field, 'mean'),
+                market_count=('market', 'nunique'),
+                records=(price_field, 'size'),
+            )
+            for normalised, row in zip(grouped.index, grouped.itertuples(index=False)):
+                normalised = normalised if isinstance(normalised, tuple) else (normalised,)
+                stats = {k: str(getattr(row, k)) for k in keys}
+                stats.update({
+                    'min_price': _round(row.min_price),
+                    'max_price': _round(row.max_price),
+                    'median_price': _round(row.median_price),
+                    'mean_price': _round(row.mean_price),
+                    'market_count': int(row.market_count),
+                    'records': int(row.records),
+                })
+                self.tables[level][normalised] = stats
+
+    def _index_commodities(self):
+        """Order groups by key and list them per commodity"""
+        self.tables = {level: dict(sorted(table.items())) for level, table in self.tables.items()}
+        self.by_commodity = {}
+        for level, table in self.tables.items():
+            self.by_commodity[level] = defaultdict(list)
+            for normalised, stats in table.items():
+                self.by_commodity[level][normalised[0]].append(stats)
+
+    def apply_delta(self, df: pd.DataFrame, commodities: Set[str], rows: np.ndarray) -> "PriceAggregates":
+        """
+        Aggregates for the next snapshot, recomputing only the groups of
+        commodities touched by a delta (normalised names); rows are the
+        positions of those commodities in df. Other groups are reused.
+        """
+        aggregates = PriceAggregates.__new__(PriceAggregates)
+        aggregates.df = df
+        aggregates.price_field = self.price_field
+        aggregates.tables = {
+            level: {key: stats for key, stats in table.items() if key[0] not in commodities}
+            for level, table in self.tables.items()
+        }
+        aggregates._add_groups(df.iloc[rows])
+        aggregates._index_commodities()
+        return aggregates
+
+    def get(self, level: str, *key) -> Optional[Dict]:
+        """Stats for one group, e.g. get('state', 'Cotton', 'Telangana')"""
+        return self.tables.get(level, {}).get(tuple(normalize_value(k) for k in key))
+
+    def for_commodity(self, level: str, commodity: str) -> List[Dict]:
+        """Stats for every state or district group of a commodity"""
+        return self.by_commodity.get(level, {}).get(normalize_value(commodity), [])
+
+    def all(self, level: str = 'commodity') -> List[Dict]:
+        """Every group at a level"""
+        return list(self.tables.get(level, {}).values())
+
+
+def _round(value) -> Optional[float]:
+    """Round a price statistic for output (None for missing)"""
+    return None if pd.isna(value) else round(float(value), 2)
@@ -0,0 +1,314 @@
+"""
+GOI Mandi Dataset Ingester
+Fetches the full data.gov.in daily mandi price resource page by page
+Pages are fetched concurrently on a bounded thread pool with per-page retries
+Successive snapshots are diffed by record hash so a refresh only has to
+apply what changed
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Column order of the data.gov.in daily mandi price resource
+GOI_FIELDS = [
+    'state', 'district', 'market', 'commodity', 'variety', 'grade',
+    'arrival_date', 'min_price', 'max_price', 'modal_price',
+]
+
+# Typed representation of those columns
+GOI_CATEGORY_FIELDS = ['state', 'district', 'market', 'commodity', 'variety', 'grade']
+GOI_PRICE_FIELDS = ['min_price', 'max_price', 'modal_price']
+GOI_DATE_FIELD = 'arrival_date'
+GOI_DATE_FORMAT = '%d/%m/%Y'
+
+# Natural key of a record: one price per market/commodity/variety/grade/day
+GOI_KEY_FIELDS = ['state', 'district', 'market', 'commodity', 'variety', 'grade', 'arrival_date']
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+
+_STATS_LOCK = threading.Lock()
+
+
+class IngestError(Exception):
+    """Raised when the dataset could not be fetched completely"""
+
+
+def _fetch_page(session: requests.Session, url: str, params: Dict, offset: int, page_size: int,
+                timeout: float, retries: int, stats: Dict) -> Dict:
+    """Fetch one offset page, retrying with exponential backoff"""
+    page_params = dict(params, offset=offset, limit=page_size)
+    last_error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            with _STATS_LOCK:
+                stats['retries'] += 1
+            time.sleep(min(0.5 * 2 ** (attempt - 1), 8))
+        try:
+            response = session.get(url, params=page_params, timeout=timeout)
+            if response.status_code != 200:
+                last_error = f"HTTP {response.status_code}"
+                continue
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            last_error = str(e)
+    raise IngestError(f"Page at offset {offset} failed after {retries + 1} attempts: {last_error}")
+
+
+def fetch_all_records(url: str, api_key: str, page_size: int = DEFAULT_PAGE_SIZE,
+                      max_workers: int = DEFAULT_WORKERS, retries: int = DEFAULT_RETRIES,
+                      timeout: float = 15, max_records: Optional[int] = None,
+                      headers: Optional[Dict] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Fetch every record of a data.gov.in resource
+
+    The first page reports the resource's "total", the remaining offsets are
+    then fetched concurrently. If the API omits "total", pages are fetched in
+    waves of max_workers until a short page is returned.
+    Pages are assembled in offset order into one DataFrame with GOI_FIELDS
+    first. Raises IngestError if any page fails after its retries.
+
+    Returns (DataFrame, stats) where stats reports pages, records, seconds,
+    records_per_second and pages_per_second
+    """
+    started = time.time()
+    stats = {'pages': 0, 'records': 0, 'retries': 0, 'total_reported': None}
+    params = {'api-key': api_key, 'format': 'json'}
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+
+    if max_records is not None:
+        page_size = min(page_size, max_records)
+
+    pages: Dict[int, List[Dict]] = {}
+    try:
+        first = _fetch_page(session, url, params, 0, page_size, timeout, retries, stats)
+        pages[0] = first.get('records', [])
+        total = first.get('total')
+        try:
+            total = int(total) if total is not None else None
+        except (TypeError, ValueError):
+            total = None
+        stats['total_reported'] = total
+        if max_records is not None:
+            total = min(total, max_records) if total is not None else max_records
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            def fetch(offset):
+                return _fetch_page(session, url, params, offset, page_size, timeout, retries, stats)
+
+            if total is not None:
+                offsets = list(range(page_size, total, page_size))
+                for offset, page in zip(offsets, pool.map(fetch, offsets)):
+                    pages[offset] = page.get('records', [])
+            else:
+                # No total reported: keep going until a short page comes back
+                offset = page_size
+                done = len(pages[0]) < page_size
+                while not done:
+                    offsets = [offset + i * page_size for i in range(max_workers)]
+                    for wave_offset, page in zip(offsets, pool.map(fetch, offsets)):
+                        records = page.get('records', [])
+                        pages[wave_offset] = records
+                        if len(records) < page_size:
+                            done = True
+                    offset = offsets[-1] + page_size
+    finally:
+        session.close()
+
+    records = [record for offset in sorted(pages) for record in pages[offset]]
+    if max_records is not None:
+        records = records[:max_records]
+
+    df = pd.DataFrame(records)
+    if not df.empty:
+        known = [c for c in GOI_FIELDS if c in df.columns]
+        df = df[known + [c for c in df.columns if c not in known]]
+
+    elapsed = max(time.time() - started, 1e-9)
+    stats.update({
+        'pages': len(pages),
+        'records': len(df),
+        'seconds': round(elapsed, 3),
+        'records_per_second': round(len(df) / elapsed, 1),
+        'pages_per_second': round(len(pages) / elapsed, 2),
+    })
+    print(f"[Ingest] {stats['records']} records in {stats['pages']} pages, {stats['seconds']}s "
+          f"({stats['records_per_second']} rec/s, {stats['pages_per_second']} pages/s, "
+          f"{stats['retries']} retries)")
+    return df, stats
+
+
+def compact_goi_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Convert a raw GOI frame (every column an object string) to compact types
+    - prices -> int32 when every value is integral, else float64
+    - arrival_date -> datetime64 (parsed as dd/mm/yyyy)
+    - state, district, market, commodity, variety, grade -> category
+
+    Returns (typed DataFrame, report) with deep memory in bytes before/after
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    typed = df.copy()
+
+    for col in GOI_PRICE_FIELDS:
+        if col not in typed.columns:
+            continue
+        values = pd.to_numeric(typed[col], errors='coerce')
+        integral = values.notna().all() and (values % 1 == 0).all()
+        if integral and values.abs().max() < 2 ** 31:
+            typed[col] = values.astype('int32')
+        else:
+            typed[col] = values.astype('float64')
+
+    if GOI_DATE_FIELD in typed.columns:
+        typed[GOI_DATE_FIELD] = pd.to_datetime(typed[GOI_DATE_FIELD], format=GOI_DATE_FORMAT, errors='coerce')
+
+    for col in GOI_CATEGORY_FIELDS:
+        if col in typed.columns:
+            typed[col] = typed[col].astype('category')
+
+    after = int(typed.memory_usage(deep=True).sum())
+    report = {
+        'bytes_before': before,
+        'bytes_after': after,
+        'ratio': round(before / after, 1) if after else None,
+    }
+    print(f"[Ingest] Compacted table: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({report['ratio']}x smaller)")
+    return typed, report
+
+
+def display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Render typed columns back to the GOI text formats for output
+    Dates become dd/mm/yyyy strings and missing values become None
+    """
+    out = df
+    if GOI_DATE_FIELD in out.columns and pd.api.types.is_datetime64_any_dtype(out[GOI_DATE_FIELD]):
+        out = out.assign(**{GOI_DATE_FIELD: out[GOI_DATE_FIELD].dt.strftime(GOI_DATE_FORMAT)})
+    if out.isna().to_numpy().any():
+        out = out.astype(object).where(out.notna(), None)
+    return out
+
+
+# ============================================================================
+# Snapshot deltas
+# ============================================================================
+
+def record_hashes(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash every raw GOI record: (key hashes, content hashes), uint64 each
+    The key hash covers GOI_KEY_FIELDS; the content hash every column.
+    Should the API repeat a natural key, those records are keyed by their
+    content instead (plus an occurrence number for exact copies), so keys
+    stay unique and dropping one copy does not shift the others
+    """
+    if df.empty:
+        empty = np.array([], dtype=np.uint64)
+        return empty, empty
+    key_fields = [c for c in GOI_KEY_FIELDS if c in df.columns]
+    keys = pd.util.hash_pandas_object(df[key_fields], index=False).to_numpy()
+    contents = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    repeated = pd.Index(keys).duplicated(keep=False)
+    if repeated.any():
+        keys = keys.copy()
+        copies = pd.Series(contents[repeated])
+        keys[repeated] = pd.util.hash_pandas_object(pd.DataFrame({
+            'key': keys[repeated],
+            'content': copies,
+            'copy': copies.groupby(copies.to_numpy()).cumcount(),
+        }), index=False).to_numpy()
+    return keys, contents
+
+
+def dataset_tag(hashes: Tuple[np.ndarray, np.ndarray]) -> str:
+    """
+    Short digest of a snapshot's content hashes in row order
+    The same rows in the same order always give the same tag, across
+    restarts and processes; any change, including a reorder, a new one
+    """
+    contents = np.ascontiguousarray(hashes[1], dtype=np.uint64)
+    return hashlib.sha1(contents.tobytes()).hexdigest()[:16]
+
+
+class SnapshotDelta:
+    """
+    Difference between the previous snapshot and a fresh fetch
+
+    kept:  positions (previous snapshot) of unchanged rows, in order
+    added: positions (fresh fetch) of inserted and updated rows
+    remap: previous position -> position in the next snapshot, -1 if the
+           row was deleted or updated
+    The next snapshot is the kept rows followed by the added rows.
+    """
+
+    def __init__(self, old_hashes: Tuple[np.ndarray, np.ndarray], new_hashes: Tuple[np.ndarray, np.ndarray]):
+        old_keys, old_contents = old_hashes
+        new_keys, new_contents = new_hashes
+
+        previous = pd.Index(old_keys).get_indexer(new_keys)
+        matched = previous >= 0
+        same = matched.copy()
+        same[matched] = old_contents[previous[matched]] == new_contents[matched]
+
+        self.kept = np.sort(previous[same])
+        self.added = np.flatnonzero(~same)
+        self.remap = np.full(len(old_keys), -1, dtype=np.int64)
+        self.remap[self.kept] = np.arange(len(self.kept))
+
+        self.inserted = int((~matched).sum())
+        self.updated = int((matched & ~same).sum())
+        self.deleted = int(len(old_keys) - matched.sum())
+        self.unchanged = len(self.kept)
+
+        # Hashes of the next snapshot, aligned with its rows
+        self.keys = np.concatenate([old_keys[self.kept], new_keys[self.added]])
+        self.contents = np.concatenate([old_contents[self.kept], new_contents[self.added]])
+
+    @property
+    def changed(self) -> int:
+        """Rows the next snapshot differs by (inserted + updated + deleted)"""
+        return self.inserted + self.updated + self.deleted
+
+    def summary(self) -> Dict:
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'deleted': self.deleted,
+            'unchanged': self.unchanged,
+        }
+
+
+def merge_typed_frames(previous: pd.DataFrame, kept: np.ndarray, added: pd.DataFrame) -> pd.DataFrame:
+    """
+    Next typed snapshot: the kept rows of previous followed by the added
+    (already compacted) rows. Category columns are widened to the union of
+    both category sets first so they stay categorical after the concat.
+    """
+    kept_df = previous.iloc[kept]
+    if added.empty:
+        return kept_df.reset_index(drop=True)
+
+    widened = {}
+    for col in GOI_CATEGORY_FIELDS:
+        if col in kept_df.columns and col in added.columns:
+            categories = kept_df[col].cat.categories.union(added[col].cat.categories)
+            widened[col] = categories
+    kept_df = kept_df.assign(**{c: kept_df[c].cat.set_categories(cats) for c, cats in widened.items()})
+    added = added.assign(**{c: added[c].cat.set_categories(cats) for c, cats in widened.items()})
+    return pd.concat([kept_df, added], ignore_index=True)
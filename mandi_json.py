@@ -0,0 +1,125 @@
+"""
+Mandi JSON Encoding
+Serialises record pages straight from the typed columns: each distinct
+value is encoded once and rows are assembled as bytes, so no per-record
+dicts are built. orjson is used when installed, the stdlib otherwise
+"""
+
+import json
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from mandi_ingest import GOI_DATE_FORMAT
+
+try:
+    import orjson  # Optional: several times faster than the stdlib encoder
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Fallback for NumPy / pandas scalars and other non-JSON types"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        """Compact UTF-8 JSON"""
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(obj) -> bytes:
+        """Compact UTF-8 JSON"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode('utf-8')
+
+
+class EncodedRecords:
+    """A list of records already encoded as a JSON array (see records_json)"""
+
+    __slots__ = ('json', 'count')
+
+    def __init__(self, json_bytes: bytes, count: int):
+        self.json = json_bytes
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def to_list(self) -> List[Dict]:
+        return json.loads(self.json)
+
+
+def _column_fragments(name: str, series: pd.Series, first: bool) -> List[bytes]:
+    """'"name":value' for every row of one column, led by '{' or ','"""
+    prefix = (b'{' if first else b',') + dumps(name) + b':'
+    null = prefix + b'null'
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+        # Encode each distinct value once, then gather by code
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+        if pd.api.types.is_datetime64_any_dtype(uniques.dtype):
+            uniques = uniques.strftime(GOI_DATE_FORMAT)
+        encoded = [prefix + dumps(v) for v in uniques.tolist()]
+        encoded.append(null)  # code -1 (missing) picks the last entry
+        return np.array(encoded, dtype=object)[codes].tolist()
+
+    if pd.api.types.is_integer_dtype(dtype) and not series.hasnans:
+        # NumPy formats integers to bytes without going through Python ints
+        return [prefix + v for v in series.to_numpy().astype(bytes).tolist()]
+
+    # isna covers None, NaN, NaT and pd.NA (nullable Int/boolean/string)
+    missing = series.isna().to_numpy()
+    return [null if gap else prefix + dumps(v) for v, gap in zip(series.tolist(), missing)]
+
+
+def _open_rows(df: pd.DataFrame) -> List[bytes]:
+    """Every row encoded as '{"name":value,...', without the closing brace"""
+    columns = [_column_fragments(name, df[name], i == 0) for i, name in enumerate(df.columns)]
+    return list(map(b''.join, zip(*columns)))
+
+
+def records_json(df: pd.DataFrame) -> EncodedRecords:
+    """
+    Rows of df as a JSON array of objects, in the same text formats as
+    display_frame(df).to_dict(orient='records') (dates dd/mm/yyyy,
+    missing values null)
+    """
+    if df.empty:
+        return EncodedRecords(b'[]', 0)
+    return EncodedRecords(b'[' + b'},'.join(_open_rows(df)) + b'}]', len(df))
+
+
+def records_ndjson(df: pd.DataFrame) -> bytes:
+    """
+    Rows of df as newline-delimited JSON, each line byte for byte the
+    object records_json would emit for that row
+    """
+    if df.empty:
+        return b''
+    return b'}\n'.join(_open_rows(df)) + b'}\n'
+
+
+def encode_payload(payload: Dict) -> bytes:
+    """
+    Encode a response dict; EncodedRecords values are spliced in as-is
+    instead of being decoded and re-encoded
+    """
+    raw = {k: v for k, v in payload.items() if isinstance(v, EncodedRecords)}
+    if not raw:
+        return dumps(payload)
+    rest = dumps({k: v for k, v in payload.items() if k not in raw})
+    parts = [dumps(k) + b':' + v.json for k, v in raw.items()]
+    if rest != b'{}':
+        parts.append(rest[1:-1])
+    return b'{' + b','.join(parts) + b'}'
@@ -0,0 +1,220 @@
+"""
+Mandi Refresh Scheduler
+One component that owns every upstream refresh (GOI API, scraped price
+pages). Each job runs on a fixed interval with random jitter, backs off
+exponentially after failures and never has two runs in flight at once.
+Requests that find data stale call trigger() instead of starting threads;
+a trigger is a no-op while the job runs or while it is backing off.
+Jobs registered without an interval are on-demand: they only ever run
+when triggered (e.g. browser scrapes nobody has asked for yet).
+"""
+
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+DEFAULT_JITTER = 0.1  # +/- fraction of each delay
+DEFAULT_RETRY_SECONDS = 30  # First retry delay after a failure
+IDLE_WAIT_SECONDS = 60  # Loop wake-up when no job is due
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if not timestamp or not math.isfinite(timestamp):
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+
+class RefreshJob:
+    """
+    A named refresh function and its schedule state
+    fn returns something truthy on success; a falsy result or an exception
+    counts as a failure. interval None: on-demand, the loop never runs it
+    and next_run only matters as the end of a backoff
+    """
+
+    def __init__(self, name: str, fn: Callable[[], object], interval: Optional[float], jitter: float,
+                 retry_seconds: float, max_backoff: float, first_run_in: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_seconds = retry_seconds
+        self.max_backoff = max_backoff
+        self.next_run = time.time() + first_run_in if interval is not None else math.inf
+        self.running = False
+        self.done = threading.Event()
+        self.done.set()
+        self.runs = 0
+        self.errors = 0
+        self.failures = 0  # Consecutive, drives the backoff
+        self.last_started: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_reason: Optional[str] = None
+
+    def delay_after(self, ok: bool) -> float:
+        """Seconds until the next scheduled run, before jitter"""
+        if ok:
+            return self.interval if self.interval is not None else math.inf
+        return min(self.retry_seconds * 2 ** (self.failures - 1), self.max_backoff)
+
+    def status(self) -> Dict:
+        now = time.time()
+        scheduled = not self.running and math.isfinite(self.next_run)
+        return {
+            'running': self.running,
+            'on_demand': self.interval is None,
+            'interval_seconds': self.interval,
+            'next_run': _iso(self.next_run) if scheduled else None,
+            'next_run_in_seconds': round(max(self.next_run - now, 0), 1) if scheduled else None,
+            'last_started': _iso(self.last_started),
+            'last_duration_seconds': self.last_duration,
+            'last_status': self.last_status,
+            'last_error': self.last_error,
+            'last_reason': self.last_reason,
+            'consecutive_failures': self.failures,
+            'runs': self.runs,
+            'errors': self.errors,
+        }
+
+
+class RefreshScheduler:
+    """
+    Runs registered jobs from one daemon thread, each run in its own
+    worker thread so a slow source never delays the others
+    """
+
+    def __init__(self, name: str = 'refresh', rng: Optional[random.Random] = None):
+        self.name = name
+        self._jobs: Dict[str, RefreshJob] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._rng = rng or random.Random()
+
+    def add(self, name: str, fn: Callable[[], object], interval: Optional[float], jitter: float = DEFAULT_JITTER,
+            retry_seconds: float = DEFAULT_RETRY_SECONDS, max_backoff: Optional[float] = None,
+            first_run_in: float = 0.0) -> RefreshJob:
+        """
+        Register fn to run every interval seconds (first after first_run_in),
+        or only when triggered if interval is None
+        Failures are retried after retry_seconds, doubling per consecutive
+        failure up to max_backoff (default: interval); an on-demand job is
+        not retried, its triggers are just refused until the backoff ends
+        """
+        if max_backoff is None:
+            max_backoff = max(interval, retry_seconds) if interval is not None else retry_seconds
+        job = RefreshJob(name, fn, interval, jitter, retry_seconds, max_backoff, first_run_in)
+        with self._cond:
+            self._jobs[name] = job
+            self._cond.notify()
+        return job
+
+    def _jittered(self, delay: float, jitter: float) -> float:
+        return max(delay * (1 + self._rng.uniform(-jitter, jitter)), 0.0)
+
+    def _launch(self, job: RefreshJob, reason: str):
+        """Start one run of job; call with the lock held and job idle"""
+        job.running = True
+        job.done.clear()
+        job.last_reason = reason
+        job.last_started = time.time()
+        threading.Thread(target=self._run, args=(job,), name=f"{self.name}-{job.name}", daemon=True).start()
+
+    def _run(self, job: RefreshJob):
+        started = time.time()
+        error = None
+        try:
+            ok = bool(job.fn())
+            if not ok:
+                error = 'no data'
+        except Exception as e:
+            ok = False
+            error = str(e) or type(e).__name__
+        duration = round(time.time() - started, 2)
+
+        with self._cond:
+            job.running = False
+            job.runs += 1
+            job.last_duration = duration
+            job.last_status = 'ok' if ok else 'error'
+            job.last_error = error
+            if ok:
+                job.failures = 0
+            else:
+                job.failures += 1
+                job.errors += 1
+            delay = self._jittered(job.delay_after(ok), job.jitter)
+            job.next_run = time.time() + delay
+            job.done.set()
+            self._cond.notify()
+
+        if ok and job.interval is None:
+            print(f"[Scheduler] {job.name} refreshed in {duration}s, next on demand")
+        elif ok:
+            print(f"[Scheduler] {job.name} refreshed in {duration}s, next in {delay:.0f}s")
+        else:
+            print(f"[Scheduler] {job.name} failed in {duration}s ({error}), "
+                  f"retry #{job.failures} in {delay:.0f}s")
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                scheduled = [job for job in self._jobs.values() if job.interval is not None and not job.running]
+                for job in scheduled:
+                    if job.next_run <= now:
+                        self._launch(job, 'schedule')
+                waits = [job.next_run - now for job in scheduled if not job.running]
+                self._cond.wait(max(min(waits, default=IDLE_WAIT_SECONDS), 0.01))
+
+    def start(self):
+        """Start the scheduling thread (idempotent)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+        print(f"[Scheduler] {self.name}: {', '.join(self._jobs) or 'no jobs'}")
+
+    def stop(self):
+        """Stop scheduling new runs; runs in flight finish on their own"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def trigger(self, name: str, force: bool = False) -> bool:
+        """
+        Run job name now, ahead of its schedule
+        Refused (False) while it is running, or while it is backing off
+        after a failure unless force is set
+        """
+        with self._cond:
+            job = self._jobs[name]
+            if job.running:
+                return False
+            if job.failures and not force and time.time() < job.next_run:
+                return False
+            self._launch(job, 'trigger')
+            return True
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Wait for the current run of job name, if any; False if it is still running"""
+        return self._jobs[name].done.wait(timeout)
+
+    def is_running(self, name: str) -> bool:
+        return self._jobs[name].running
+
+    def status(self) -> Dict:
+        """Schedule state per job, for status endpoints"""
+        with self._cond:
+            return {
+                'scheduler': self.name,
+                'active': self._thread is not None and self._thread.is_alive() and not self._stopped,
+                'jobs': {name: job.status() for name, job in self._jobs.items()},
+            }
@@ -0,0 +1,225 @@
+"""
+Mandi Ranked Search
+BM25-scored, typo-tolerant search over market, district, commodity and
+variety names, built once per GOI dataset refresh
+Misspelt words are resolved to indexed words through a character-trigram
+index, so "Karimnager" still finds Karimnagar and "tamato" finds Tomato
+"""
+
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mandi_index import _first_of_runs
+
+SEARCH_FIELDS = ['market', 'district', 'commodity', 'variety']
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+FUZZY_MIN_SIMILARITY = 0.3  # Trigram similarity needed to count as a typo match
+FUZZY_MAX_EXPANSIONS = 5  # Indexed words tried per misspelt query word
+
+
+def split_words(text) -> List[str]:
+    """Lower-cased words of a name or query (punctuation dropped)"""
+    return re.findall(r"\w+", str(text).lower())
+
+
+def trigrams(word: str) -> Set[str]:
+    """Character trigrams of a word, padded so word starts and ends count"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RankedIndex:
+    """
+    BM25 index over the name fields of a DataFrame
+
+    Each row is one document made of the words of its SEARCH_FIELDS values.
+    Names repeat heavily, so every distinct value of a field is split once
+    and its words share that value's row ids. Postings are stored flat
+    (rows[offsets[i]:offsets[i + 1]] for word i) next to the precomputed
+    BM25 weight of the word in each row, so a query is a few array adds.
+    """
+
+    def __init__(self, df: pd.DataFrame, fields: Optional[List[str]] = None):
+        self.df = df
+        self.size = len(df)
+        self.fields = [f for f in (fields or SEARCH_FIELDS) if f in df.columns]
+        # field -> per-row value code, and the words of each distinct value
+        self.codes: Dict[str, np.ndarray] = {}
+        self.value_words: Dict[str, List[List[str]]] = {}
+
+        words: List[str] = []
+        rows: List[np.ndarray] = []
+        counts: List[int] = []
+        doc_len = np.zeros(self.size, dtype=np.float32)
+        for field in self.fields:
+            codes, uniques = pd.factorize(df[field])
+            value_words = [split_words(v) for v in uniques]
+            self.codes[field] = codes
+            self.value_words[field] = value_words
+            # Missing values have code -1, which picks the trailing 0
+            doc_len += np.array([len(w) for w in value_words] + [0], dtype=np.float32)[codes]
+
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            for i, value in enumerate(value_words):
+                for word, count in Counter(value).items():
+                    words.append(word)
+                    rows.append(order[bounds[i]:bounds[i + 1]])
+                    counts.append(count)
+
+        self.vocab = sorted(set(words))
+        self.word_ids = {word: i for i, word in enumerate(self.vocab)}
+        self._build_postings(words, rows, counts, doc_len)
+        self._build_trigrams()
+
+    def _build_postings(self, words: List[str], rows: List[np.ndarray], counts: List[int],
+                        doc_len: np.ndarray):
+        sizes = [len(r) for r in rows]
+        ids = np.repeat(np.array([self.word_ids[w] for w in words], dtype=np.int64), sizes)
+        all_rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+        tf = np.repeat(np.array(counts, dtype=np.float32), sizes)
+
+        # A word in two fields of a row (e.g. market and district) is one
+        # posting whose term frequency is the sum
+        width = max(self.size, 1)
+        keys = ids * width + all_rows
+        order = np.argsort(keys, kind="stable")
+        keys, tf = keys[order], tf[order]
+        first = _first_of_runs(keys)
+        if len(keys):
+            tf = np.add.reduceat(tf, np.flatnonzero(first))
+        ids, self.rows = np.divmod(keys[first], width)
+        self.offsets = np.searchsorted(ids, np.arange(len(self.vocab) + 1))
+
+        doc_freq = np.diff(self.offsets)
+        idf = np.log(1 + (self.size - doc_freq + 0.5) / (doc_freq + 0.5))
+        avg_len = float(doc_len.mean()) if self.size else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[self.rows] / (avg_len or 1.0))
+        self.weights = (idf[ids] * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+
+    def _build_trigrams(self):
+        grams: Dict[str, List[int]] = defaultdict(list)
+        for i, word in enumerate(self.vocab):
+            for gram in trigrams(word):
+                grams[gram].append(i)
+        self.trigram_index = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+        self.trigram_counts = np.array([len(trigrams(w)) for w in self.vocab], dtype=np.float32)
+
+    def parse(self, query: str) -> List[str]:
+        """
+        Query words; adjacent words are joined when only the joined form is
+        indexed ("ground nut" -> "groundnut")
+        """
+        words = split_words(query)
+        parsed = []
+        i = 0
+        while i < len(words):
+            if i + 1 < len(words):
+                joined = words[i] + words[i + 1]
+                if joined in self.word_ids and not (words[i] in self.word_ids and words[i + 1] in self.word_ids):
+                    parsed.append(joined)
+                    i += 2
+                    continue
+            parsed.append(words[i])
+            i += 1
+        return parsed
+
+    def expand(self, word: str, fuzzy: bool = True) -> List[Tuple[int, float]]:
+        """
+        Indexed words a query word matches, as (word id, weight), best first
+        An indexed word matches exactly (weight 1); an unknown word is
+        matched to its closest indexed words by trigram similarity
+        """
+        exact = self.word_ids.get(word)
+        if exact is not None:
+            return [(exact, 1.0)]
+        if not fuzzy:
+            return []
+
+        grams = trigrams(word)
+        hits = [self.trigram_index[g] for g in grams if g in self.trigram_index]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.vocab))
+        similarity = shared / (len(grams) + self.trigram_counts - shared)
+        close = np.flatnonzero(similarity >= FUZZY_MIN_SIMILARITY)
+        close = close[np.argsort(-similarity[close], kind="stable")[:FUZZY_MAX_EXPANSIONS]]
+        return [(int(i), float(similarity[i])) for i in close]
+
+    def postings(self, word_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows containing an indexed word and the word's BM25 weight in each"""
+        span = slice(self.offsets[word_id], self.offsets[word_id + 1])
+        return self.rows[span], self.weights[span]
+
+    def phrase_mask(self, phrase: List[str]) -> np.ndarray:
+        """Rows where one field holds the words of phrase consecutively"""
+        mask = np.zeros(self.size, dtype=bool)
+        n = len(phrase)
+        for field in self.fields:
+            values = [
+                code for code, words in enumerate(self.value_words[field])
+                if any(words[i:i + n] == phrase for i in range(len(words) - n + 1))
+            ]
+            if values:
+                mask |= np.isin(self.codes[field], values)
+        return mask
+
+    def search(self, query: str, k: int = 20, match_all: bool = False, phrase: bool = False,
+               fuzzy: bool = True) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Best k rows for a query by BM25 score (summed over query words,
+        typo matches scaled by their similarity)
+
+        match_all: every query word must match (AND instead of OR)
+        phrase: the words must also appear in order within one field
+        Returns (row positions, scores, number of matching rows); rows are
+        ordered by score, ties by position
+        """
+        words = self.parse(query)
+        empty = np.array([], dtype=np.int64)
+        if not words or not self.size:
+            return empty, np.array([], dtype=np.float32), 0
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        required = None
+        resolved = []
+        for word in words:
+            expansions = self.expand(word, fuzzy)
+            resolved.append(self.vocab[expansions[0][0]] if expansions else None)
+            matched = np.zeros(self.size, dtype=bool) if (match_all or phrase) else None
+            for word_id, weight in expansions:
+                rows, row_weights = self.postings(word_id)
+                scores[rows] += weight * row_weights
+                if matched is not None:
+                    matched[rows] = True
+            if matched is not None:
+                required = matched if required is None else required & matched
+
+        candidates = np.flatnonzero(scores > 0)
+        if required is not None:
+            candidates = candidates[required[candidates]]
+        if phrase and len(words) > 1:
+            if None in resolved:
+                candidates = empty
+            else:
+                candidates = candidates[self.phrase_mask(resolved)[candidates]]
+        total = len(candidates)
+
+        # Bounded top-k: partition around the k-th best score instead of
+        # sorting every match; ties at the cut keep the lowest positions
+        if total > k:
+            candidate_scores = scores[candidates]
+            cut = np.partition(candidate_scores, total - k)[total - k]
+            above = candidates[candidate_scores > cut]
+            ties = candidates[candidate_scores == cut][:k - len(above)]
+            candidates = np.concatenate([above, ties])
+        order = np.lexsort((candidates, -scores[candidates]))
+        candidates = candidates[order]
+        return candidates, scores[candidates], total
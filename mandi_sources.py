@@ -0,0 +1,98 @@
+"""
+Mandi Source Fan-out
+Runs several scrapers concurrently under one overall deadline, each with
+its own timeout, and reports what every source did and how long it took
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (name, fetch, timeout_seconds); fetch returns a list of records
+Source = Tuple[str, Callable[[], List[Dict]], float]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def fan_out(sources: List[Source], deadline_seconds: float,
+            fallbacks: Optional[Dict[str, Source]] = None) -> Tuple[Dict[str, List[Dict]], Dict[str, Dict]]:
+    """
+    Fetch every source in its own daemon thread and collect what arrives
+    A source that has not answered within its timeout (or by the overall
+    deadline) is reported as 'timeout' and its late result is dropped;
+    the thread itself cannot be stopped and finishes in the background.
+    fallbacks[name] is started when source name errors or returns nothing,
+    with whatever time is left before the deadline.
+
+    Returns (data by source name, status by source name). Each status has
+    status ('ok', 'empty', 'error', 'timeout' or 'skipped'), records,
+    elapsed_ms and timeout_seconds, plus error / fallback_for when relevant
+    """
+    fallbacks = fallbacks or {}
+    started = time.perf_counter()
+    overall = started + deadline_seconds
+    results: "queue.Queue" = queue.Queue()
+    data: Dict[str, List[Dict]] = {}
+    status: Dict[str, Dict] = {}
+    running: Dict[str, Tuple[float, float]] = {}  # name -> (give up at, started at)
+
+    def launch(name: str, fetch: Callable[[], List[Dict]], timeout: float, fallback_for: Optional[str] = None):
+        now = time.perf_counter()
+        status[name] = {'status': 'running', 'records': 0, 'elapsed_ms': None, 'timeout_seconds': timeout}
+        if fallback_for:
+            status[name]['fallback_for'] = fallback_for
+        running[name] = (min(now + timeout, overall), now)
+
+        def _run():
+            begin = time.perf_counter()
+            try:
+                rows, error = fetch(), None
+            except Exception as e:
+                rows, error = None, e
+            results.put((name, rows, error, time.perf_counter() - begin))
+
+        threading.Thread(target=_run, name=f"source-{name}", daemon=True).start()
+
+    for name, fetch, timeout in sources:
+        launch(name, fetch, timeout)
+
+    while running:
+        now = time.perf_counter()
+        for name, (give_up, begun) in list(running.items()):
+            if now >= give_up:
+                del running[name]
+                status[name].update(status='timeout', elapsed_ms=_ms(now - begun))
+                print(f"[Sources] ⏳ {name} timed out after {now - begun:.1f}s")
+        if not running:
+            break
+
+        try:
+            name, rows, error, elapsed = results.get(timeout=min(t for t, _ in running.values()) - now)
+        except queue.Empty:
+            continue
+        if name not in running:
+            continue  # Arrived after its timeout
+        del running[name]
+
+        entry = status[name]
+        entry['elapsed_ms'] = _ms(elapsed)
+        if error is not None:
+            entry.update(status='error', error=str(error))
+            print(f"[Sources] ❌ {name} failed: {error}")
+        else:
+            rows = list(rows or [])
+            data[name] = rows
+            entry.update(status='ok' if rows else 'empty', records=len(rows))
+
+        if entry['status'] != 'ok' and name in fallbacks:
+            fallback_name, fetch, timeout = fallbacks[name]
+            if time.perf_counter() < overall:
+                launch(fallback_name, fetch, timeout, fallback_for=name)
+            else:
+                status[fallback_name] = {'status': 'skipped', 'records': 0, 'elapsed_ms': None,
+                                         'timeout_seconds': timeout, 'fallback_for': name}
+
+    return data, status
@@ -0,0 +1,189 @@
+"""
+Mandi Price History Store
+Append-only SQLite store of every GOI snapshot, one row per
+(market, commodity, variety, grade, arrival_date)
+Answers trend queries from indexes instead of scanning snapshots
+
+Also holds the warm-start snapshot: the last good typed table and its
+derived indexes, written on every refresh and loaded on service boot
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+HISTORY_FIELDS = [
+    'arrival_date', 'state', 'district', 'market', 'commodity', 'variety', 'grade',
+    'min_price', 'max_price', 'modal_price',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    arrival_date TEXT NOT NULL,               -- ISO yyyy-mm-dd, sorts by date
+    state TEXT COLLATE NOCASE,
+    district TEXT COLLATE NOCASE,
+    market TEXT NOT NULL COLLATE NOCASE,
+    commodity TEXT NOT NULL COLLATE NOCASE,
+    variety TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    grade TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    min_price REAL,
+    max_price REAL,
+    modal_price REAL,
+    UNIQUE (market, commodity, variety, grade, arrival_date)
+);
+CREATE INDEX IF NOT EXISTS idx_history_commodity_market_date
+    ON price_history (commodity, market, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_history_date
+    ON price_history (arrival_date);
+"""
+
+UPSERT = """
+INSERT INTO price_history (arrival_date, state, district, market, commodity, variety, grade,
+                           min_price, max_price, modal_price)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (market, commodity, variety, grade, arrival_date) DO UPDATE SET
+    state = excluded.state,
+    district = excluded.district,
+    min_price = excluded.min_price,
+    max_price = excluded.max_price,
+    modal_price = excluded.modal_price
+"""
+
+
+class HistoryStore:
+    """
+    SQLite-backed price history
+    Writes are serialised through one connection; the date-leading index
+    plays the role of arrival_date partitions for range pruning
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def append(self, df: pd.DataFrame) -> int:
+        """
+        Upsert every row of a typed GOI frame; rows already stored for the
+        same natural key are updated in place, never duplicated
+        Returns the number of rows written
+        """
+        if df.empty or any(col not in df.columns for col in ('market', 'commodity', 'arrival_date')):
+            return 0
+
+        out = pd.DataFrame(index=df.index)
+        for col in HISTORY_FIELDS:
+            if col not in df.columns:
+                out[col] = None
+            elif col == 'arrival_date':
+                out[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+            elif col in ('variety', 'grade'):
+                out[col] = df[col].astype(object).fillna('')
+            else:
+                out[col] = df[col].astype(object)
+        out = out[out['arrival_date'].notna()]
+        out = out.astype(object).where(out.notna(), None)
+
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT, out.itertuples(index=False, name=None))
+        return len(out)
+
+    def history(self, commodity: str, market: Optional[str] = None,
+                date_from: Optional[str] = None, date_to: Optional[str] = None,
+                limit: int = 5000) -> List[Dict]:
+        """Rows for a commodity (and market), dates as ISO strings, oldest first"""
+        where, params = self._where(commodity, market, date_from, date_to)
+        sql = (f"SELECT {', '.join(HISTORY_FIELDS)} FROM price_history WHERE {where} "
+               f"ORDER BY arrival_date, market LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+
+    def trend(self, commodity: str, market: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict]:
+        """Daily modal price summary for a commodity (and market)"""
+        where, params = self._where(commodity, market, date_from, date_to)
+        sql = (f"SELECT arrival_date, MIN(modal_price), MAX(modal_price), AVG(modal_price), "
+               f"COUNT(DISTINCT market) FROM price_history WHERE {where} "
+               f"GROUP BY arrival_date ORDER BY arrival_date")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                'arrival_date': day,
+                'min_modal_price': low,
+                'max_modal_price': high,
+                'avg_modal_price': round(avg, 2) if avg is not None else None,
+                'market_count': markets,
+            }
+            for day, low, high, avg, markets in rows
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, first, last = self._conn.execute(
+                "SELECT COUNT(*), MIN(arrival_date), MAX(arrival_date) FROM price_history"
+            ).fetchone()
+        return {'rows': count, 'first_date': first, 'last_date': last}
+
+    @staticmethod
+    def _where(commodity, market, date_from, date_to):
+        clauses, params = ["commodity = ?"], [commodity.strip()]
+        if market:
+            clauses.append("market = ?")
+            params.append(market.strip())
+        if date_from:
+            clauses.append("arrival_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("arrival_date <= ?")
+            params.append(date_to)
+        return " AND ".join(clauses), params
+
+
+def save_snapshot(path: str, payload: Dict[str, Any]) -> Dict:
+    """
+    Write the warm-start snapshot atomically (temp file + rename), so a
+    crash mid-write never leaves a truncated snapshot behind
+    The payload is pickled in one piece, which keeps shared references
+    intact (indexes still point at the same DataFrame after loading)
+    """
+    started = time.time()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=5)
+    os.replace(tmp_path, path)
+    return {'bytes': os.path.getsize(path), 'seconds': round(time.time() - started, 3)}
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the warm-start snapshot written by save_snapshot
+    Only ever reads the service's own local file; returns None if missing
+    or unreadable
+    """
+    if not os.path.exists(path):
+        return None
+    started = time.time()
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"[Snapshot] ❌ Could not load {path}: {e}")
+        return None
+    if not isinstance(payload, dict):
+        print(f"[Snapshot] ❌ Could not load {path}: unexpected {type(payload).__name__} payload")
+        return None
+    payload['load_seconds'] = round(time.time() - started, 3)
+    return payload
@@ -0,0 +1,206 @@
+"""
+Mandi HTML Table Extraction
+One table parser for every mandi scraper, with a declarative column
+schema per source. Cells are read with lxml's C parser when it is
+installed, else straight off the stdlib html.parser tokenizer; neither
+builds a soup tree.
+Cell text matches BeautifulSoup's get_text(strip=True): every text node
+stripped, then joined.
+"""
+
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import lxml.html  # C parser (requirements.txt); html.parser is the fallback
+except ImportError:
+    lxml = None
+
+# tables -> rows -> cell texts
+Tables = List[List[List[str]]]
+
+
+class _TableParser(HTMLParser):
+    """Collects the text of cell_tags cells, row by row, for every table"""
+
+    def __init__(self, cell_tags: Tuple[str, ...]):
+        super().__init__(convert_charrefs=True)
+        self.cell_tags = cell_tags
+        self.tables: Tables = []
+        self._open: List[List[List[str]]] = []  # Stack of tables being read
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._cell_depth = 0  # Tables opened inside the current cell
+
+    def _close_cell(self):
+        if self._cell is not None:
+            self._row.append(''.join(self._cell))
+            self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None:
+            self._open[-1].append(self._row)
+            self._row = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self._cell is not None:
+                self._cell_depth += 1
+                return
+            self._close_row()
+            self._open.append([])
+        elif not self._open or self._cell_depth:
+            return
+        elif tag == 'tr':
+            self._close_row()
+            self._row = []
+        elif tag in ('td', 'th'):
+            self._close_cell()
+            if self._row is None:
+                self._row = []
+            if tag in self.cell_tags:
+                self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag == 'table':
+            if self._cell_depth:
+                self._cell_depth -= 1
+            elif self._open:
+                self._close_row()
+                self.tables.append(self._open.pop())
+        elif not self._open or self._cell_depth:
+            return
+        elif tag == 'tr':
+            self._close_row()
+        elif tag in ('td', 'th'):
+            self._close_cell()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            text = data.strip()
+            if text:
+                self._cell.append(text)
+
+    def close(self):
+        super().close()
+        while self._open:
+            self._close_row()
+            self.tables.append(self._open.pop())
+
+
+def _parse_tables_stdlib(html: str, cell_tags: Tuple[str, ...]) -> Tables:
+    parser = _TableParser(cell_tags)
+    parser.feed(html)
+    parser.close()
+    return parser.tables
+
+
+def _parse_tables_lxml(html: str, cell_tags: Tuple[str, ...]) -> Tables:
+    root = lxml.html.fromstring(html)
+    tables = []
+    for table in root.iter('table'):
+        if _owner_table(table) is not None:
+            continue  # Nested in a cell: only part of that cell's text
+        rows = []
+        for tr in table.iter('tr'):
+            if _owner_table(tr) is table:
+                rows.append([''.join(t.strip() for t in cell.itertext()) for cell in tr
+                             if cell.tag in cell_tags])
+        tables.append(rows)
+    return tables
+
+
+def _owner_table(element):
+    for ancestor in element.iterancestors('table'):
+        return ancestor
+    return None
+
+
+def parse_tables(html: str, cell_tags: Iterable[str] = ('td',), parser: Optional[str] = None) -> Tables:
+    """
+    Every <table> in html as rows of cell texts, in document order
+    Only cells whose tag is in cell_tags are kept (header rows made of
+    <th> therefore come back empty with the default). A table nested in
+    a cell only contributes its text to that cell.
+    parser: 'lxml' (default when installed) or 'html.parser'; both give
+    the same tables for the mandi pages
+    """
+    cell_tags = tuple(cell_tags)
+    if parser is None:
+        parser = 'lxml' if lxml is not None else 'html.parser'
+    if parser == 'lxml':
+        if lxml is None:
+            raise ImportError("lxml is not installed")
+        return _parse_tables_lxml(html, cell_tags) if html.strip() else []
+    return _parse_tables_stdlib(html, cell_tags)
+
+
+class TableSchema:
+    """
+    How one source lays out its price table
+
+    columns: output field -> cell index
+    min_cells: rows with fewer cells are skipped
+    required: fields that must be non-empty for the row to be kept
+    defaults: field -> value used when the row is too short for its index
+    constants: fields added to every record (e.g. Source)
+    header_rows: rows skipped at the top of every table
+    first_table_only: read only the first <table> on the page
+    """
+
+    def __init__(self, name: str, columns: Dict[str, int], min_cells: int,
+                 required: Iterable[str] = (), defaults: Optional[Dict[str, str]] = None,
+                 constants: Optional[Dict[str, str]] = None, header_rows: int = 1,
+                 first_table_only: bool = False):
+        self.name = name
+        self.columns = columns
+        self.min_cells = min_cells
+        self.required = [columns[f] for f in required]
+        self.defaults = defaults or {}
+        self.constants = constants or {}
+        self.header_rows = header_rows
+        self.first_table_only = first_table_only
+
+    def records(self, tables: Tables, **constants) -> List[Dict[str, str]]:
+        """Records from already parsed tables; constants override the schema's"""
+        extra = {**self.constants, **constants}
+        columns = list(self.columns.items())
+        records = []
+        for table in tables[:1] if self.first_table_only else tables:
+            for cells in table[self.header_rows:]:
+                if len(cells) < self.min_cells or not all(cells[i] for i in self.required if i < len(cells)):
+                    continue
+                record = {field: cells[i] if i < len(cells) else self.defaults.get(field, '')
+                          for field, i in columns}
+                record.update(extra)
+                records.append(record)
+        return records
+
+    def extract(self, html: str, parser: Optional[str] = None, **constants) -> List[Dict[str, str]]:
+        """Parse html and map its rows through this schema"""
+        return self.records(parse_tables(html, parser=parser), **constants)
+
+
+# ============================================================================
+# Source schemas
+# ============================================================================
+
+COMMODITYMARKETLIVE_SCHEMA = TableSchema(
+    'CommodityMarketLive',
+    columns={'Commodity': 0, 'Market': 1, 'Price': 2, 'Trend': 3},
+    min_cells=4,
+    required=['Commodity', 'Market', 'Price'],
+    defaults={'Trend': 'N/A'},
+    constants={'Source': 'CommodityMarketLive'},
+)
+
+# Also used for undetected-Chrome pages, with Source set to the page url
+COMMODITYONLINE_SCHEMA = TableSchema(
+    'CommodityOnline',
+    columns={'State': 0, 'District': 1, 'Market': 2, 'Commodity': 3,
+             'Min Price': 4, 'Max Price': 5, 'Avg Price': 6},
+    min_cells=7,
+    constants={'Source': 'CommodityOnline'},
+    first_table_only=True,
+)
@@ -9,7 +9,8 @@ import sys
 import time
 from datetime import datetime
 import requests
-from bs4 import BeautifulSoup
+
+from mandi_tables import COMMODITYMARKETLIVE_SCHEMA, parse_tables
 
 # Fix encoding for Windows console
 import io
@@ -39,39 +40,13 @@ def scrape_commodity_market_live_all():
         response = requests.get(url, headers=HEADERS, timeout=15)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        rows = []
-        
-        # Find all tables
-        tables = soup.find_all('table')
+        tables = parse_tables(response.text)
         print(f"   Found {len(tables)} table(s)")
+        for table_idx, table in enumerate(tables):
+            print(f"   Table {table_idx + 1}: {len(table)} rows")
         sys.stdout.flush()
         
-        for table_idx, table in enumerate(tables):
-            rows_html = table.find_all('tr')[1:]  # Skip header
-            print(f"   Table {table_idx + 1}: {len(rows_html)} rows")
-            sys.stdout.flush()
-            
-            for row in rows_html:
-                cols = row.find_all('td')
-                if len(cols) >= 4:
-                    try:
-                        commodity_name = cols[0].get_text(strip=True)
-                        market = cols[1].get_text(strip=True)
-                        price_info = cols[2].get_text(strip=True)
-                        trend = cols[3].get_text(strip=True) if len(cols) > 3 else "N/A"
-                        
-                        if commodity_name and market and price_info:
-                            rows.append({
-                                'Commodity': commodity_name,
-                                'Market': market,
-                                'Price': price_info,
-                                'Trend': trend,
-                                'Source': 'CommodityMarketLive'
-                            })
-                    except Exception as e:
-                        continue
+        rows = COMMODITYMARKETLIVE_SCHEMA.records(tables)
         
         if rows:
             print(f"\n✅ SUCCESS: Extracted {len(rows)} commodity records\n")
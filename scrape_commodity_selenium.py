@@ -6,26 +6,24 @@ Scrapes all commodities and their prices from mandi-commodities page with JS ren
 """
 
 import sys
-import time
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from bs4 import BeautifulSoup
+
+from mandi_browser import BrowserPool, chrome_driver_factory, register_pool, rows_present
+from mandi_tables import COMMODITYMARKETLIVE_SCHEMA, parse_tables
 
 # Fix encoding for Windows console
 import io
 if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def scrape_commodity_market_live_selenium():
+# One headless session, reused if the scraper is called repeatedly
+BROWSER_POOL = register_pool(BrowserPool(chrome_driver_factory(), size=1, name='chrome'))
+
+def scrape_commodity_market_live_selenium(pool=None):
     """
     Scrape all commodities from CommodityMarketLive using Selenium
     """
-    driver = None
+    pool = pool or BROWSER_POOL
     try:
         url = 'https://www.commoditymarketlive.com/mandi-commodities'
         
@@ -35,78 +33,22 @@ def scrape_commodity_market_live_selenium():
         print(f"📍 Source: {url}\n")
         sys.stdout.flush()
         
-        # Setup Chrome options
-        options = webdriver.ChromeOptions()
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        print(f"1️⃣ Initializing WebDriver...")
-        sys.stdout.flush()
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        
-        print(f"2️⃣ Loading page...")
-        sys.stdout.flush()
-        
-        driver.get(url)
-        
-        # Wait for content to load
-        print(f"3️⃣ Waiting for content to load...")
+        # Load the page and wait until the price table has rendered rows
+        print(f"1️⃣ Loading page in headless Chrome...")
         sys.stdout.flush()
         
-        wait = WebDriverWait(driver, 20)
-        wait.until(EC.presence_of_all_elements_located((By.TAG_NAME, "table")))
-        
-        # Additional wait for JavaScript rendering
-        time.sleep(3)
+        html = pool.fetch(url, wait_for=rows_present('table tr', 2), timeout=20)
         
-        print(f"4️⃣ Parsing HTML...")
+        print(f"2️⃣ Parsing HTML...")
         sys.stdout.flush()
         
-        # Get page source and parse
-        html = driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        rows = []
-        
-        # Find all tables
-        tables = soup.find_all('table')
+        tables = parse_tables(html)
         print(f"   Found {len(tables)} table(s)")
-        sys.stdout.flush()
-        
         for table_idx, table in enumerate(tables):
-            rows_html = table.find_all('tr')
-            print(f"   Table {table_idx + 1}: {len(rows_html)} rows")
-            sys.stdout.flush()
-            
-            for row_idx, row in enumerate(rows_html):
-                if row_idx == 0:  # Skip header
-                    continue
-                    
-                cols = row.find_all('td')
-                if len(cols) >= 4:
-                    try:
-                        commodity_name = cols[0].get_text(strip=True)
-                        market = cols[1].get_text(strip=True)
-                        price_info = cols[2].get_text(strip=True)
-                        trend = cols[3].get_text(strip=True) if len(cols) > 3 else "N/A"
-                        
-                        if commodity_name and market and price_info:
-                            rows.append({
-                                'Commodity': commodity_name,
-                                'Market': market,
-                                'Price': price_info,
-                                'Trend': trend,
-                                'Source': 'CommodityMarketLive'
-                            })
-                    except Exception as e:
-                        continue
+            print(f"   Table {table_idx + 1}: {len(table)} rows")
+        sys.stdout.flush()
         
-        driver.quit()
+        rows = COMMODITYMARKETLIVE_SCHEMA.records(tables)
         
         if rows:
             print(f"\n✅ SUCCESS: Extracted {len(rows)} commodity records\n")
@@ -118,8 +60,6 @@ def scrape_commodity_market_live_selenium():
         return rows
         
     except Exception as e:
-        if driver:
-            driver.quit()
         print(f"\n❌ ERROR: {e}")
         return []
 
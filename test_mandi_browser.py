@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the pooled browser manager with fake drivers serving saved HTML
+"""
+
+import threading
+import time
+
+import pytest
+
+import mandi_app
+from mandi_browser import (
+    BrowserPool, BrowserUnavailable, PageTimeout, document_ready, rows_present, wait_until
+)
+from mandi_fixtures import FakeDriver, load_html_fixture
+
+CML_URL = 'https://www.commoditymarketlive.com/mandi-commodities'
+PAGES = {CML_URL: load_html_fixture('commoditymarketlive_mandi_commodities.html')}
+
+
+def fake_pool(size=1, max_pages=50, **driver_options):
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver(PAGES, **driver_options))
+        return drivers[-1]
+    return BrowserPool(factory, size=size, max_pages=max_pages, name='fake'), drivers
+
+
+def test_sessions_are_reused_and_recycled():
+    pool, drivers = fake_pool(max_pages=3)
+    for _ in range(7):
+        assert 'Paddy' in pool.fetch(CML_URL, rows_present())
+    # 3 + 3 + 1 pages: two sessions recycled, the third still warm
+    assert len(drivers) == 3
+    assert [d.quit_called for d in drivers] == [True, True, False]
+    assert pool.stats()['recycled'] == 2 and pool.stats()['pages'] == 7
+
+    pool.close()
+    assert drivers[2].quit_called and pool.stats()['open'] == 0
+    with pytest.raises(BrowserUnavailable):
+        pool.fetch(CML_URL)
+
+
+def test_crashed_session_is_replaced_and_retried():
+    pool, drivers = fake_pool()
+    pool.fetch(CML_URL)
+    drivers[0].quit()  # Browser died between requests
+    assert 'Cotton' in pool.fetch(CML_URL)
+    assert len(drivers) == 2 and pool.stats()['crashed'] == 1 and pool.stats()['open'] == 1
+
+
+def test_explicit_wait_instead_of_sleep():
+    pool, drivers = fake_pool(render_delay=0.3)
+    started = time.monotonic()
+    html = pool.fetch(CML_URL, rows_present('table tr', 2), timeout=5)
+    assert 0.3 <= time.monotonic() - started < 1.0 and 'Turmeric' in html
+
+    with pytest.raises(PageTimeout):
+        pool.fetch(CML_URL, rows_present('table.missing tr'), timeout=0.2)
+    # A timeout is not a crash: the session stays in the pool
+    assert len(drivers) == 1 and pool.stats()['timeouts'] == 1
+
+    driver = FakeDriver(PAGES, render_delay=0.2)
+    driver.get(CML_URL)
+    assert driver.execute_script("return document.readyState") == 'interactive'
+    assert wait_until(driver, document_ready, timeout=2)
+
+
+def test_pool_size_bounds_concurrent_sessions():
+    pool, drivers = fake_pool(size=2, render_delay=0.2)
+    threads = [threading.Thread(target=pool.fetch, args=(CML_URL, rows_present())) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(drivers) == 2 and pool.stats()['pages'] == 6
+
+
+def test_discarded_session_wakes_a_waiter():
+    pool, drivers = fake_pool(size=1)
+    started = {}
+
+    def crash():
+        with pytest.raises(RuntimeError):
+            with pool.session():
+                time.sleep(0.1)
+                raise RuntimeError("chrome not reachable")
+
+    def wait_for_session():
+        with pool.session(acquire_timeout=5):
+            started['waited'] = time.monotonic() - begin
+
+    crasher = threading.Thread(target=crash)
+    crasher.start()
+    time.sleep(0.02)
+    begin = time.monotonic()
+    waiter = threading.Thread(target=wait_for_session)
+    waiter.start()
+    crasher.join()
+    waiter.join()
+    # Woken as soon as the crashed session freed its slot, not at the 5s timeout
+    assert started['waited'] < 1 and len(drivers) == 2
+    assert pool.stats()['crashed'] == 1 and pool.stats()['open'] == 1
+
+
+def test_scraper_reads_fixture_through_pool():
+    pool, _ = fake_pool(render_delay=0.1)
+    rows = mandi_app.scrape_commoditymarketlive_all(pool=pool)
+    assert len(rows) == 10
+    assert rows[0] == {'Commodity': 'Paddy(Dhan)(Common)', 'Market': 'Karimnagar', 'Price': '₹ 2,183',
+                       'Trend': '▲ 1.2%', 'Source': 'CommodityMarketLive'}
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Test the TTL LRU cache, the keyword result cache, single-flight
+coalescing, the per-source scrape cache and the commodity views behind
+/scrape-govt-prices
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import mandi_app
+import mandi_app_service as service
+from mandi_cache import LRUCache, SingleFlight
+from mandi_fixtures import sample_goi_records
+from mandi_ingest import compact_goi_frame, record_hashes
+
+
+def test_lru_entries_expire_after_ttl():
+    cache = LRUCache(maxsize=2, ttl=0.1)
+    cache.put('paddy', [1])
+    cache.put('cotton', [2], ttl=10)
+    assert cache.get('paddy') == [1] and 'paddy' in cache
+    time.sleep(0.15)
+    assert 'paddy' not in cache and cache.get('paddy') is None
+    assert cache.get('cotton') == [2]
+
+    cache.put('maize', [3])
+    cache.put('wheat', [4])  # Evicts cotton, the least recently used
+    assert 'cotton' not in cache
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (2, 1, 1, 1)
+    assert LRUCache().stats()['ttl'] is None
+
+
+def test_lru_evicts_least_recently_used_and_counts_hits():
+    cache = LRUCache(maxsize=3)
+    for key in ('paddy', 'cotton', 'maize'):
+        cache.put(key, key.upper())
+    assert cache.get('paddy') == 'PADDY'  # paddy is now the most recent
+    cache.put('wheat', 'WHEAT')
+    assert 'cotton' not in cache and len(cache) == 3
+    cache.put('maize', 'Maize')  # Overwriting refreshes, never evicts
+    cache.put('tomato', 'TOMATO')
+    assert 'paddy' not in cache and cache.get('maize') == 'Maize'
+
+    assert cache.get('cotton', 'missing') == 'missing'
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (3, 2, 1, 2)
+    assert stats['hit_ratio'] == round(2 / 3, 3)
+    assert LRUCache().stats()['hit_ratio'] is None
+
+
+def test_lru_byte_budget():
+    cache = LRUCache(maxsize=100, maxbytes=10, sizeof=len)
+    cache.put('paddy', b'1234')
+    cache.put('cotton', b'5678')
+    cache.get('paddy')
+    cache.put('maize', b'abcd')  # 12 bytes: cotton goes
+    assert 'cotton' not in cache and cache.stats()['bytes'] == 8
+    cache.put('paddy', b'12')  # Replacing an entry frees its old bytes
+    assert cache.stats()['bytes'] == 6 and len(cache) == 2
+
+    cache.put('wheat', b'x' * 11)  # Larger than the whole budget: not stored
+    assert 'wheat' not in cache and len(cache) == 2
+    cache.clear()
+    stats = cache.stats()
+    assert (stats['bytes'], stats['maxbytes'], stats['evictions']) == (0, 10, 1)
+
+
+def install_fixture(raw, version):
+    df, _ = compact_goi_frame(raw)
+    service.install_snapshot(df, service.build_cached_indexes(df, raw, record_hashes(raw)), datetime.now(), version)
+    return df
+
+
+def test_keyword_results_cached_per_dataset_version():
+    raw = pd.DataFrame(sample_goi_records(1000))
+    df = install_fixture(raw, 31)
+    stats = service.KEYWORD_RESULT_CACHE.stats()
+    assert stats['size'] == 0
+
+    first = service.keyword_match_positions(df, 'Paddy, Karimnagar')
+    again = service.keyword_match_positions(df, 'karimnagar paddy paddy')  # Same keyword set
+    assert again is first and not first.flags.writeable
+    stats = service.KEYWORD_RESULT_CACHE.stats()
+    assert (stats['size'], stats['hits'], stats['misses']) == (1, 1, 1)
+
+    # A new dataset version drops every cached result
+    other = pd.DataFrame(sample_goi_records(300, seed=5))
+    df = install_fixture(other, 32)
+    assert len(service.KEYWORD_RESULT_CACHE) == 0
+    fresh = service.keyword_match_positions(df, 'Paddy, Karimnagar')
+    text = other['commodity'].str.lower() + ' ' + other['district'].str.lower()
+    assert len(fresh) == (text.str.contains('paddy') | text.str.contains('karimnagar')).sum()
+
+
+def counting_scrape(rows, seconds=0.2, error=None):
+    calls = []
+
+    def fetch():
+        calls.append(threading.get_ident())
+        time.sleep(seconds)
+        if error:
+            raise error
+        return rows
+    return fetch, calls
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    fetch, calls = counting_scrape([{'Commodity': 'Paddy'}])
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: flights.do('commodity', fetch), range(10)))
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    stats = flights.stats()
+    assert (stats['executed'], stats['coalesced'], stats['in_flight']) == (1, 9, {})
+
+    # Nothing is kept once the flight lands, and other keys never wait on it
+    flights.do('commodity', fetch)
+    flights.do('agmarknet', fetch)
+    assert len(calls) == 3
+    assert flights.stats()['keys']['commodity'] == {'executed': 2, 'coalesced': 9, 'failed': 0}
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+    fetch, calls = counting_scrape(None, error=RuntimeError("403 Forbidden"))
+
+    def call(_):
+        try:
+            flights.do('commodity', fetch)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        assert list(pool.map(call, range(5))) == ['403 Forbidden'] * 5
+    assert len(calls) == 1 and flights.stats()['failed'] == 1
+
+    slow, _ = counting_scrape([], seconds=0.5)
+    threading.Thread(target=flights.do, args=('slow', slow)).start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        flights.do('slow', slow, timeout=0.05)
+
+
+def test_cached_scrape_coalesces_then_serves_from_cache():
+    fetch, calls = counting_scrape([{'Commodity': 'Paddy', 'Market': 'Karimnagar'}])
+    empty, empty_calls = counting_scrape([], seconds=0)
+    saved = mandi_app.CACHE['commoditymarketlive']
+    try:
+        mandi_app.CACHE['commoditymarketlive'] = {'data': None, 'timestamp': None}
+        assert mandi_app.cached_scrape('commoditymarketlive', empty) == []
+        assert mandi_app.cached_scrape('commoditymarketlive', empty) == []
+        assert len(empty_calls) == 2  # Empty scrapes are not cached
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: mandi_app.cached_scrape('commoditymarketlive', fetch), range(8)))
+        assert len(calls) == 1 and all(len(r) == 1 for r in results)
+
+        hits = mandi_app.SCRAPE_CACHE_HITS['commoditymarketlive']
+        mandi_app.cached_scrape('commoditymarketlive', fetch)
+        assert len(calls) == 1
+        source = mandi_app.scrape_stats()['sources']['commoditymarketlive']
+        assert source['cached'] and source['records'] == 1 and source['cache_hits'] == hits + 1
+    finally:
+        mandi_app.CACHE['commoditymarketlive'] = saved
+
+
+def old_transform(df, commodity):
+    """The per-request loop fetch_government_commodity_prices used before"""
+    out = []
+    for record in df.to_dict(orient='records'):
+        item = {'Commodity': record.get('commodity', 'N/A'), 'State': record.get('state', 'N/A'),
+                'District': record.get('district', 'N/A'), 'Market': record.get('market', 'N/A'),
+                'Min Price': str(record.get('min_price', '—')), 'Max Price': str(record.get('max_price', '—')),
+                'Modal Price': str(record.get('modal_price', '—')), 'Avg Price': str(record.get('arrival_price', '—')),
+                'Date': record.get('arrival_date', datetime.now().strftime('%Y-%m-%d')),
+                'Source': 'Government (data.gov.in)'}
+        if not commodity or commodity.lower() in item['Commodity'].lower():
+            out.append(item)
+    return out
+
+
+def test_commodity_index_matches_old_filter():
+    df = pd.DataFrame(sample_goi_records(3000))
+    index = mandi_app.build_govt_commodity_index(df)
+    for commodity in (None, '', 'Paddy', 'paddy', 'rice', 'a', 'Tomato', 'no such crop'):
+        assert mandi_app.commodity_rows(index, commodity) == old_transform(df, commodity)
+
+
+def test_govt_views_are_cached_per_commodity_and_table():
+    saved = mandi_app.CACHE['gov_api']
+    try:
+        mandi_app.CACHE['gov_api'] = {'data': pd.DataFrame(sample_goi_records(2000)), 'timestamp': datetime.now()}
+        paddy, cached, age = mandi_app.govt_price_view('Paddy')
+        assert paddy and not cached and age == 0
+        cotton, cached, _ = mandi_app.govt_price_view('Cotton')
+        assert not cached
+        again, cached, _ = mandi_app.govt_price_view('paddy ')
+        assert cached and again is paddy  # Alternating commodities no longer evict each other
+        assert mandi_app.govt_price_view('Cotton')[1]
+
+        # A new table gets a new index and fresh views
+        mandi_app.CACHE['gov_api'] = {'data': pd.DataFrame(sample_goi_records(500, seed=7)), 'timestamp': datetime.now()}
+        fresh, cached, _ = mandi_app.govt_price_view('Paddy')
+        assert not cached and fresh == old_transform(mandi_app.CACHE['gov_api']['data'], 'Paddy')
+    finally:
+        mandi_app.CACHE['gov_api'] = saved
+
+
+def test_commodity_index_swaps_whole():
+    tables = [pd.DataFrame(sample_goi_records(n, seed=n)) for n in (300, 700)]
+    first = mandi_app.get_govt_commodity_index(tables[0])
+    assert mandi_app.get_govt_commodity_index(tables[0]) is first
+
+    second = mandi_app.get_govt_commodity_index(tables[1])
+    assert second is not first and second['version'] == first['version'] + 1
+    assert first['table'] is tables[0] and len(first['records']) == 300  # Old readers keep a whole index
+
+    def read(i):
+        df = tables[i % 2]
+        index = mandi_app.get_govt_commodity_index(df)
+        rows = sum(len(p) for p in index['commodities'].values())
+        return len(index['records']) == rows == len(index['table'])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(read, range(200)))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test distances, market location resolution and the grid index against brute force
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import mandi_app
+from mandi_distance import distance_matrix, haversine_km
+from mandi_fixtures import sample_goi_records
+from mandi_geo import GridIndex, MarketGazetteer, market_base_name
+
+RNG = np.random.default_rng(7)
+LATS = RNG.uniform(8, 32, 3000)
+LONS = RNG.uniform(70, 88, 3000)
+GRID = GridIndex(LATS, LONS)
+
+
+def test_distance_matrix_matches_haversine():
+    # Hyderabad -> Karimnagar, straight line
+    assert abs(haversine_km(17.3850, 78.4867, 18.4386, 79.1288) - 135.4) < 0.1
+    assert isinstance(haversine_km(17.0, 78.0, 17.0, 78.0), float)
+
+    matrix = distance_matrix(LATS[:40], LONS[:40], LATS, LONS, block_rows=16)
+    expected = haversine_km(LATS[:40, None], LONS[:40, None], LATS[None, :], LONS[None, :])
+    assert matrix.shape == (40, len(LATS))
+    assert np.abs(matrix - expected).max() < 1e-3
+
+
+def test_radius_query_matches_brute_force():
+    for lat, lon, radius in [(18.44, 79.13, 100), (28.6, 77.2, 35), (12.0, 80.0, 400), (40.0, 60.0, 50)]:
+        ids, dists = GRID.within(lat, lon, radius)
+        all_dists = haversine_km(lat, lon, LATS, LONS)
+        assert set(ids) == set(np.flatnonzero(all_dists <= radius))
+        assert list(dists) == sorted(dists)
+
+
+def test_nearest_matches_brute_force():
+    for lat, lon, k in [(18.44, 79.13, 5), (9.0, 87.9, 12), (31.9, 70.1, 1)]:
+        ids, dists = GRID.nearest(lat, lon, k)
+        expected = np.argsort(haversine_km(lat, lon, LATS, LONS), kind='stable')[:k]
+        assert list(ids) == list(expected)
+    ids, _ = GRID.nearest(18.44, 79.13, 50, max_km=10)
+    assert len(ids) < 50
+
+
+def test_gazetteer_resolution_order():
+    gazetteer = MarketGazetteer([{'market': 'Pune', 'state': 'Maharashtra', 'latitude': 18.52, 'longitude': 73.85}])
+    assert gazetteer.locate('pune', state='Maharashtra') == (18.52, 73.85, 'market')
+    assert gazetteer.locate('Karimnagar APMC', state='Telangana')[2] == 'town'
+    assert gazetteer.locate('Unknown Yard', 'Karimnagar', 'Telangana')[2] == 'district'
+    assert gazetteer.locate('Hassan(5)', state='Punjab') is None
+    assert market_base_name('Nizamabad(1) APMC') == 'nizamabad'
+
+
+def test_best_market_ranking_matches_brute_force():
+    df = pd.DataFrame(sample_goi_records(4000))
+    lat, lon, radius, cost = 18.44, 79.13, 400.0, 0.8
+    ranked = mandi_app.rank_markets(df, lat, lon, 'Tomato', 10, radius, cost, limit=1000)
+
+    rows = df[df['commodity'] == 'Tomato']
+    expected = {}
+    for (state, district, market), group in rows.groupby(['state', 'district', 'market']):
+        found = mandi_app.GAZETTEER.locate(market, district, state)
+        if not found:
+            continue
+        road_km = haversine_km(lat, lon, found[0], found[1]) * mandi_app.ROAD_DISTANCE_FACTOR
+        if road_km <= radius:
+            expected[market] = round(pd.to_numeric(group['modal_price']).median() - road_km * cost, 2)
+
+    assert {r['Market']: r['Net_price_per_quintal'] for r in ranked} == expected
+    nets = [r['Net_price_per_quintal'] for r in ranked]
+    assert nets == sorted(nets, reverse=True)
+
+
+def test_nearby_index_swaps_whole():
+    tables = [pd.DataFrame(sample_goi_records(n, seed=n)) for n in (300, 900)]
+    first = mandi_app.get_nearby_index(tables[0])
+    assert mandi_app.get_nearby_index(tables[0]) is first
+
+    second = mandi_app.get_nearby_index(tables[1])
+    assert second is not first and mandi_app.NEARBY_INDEX is second
+    assert first['table'] is tables[0] and len(first['rows']) == len(first['markets']) == len(first['grid'].lats)
+
+
+def test_best_market_index_swaps_whole():
+    tables = [pd.DataFrame(sample_goi_records(n, seed=n)) for n in (400, 800)]
+    first = mandi_app.get_best_market_index(tables[0])
+    second = mandi_app.get_best_market_index(tables[1])
+    assert second is not first and mandi_app.BEST_MARKET_INDEX is second
+    for index, df in ((first, tables[0]), (second, tables[1])):
+        assert index['table'] is df and index['nearby']['table'] is df  # Market ids resolve against its own table
+        market_ids = [c['market_ids'] for sets in index['commodities'].values() for c in sets]
+        assert max(ids.max() for ids in market_ids) < len(index['nearby']['markets'])
+
+
+def test_mandi_endpoint_nearest_k():
+    client = TestClient(mandi_app.app)
+    saved = mandi_app.CACHE['gov_api']
+    try:
+        mandi_app.CACHE['gov_api'] = {'data': pd.DataFrame(sample_goi_records(2000)), 'timestamp': datetime.now()}
+        body = client.post('/mandi', json={'latitude': 18.44, 'longitude': 79.13, 'radius_km': 300, 'k': 3}).json()
+        assert 0 < body['markets'] <= 3
+        dists = [r['Distance_km'] for r in body['nearby_mandis']]
+        assert dists == sorted(dists) and max(dists) <= 300
+
+        everything = client.post('/mandi', json={'latitude': 18.44, 'longitude': 79.13, 'radius_km': 300}).json()
+        assert everything['markets'] >= body['markets']
+        for k in (0, -2):
+            assert client.post('/mandi', json={'latitude': 18.44, 'longitude': 79.13, 'k': k}).status_code == 422
+    finally:
+        mandi_app.CACHE['gov_api'] = saved
+
+
+def test_best_market_endpoint_validates_costs():
+    client = TestClient(mandi_app.app)
+    saved = mandi_app.CACHE['gov_api']
+    try:
+        mandi_app.CACHE['gov_api'] = {'data': pd.DataFrame(sample_goi_records(2000)), 'timestamp': datetime.now()}
+        params = {'latitude': 18.44, 'longitude': 79.13, 'commodity': 'Tomato', 'radius_km': 400}
+        body = client.get('/best-market', params={**params, 'quantity_quintals': 25, 'limit': 500}).json()
+        assert 0 < body['count'] <= 100
+        assert abs(body['data'][0]['Net_total'] - body['data'][0]['Net_price_per_quintal'] * 25) < 0.2
+        assert client.get('/best-market', params={**params, 'cost_per_quintal_km': 0}).status_code == 200
+
+        for bad in ({'quantity_quintals': 0}, {'quantity_quintals': -5}, {'cost_per_quintal_km': -0.5}):
+            assert client.get('/best-market', params={**params, **bad}).status_code == 422
+    finally:
+        mandi_app.CACHE['gov_api'] = saved
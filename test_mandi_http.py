@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test ETags, conditional GETs and precompressed bodies on the mandi service
+A fixture snapshot is installed directly, so no GOI API calls are made
+"""
+
+import datetime
+import gzip
+import json
+import types
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import mandi_app_service as service
+import mandi_http
+from mandi_fixtures import sample_goi_records
+from mandi_http import accepted_encodings, etag_matches, make_etag
+from mandi_ingest import compact_goi_frame, dataset_tag, record_hashes
+
+RAW = pd.DataFrame(sample_goi_records(2000))
+CLIENT = TestClient(service.app)
+
+
+def install_fixture(raw: pd.DataFrame = RAW, timestamp=None):
+    """Install raw as the snapshot, tagged by its content like a real refresh"""
+    df, _ = compact_goi_frame(raw)
+    indexes = service.build_cached_indexes(df, raw, record_hashes(raw))
+    service.install_snapshot(df, indexes, timestamp or datetime.datetime.now())
+
+
+@pytest.fixture(autouse=True)
+def snapshot():
+    install_fixture()
+
+
+def test_etag_helpers():
+    etag = make_etag(3, '/search', 'query=paddy')
+    assert etag.startswith('W/"v3-')
+    assert etag == make_etag(3, '/search', 'query=paddy') != make_etag(4, '/search', 'query=paddy')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag[2:]}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag)
+    assert accepted_encodings('gzip;q=0, deflate') == ['identity']
+
+
+def test_br_is_only_offered_with_brotli(monkeypatch):
+    monkeypatch.setattr(mandi_http, 'brotli', types.SimpleNamespace(compress=lambda body, quality: b'br'))
+    assert accepted_encodings('*') == ['br', 'gzip', 'identity']
+    assert accepted_encodings('gzip, deflate, br') == ['br', 'gzip', 'identity']
+
+    monkeypatch.setattr(mandi_http, 'brotli', None)
+    assert accepted_encodings('*') == ['gzip', 'identity']
+    assert accepted_encodings('br') == ['identity']
+    # A query too rare to cache is compressed for this client only: gzip, not an unavailable br
+    response = CLIENT.get('/search', params={'query': 'Paddy Tomato', 'limit': 50},
+                          headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['content-encoding'] == 'gzip' and response.json()['count'] == 50
+
+
+def test_if_none_match_returns_304():
+    first = CLIENT.get('/search', params={'query': 'Paddy', 'limit': 20})
+    assert first.status_code == 200
+    etag = first.headers['etag']
+
+    again = CLIENT.get('/search', params={'limit': 20, 'query': 'Paddy'}, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.content == b''
+    assert again.headers['etag'] == etag
+
+    other = CLIENT.get('/search', params={'query': 'Cotton', 'limit': 20}, headers={'If-None-Match': etag})
+    assert other.status_code == 200
+
+
+def test_dataset_version_follows_content():
+    hashes = record_hashes(RAW)
+    assert dataset_tag(hashes) == dataset_tag(record_hashes(RAW.copy()))
+    assert dataset_tag(hashes) != dataset_tag(record_hashes(RAW.iloc[::-1]))
+
+    first = CLIENT.get('/aggregates')
+    cursor = CLIENT.get('/scrape-all', params={'limit': 10}).json()['next_cursor']
+    assert first.headers['x-dataset-version'] == dataset_tag(hashes)
+
+    # The same data loaded again (e.g. a restart without a warm-start
+    # snapshot) keeps its ETags and cursors
+    install_fixture()
+    assert CLIENT.get('/aggregates', headers={'If-None-Match': first.headers['etag']}).status_code == 304
+    assert CLIENT.get('/scrape-all', params={'limit': 10, 'cursor': cursor}).json()['offset'] == 10
+
+    # Different data never matches them, whatever order it was loaded in
+    install_fixture(pd.DataFrame(sample_goi_records(2000, seed=5)))
+    response = CLIENT.get('/aggregates', headers={'If-None-Match': first.headers['etag']})
+    assert response.status_code == 200 and response.headers['etag'] != first.headers['etag']
+    assert CLIENT.get('/scrape-all', params={'limit': 10, 'cursor': cursor}).status_code == 410
+
+
+def test_cached_bodies_leave_out_snapshot_age():
+    params = {'query': 'Paddy', 'limit': 5}
+    bodies = [CLIENT.get('/scrape-all', params=params) for _ in range(service.POPULAR_MIN_HITS)]
+    assert set(bodies[0].json()['cache']) == {'records', 'dataset_version'}
+
+    # An unchanged refresh only moves the timestamp: the cached body stays
+    # valid and the age is reported in headers
+    service.CACHE_TIMESTAMP = datetime.datetime.now() - datetime.timedelta(seconds=service.CACHE_TTL_SECONDS + 5)
+    later = CLIENT.get('/scrape-all', params=params)
+    assert later.content == bodies[-1].content
+    assert int(later.headers['x-snapshot-age']) >= service.CACHE_TTL_SECONDS
+    assert later.headers['x-snapshot-stale'] == 'true'
+    assert CLIENT.get('/health').json()['cache']['stale']
+
+
+def test_unfiltered_body_is_precompressed_once():
+    service.precompress_responses()
+    version = service.CACHED_DATA.attrs['dataset_version']
+    variants = service.RESPONSE_CACHE.get((version, '/scrape-all', ''))
+    assert variants is not None and 'gzip' in variants
+
+    response = CLIENT.get('/scrape-all', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert json.loads(gzip.decompress(variants['gzip']))['total'] == len(RAW)
+    assert response.json()['total'] == len(RAW)
+
+    plain = CLIENT.get('/scrape-all', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    assert plain.content == variants['identity']
+
+
+def test_popular_queries_are_cached():
+    params = {'commodity': 'Cotton', 'fields': 'market,modal_price'}
+    bodies = [CLIENT.get('/prices', params=params).content for _ in range(service.POPULAR_MIN_HITS)]
+    assert len(set(bodies)) == 1
+    version = service.CACHED_DATA.attrs['dataset_version']
+    assert (version, '/prices', 'commodity=Cotton&fields=market%2Cmodal_price') in service.RESPONSE_CACHE
+
+
+def test_ndjson_honours_etag():
+    first = CLIENT.get('/scrape-all', params={'format': 'ndjson', 'limit': 5})
+    assert len(first.text.splitlines()) == 5
+    again = CLIENT.get('/scrape-all', params={'format': 'ndjson', 'limit': 5},
+                       headers={'If-None-Match': first.headers['etag']})
+    assert again.status_code == 304
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the exact-match group indexes, structured filtering, /prices and the
+price aggregates against plain pandas over the synthetic GOI fixture
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import mandi_app_service as service
+from mandi_fixtures import sample_goi_records
+from mandi_index import GroupIndex, PriceAggregates
+from mandi_ingest import SnapshotDelta, compact_goi_frame, record_hashes
+
+RAW = pd.DataFrame(sample_goi_records(800, arrival_date='10/01/2024')
+                   + sample_goi_records(800, seed=7, arrival_date='15/01/2024')
+                   + sample_goi_records(800, seed=9, arrival_date='20/01/2024'))
+CLIENT = TestClient(service.app)
+
+
+@pytest.fixture(autouse=True)
+def snapshot():
+    df, _ = compact_goi_frame(RAW)
+    indexes = service.build_cached_indexes(df, RAW, record_hashes(RAW))
+    service.install_snapshot(df, indexes, datetime.datetime.now(), 21)
+    return df
+
+
+def expected(mask):
+    return np.flatnonzero(mask.to_numpy())
+
+
+def test_group_index_exact_filters(snapshot):
+    index = GroupIndex(snapshot, service.GROUP_INDEX_FIELDS)
+    assert index.positions({}) is None
+    assert index.positions({'state': None, 'commodity': ''}) is None
+    assert index.positions({'commodity': '  '}) is None
+
+    cotton = index.positions({'commodity': ' COTTON '})
+    assert cotton.tolist() == expected(RAW['commodity'] == 'Cotton').tolist()
+
+    both = index.positions({'state': 'telangana', 'district': 'Karimnagar', 'commodity': 'Cotton'})
+    mask = RAW['state'].eq('Telangana') & RAW['district'].eq('Karimnagar') & RAW['commodity'].eq('Cotton')
+    assert len(both) and both.tolist() == expected(mask).tolist()
+    assert len(index.positions({'commodity': 'Cotton', 'market': 'no such market'})) == 0
+    assert index.values('state') == {k.lower(): v for k, v in RAW['state'].value_counts().items()}
+
+
+def test_structured_price_and_date_ranges(snapshot):
+    prices = RAW['modal_price'].astype(int)
+    positions = service.structured_positions(snapshot, {'commodity': 'Paddy(Dhan)(Common)'}, 2000, 2300)
+    mask = RAW['commodity'].eq('Paddy(Dhan)(Common)') & prices.between(2000, 2300)
+    assert len(positions) and positions.tolist() == expected(mask).tolist()
+
+    dates = pd.to_datetime(RAW['arrival_date'], format='%d/%m/%Y')
+    low, high = pd.Timestamp('2024-01-12'), pd.Timestamp('2024-01-15')
+    positions = service.structured_positions(snapshot, {}, date_from=low, date_to=high)
+    assert positions.tolist() == expected(dates.between(low, high)).tolist()
+    assert service.structured_positions(snapshot, {'state': None}) is None
+
+
+def test_prices_endpoint_filters(snapshot):
+    params = {'state': 'Telangana', 'commodity': 'cotton', 'min_price': 5000,
+              'date_from': '15/01/2024', 'date_to': '2024-01-20'}
+    body = CLIENT.get('/prices', params=params).json()
+    dates = pd.to_datetime(RAW['arrival_date'], format='%d/%m/%Y')
+    mask = (RAW['state'].eq('Telangana') & RAW['commodity'].eq('Cotton')
+            & RAW['modal_price'].astype(int).ge(5000) & dates.ge('2024-01-15'))
+    assert body['total'] == mask.sum() > 0
+    assert [row['market'] for row in body['data']] == RAW['market'][mask].tolist()
+    assert body['filters'] == {'state': 'Telangana', 'commodity': 'cotton', 'min_price': 5000.0,
+                               'date_from': '15/01/2024', 'date_to': '2024-01-20'}
+
+    assert CLIENT.get('/prices', params={'date_from': '2024/01/15'}).status_code == 400
+    assert CLIENT.get('/prices', params={'min_price': -1}).status_code == 422
+
+
+def test_prices_blank_filter_is_no_filter():
+    everything = CLIENT.get('/prices', params={'limit': 1}).json()
+    blank = CLIENT.get('/prices', params={'commodity': '', 'state': ' ', 'limit': 1}).json()
+    assert blank['total'] == everything['total'] == len(RAW)
+    assert blank['filters'] == {}
+
+
+def test_aggregates_merge_case_variants():
+    raw = RAW.copy()
+    raw.loc[::4, 'commodity'] = raw.loc[::4, 'commodity'].str.upper()
+    raw.loc[1::4, 'state'] = raw.loc[1::4, 'state'] + ' '
+    df, _ = compact_goi_frame(raw)
+    table = PriceAggregates(df)
+
+    prices = raw['modal_price'].astype(int)
+    commodity = raw['commodity'].str.lower()
+    expected_stats = prices.groupby(commodity).agg(['min', 'max', 'median', 'size'])
+    assert len(table.all('commodity')) == len(expected_stats)
+    for name, row in expected_stats.iterrows():
+        stats = table.get('commodity', name.upper())
+        assert (stats['min_price'], stats['max_price'], stats['median_price'], stats['records']) == \
+            (row['min'], row['max'], row['median'], row['size'])
+
+    cotton = (commodity == 'cotton') & raw['state'].str.strip().eq('Telangana')
+    assert table.get('state', 'cotton', 'TELANGANA')['records'] == cotton.sum()
+    states = table.for_commodity('state', 'Cotton')
+    assert len(states) == raw.loc[commodity == 'cotton', 'state'].str.strip().nunique()
+
+
+def test_aggregates_delta_matches_rebuild(snapshot):
+    new_raw = RAW.drop(index=range(0, 2400, 9)).reset_index(drop=True)
+    new_raw.loc[::50, 'modal_price'] = '9999'
+    new_raw.loc[5::50, 'commodity'] = 'COTTON'
+    new_raw = pd.concat([new_raw, pd.DataFrame(sample_goi_records(60, seed=3, arrival_date='21/01/2024'))],
+                        ignore_index=True)
+    delta = SnapshotDelta(record_hashes(RAW), record_hashes(new_raw))
+    assert delta.inserted and delta.updated and delta.deleted
+
+    df, indexes = service.apply_cached_delta(snapshot, service.CACHED_INDEXES, new_raw, delta)
+    rebuilt = PriceAggregates(df)
+    assert indexes['aggregates'].tables == rebuilt.tables
+    for level in ('state', 'district'):
+        assert indexes['aggregates'].for_commodity(level, 'cotton') == rebuilt.for_commodity(level, 'cotton')
+
+
+def test_aggregates_endpoint():
+    every = CLIENT.get('/aggregates').json()
+    assert every['count'] == RAW['commodity'].nunique()
+    cotton = CLIENT.get('/aggregates', params={'commodity': 'cotton'}).json()['data']
+    assert cotton[0]['records'] == (RAW['commodity'] == 'Cotton').sum()
+
+    by_state = CLIENT.get('/aggregates', params={'commodity': 'Cotton', 'by': 'state'}).json()
+    assert sum(row['records'] for row in by_state['data']) == cotton[0]['records']
+    district = CLIENT.get('/aggregates', params={'commodity': 'Cotton', 'district': 'karimnagar'}).json()
+    mask = RAW['commodity'].eq('Cotton') & RAW['district'].eq('Karimnagar')
+    assert district['data'][0]['records'] == mask.sum()
+
+    both = CLIENT.get('/aggregates', params={'commodity': 'Cotton', 'state': 'Telangana', 'district': 'Karimnagar'})
+    assert both.status_code == 400
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test the paginated GOI ingester against a local stub server
+The stub serves paged JSON the way data.gov.in does (offset/limit/total)
+Also checks snapshot deltas against a from-scratch rebuild, and the compact
+typed table against the raw one
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from mandi_fixtures import sample_goi_records
+from mandi_index import GroupIndex, KeywordIndex
+from mandi_ingest import (
+    IngestError, SnapshotDelta, compact_goi_frame, display_frame, fetch_all_records, merge_typed_frames,
+    record_hashes
+)
+
+RECORDS = sample_goi_records(2350)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves RECORDS in pages; failures[offset] = number of 500s to return first"""
+    failures = {}
+    report_total = True
+    requests_seen = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['10'])[0])
+        StubHandler.requests_seen.append(offset)
+
+        if StubHandler.failures.get(offset, 0) > 0:
+            StubHandler.failures[offset] -= 1
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        body = {'records': RECORDS[offset:offset + limit], 'count': len(RECORDS[offset:offset + limit])}
+        if StubHandler.report_total:
+            body['total'] = len(RECORDS)
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(failures=None, report_total=True):
+    StubHandler.failures = dict(failures or {})
+    StubHandler.report_total = report_total
+    StubHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/resource"
+
+
+def test_fetches_every_page_in_order():
+    server, url = start_stub()
+    try:
+        df, stats = fetch_all_records(url, 'test-key', page_size=500, max_workers=3)
+    finally:
+        server.shutdown()
+    assert len(df) == len(RECORDS)
+    assert df.to_dict(orient='records') == RECORDS
+    assert stats['pages'] == 5
+    assert stats['records_per_second'] > 0 and stats['pages_per_second'] > 0
+
+
+def test_without_total_stops_at_short_page():
+    server, url = start_stub(report_total=False)
+    try:
+        df, stats = fetch_all_records(url, 'test-key', page_size=400, max_workers=2)
+    finally:
+        server.shutdown()
+    assert df.to_dict(orient='records') == RECORDS
+    assert stats['total_reported'] is None
+
+
+def test_retries_transient_page_failures():
+    server, url = start_stub(failures={1000: 2})
+    try:
+        df, stats = fetch_all_records(url, 'test-key', page_size=500, retries=3)
+    finally:
+        server.shutdown()
+    assert len(df) == len(RECORDS)
+    assert stats['retries'] == 2
+
+
+def test_persistent_failure_raises():
+    server, url = start_stub(failures={500: 10})
+    try:
+        fetch_all_records(url, 'test-key', page_size=500, retries=1)
+        raise AssertionError('expected IngestError')
+    except IngestError:
+        pass
+    finally:
+        server.shutdown()
+
+
+def test_max_records_caps_fetch():
+    server, url = start_stub()
+    try:
+        df, stats = fetch_all_records(url, 'test-key', page_size=500, max_records=1200)
+    finally:
+        server.shutdown()
+    assert len(df) == 1200
+    assert max(StubHandler.requests_seen) < 1200
+
+
+def changed_snapshot(raw):
+    """raw with one price updated, one row deleted and one row inserted"""
+    new = raw.copy()
+    new.loc[3, 'modal_price'] = '12345'
+    new = new.drop(index=10)
+    extra = dict(RECORDS[0], market='New Mandi APMC', arrival_date='16/01/2024')
+    return pd.concat([new, pd.DataFrame([extra])], ignore_index=True)
+
+
+def test_snapshot_delta_counts():
+    raw = pd.DataFrame(RECORDS)
+    assert SnapshotDelta(record_hashes(raw), record_hashes(raw)).changed == 0
+
+    delta = SnapshotDelta(record_hashes(raw), record_hashes(changed_snapshot(raw)))
+    assert delta.summary() == {'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': len(RECORDS) - 2}
+    assert delta.remap[3] == -1 and delta.remap[10] == -1 and delta.remap[11] == 9
+
+
+def test_index_delta_matches_rebuild():
+    raw = pd.DataFrame(RECORDS)
+    df, _ = compact_goi_frame(raw)
+    new_raw = changed_snapshot(raw)
+    delta = SnapshotDelta(record_hashes(raw), record_hashes(new_raw))
+
+    added_raw = new_raw.iloc[delta.added]
+    new_df = merge_typed_frames(df, delta.kept, compact_goi_frame(added_raw)[0])
+    keyword = KeywordIndex(df, text_df=raw).apply_delta(new_df, delta.remap, added_raw)
+    groups = GroupIndex(df, ['market', 'commodity']).apply_delta(
+        new_df, delta.remap, new_df.iloc[delta.unchanged:])
+
+    expected_raw = pd.concat([raw.iloc[delta.kept], added_raw], ignore_index=True)
+    expected = KeywordIndex(new_df, text_df=expected_raw)
+    assert keyword.vocab == expected.vocab
+    assert (keyword.rows == expected.rows).all() and (keyword.offsets == expected.offsets).all()
+    assert str(new_df['market'].dtype) == 'category'
+    assert list(groups.lookup('market', 'new mandi apmc')) == [len(new_df) - 1]
+    assert len(groups.positions({'commodity': RECORDS[0]['commodity']})) == \
+        (expected_raw['commodity'] == RECORDS[0]['commodity']).sum()
+
+
+def test_compact_frame_types_and_report():
+    raw = pd.DataFrame(RECORDS)
+    df, report = compact_goi_frame(raw)
+    assert [str(df[c].dtype) for c in ('min_price', 'max_price', 'modal_price')] == ['int32'] * 3
+    assert pd.api.types.is_datetime64_any_dtype(df['arrival_date'])
+    assert all(str(df[c].dtype) == 'category' for c in ('state', 'district', 'market', 'commodity', 'variety', 'grade'))
+    assert report['bytes_before'] == int(raw.memory_usage(deep=True).sum())
+    assert report['bytes_after'] == int(df.memory_usage(deep=True).sum())
+    assert report['bytes_after'] < report['bytes_before'] and report['ratio'] > 2
+    assert display_frame(df).astype(str).equals(raw.astype(str))
+
+    # Fractional or missing prices keep their values as float64; bad dates become NaT
+    odd = raw.head(3).copy()
+    odd.loc[0, 'min_price'] = '2150.5'
+    odd.loc[1, 'max_price'] = ''
+    odd.loc[2, 'arrival_date'] = '2024-01-15'
+    typed, _ = compact_goi_frame(odd)
+    assert str(typed['min_price'].dtype) == 'float64' and typed['min_price'].iloc[0] == 2150.5
+    assert str(typed['max_price'].dtype) == 'float64' and pd.isna(typed['max_price'].iloc[1])
+    assert str(typed['modal_price'].dtype) == 'int32'
+    assert pd.isna(typed['arrival_date'].iloc[2])
+    assert display_frame(typed)['max_price'].iloc[1] is None
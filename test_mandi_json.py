@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test the columnar record encoder against the to_dict + json path
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from mandi_fixtures import sample_goi_records
+from mandi_ingest import compact_goi_frame, display_frame
+from mandi_json import EncodedRecords, encode_payload, records_json
+
+DF, _ = compact_goi_frame(pd.DataFrame(sample_goi_records(1500)))
+
+
+def reference(df):
+    return json.loads(json.dumps(display_frame(df).to_dict(orient='records')))
+
+
+def test_matches_to_dict_records():
+    encoded = records_json(DF)
+    assert encoded.count == len(DF)
+    assert json.loads(encoded.json) == reference(DF)
+
+    page = DF.iloc[[5, 1, 900]][['market', 'arrival_date', 'modal_price']]
+    assert records_json(page).to_list() == reference(page)
+    assert records_json(DF.iloc[:0]).json == b'[]'
+
+
+def test_missing_values_become_null():
+    df = DF.head(4).copy()
+    df['modal_price'] = df['modal_price'].astype('float64')
+    df.loc[df.index[1], 'modal_price'] = np.nan
+    df.loc[df.index[2], 'arrival_date'] = pd.NaT
+    df['market'] = df['market'].cat.add_categories(['Ünjha "New" APMC'])
+    df.loc[df.index[0], 'market'] = 'Ünjha "New" APMC'
+    df.loc[df.index[3], 'market'] = np.nan
+    df['note'] = ['a', None, 'c/d', 'é']
+
+    records = records_json(df).to_list()
+    assert records == reference(df)
+    assert records[1]['modal_price'] is None and records[2]['arrival_date'] is None
+    assert records[0]['market'] == 'Ünjha "New" APMC' and records[3]['market'] is None
+
+
+def test_pandas_na_becomes_null():
+    df = DF.head(3)[['market']].copy()
+    df['min_price'] = pd.array([1200, pd.NA, 1350], dtype='Int32')
+    df['graded'] = pd.array([True, pd.NA, False], dtype='boolean')
+    df['note'] = pd.array(['fresh', pd.NA, 'dry'], dtype='string')
+    df['extra'] = pd.Series(['x', pd.NA, None], dtype=object)
+
+    records = records_json(df).to_list()
+    assert [r['min_price'] for r in records] == [1200, None, 1350]
+    assert [r['graded'] for r in records] == [True, None, False]
+    assert [r['note'] for r in records] == ['fresh', None, 'dry']
+    assert [r['extra'] for r in records] == ['x', None, None]
+
+
+def test_payload_splices_encoded_records():
+    page = DF.head(3)
+    body = encode_payload({'data': records_json(page), 'count': 3, 'cache': {'version': np.int64(7)}})
+    decoded = json.loads(body)
+    assert decoded == {'data': reference(page), 'count': 3, 'cache': {'version': 7}}
+    assert json.loads(encode_payload({'data': EncodedRecords(b'[]', 0)})) == {'data': []}
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test limit/offset/cursor paging, fields= projection and NDJSON streaming
+on the mandi service
+A fixture snapshot is installed directly, so no GOI API calls are made
+"""
+
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import mandi_app_service as service
+from mandi_fixtures import sample_goi_records
+from mandi_ingest import compact_goi_frame, record_hashes
+
+RAW = pd.DataFrame(sample_goi_records(1500))
+CLIENT = TestClient(service.app)
+
+
+def install_fixture(raw: pd.DataFrame, version: int) -> pd.DataFrame:
+    df, _ = compact_goi_frame(raw)
+    indexes = service.build_cached_indexes(df, raw, record_hashes(raw))
+    service.install_snapshot(df, indexes, datetime.datetime.now(), version)
+    return df
+
+
+@pytest.fixture(autouse=True)
+def snapshot():
+    return install_fixture(RAW, 11)
+
+
+def markets(response):
+    return [row['market'] for row in response.json()['data']]
+
+
+def test_limit_and_offset(snapshot):
+    page = CLIENT.get('/scrape-all', params={'limit': 100, 'offset': 250}).json()
+    assert (page['count'], page['total'], page['offset'], page['next_offset']) == (100, 1500, 250, 350)
+    assert [row['market'] for row in page['data']] == snapshot['market'].iloc[250:350].tolist()
+
+    last = CLIENT.get('/scrape-all', params={'limit': 100, 'offset': 1450}).json()
+    assert last['count'] == 50 and last['next_offset'] is None and last['next_cursor'] is None
+    beyond = CLIENT.get('/scrape-all', params={'limit': 100, 'offset': 5000}).json()
+    assert beyond['count'] == 0 and beyond['data'] == []
+
+
+def test_cursor_walk_matches_offset_walk():
+    params = {'query': 'Paddy', 'limit': 70}
+    by_cursor, cursor = [], None
+    while True:
+        response = CLIENT.get('/scrape-all', params={**params, **({'cursor': cursor} if cursor else {})})
+        by_cursor += markets(response)
+        cursor = response.json()['next_cursor']
+        if cursor is None:
+            break
+
+    by_offset, offset = [], 0
+    while offset is not None:
+        page = CLIENT.get('/scrape-all', params={**params, 'offset': offset}).json()
+        by_offset += [row['market'] for row in page['data']]
+        offset = page['next_offset']
+
+    total = CLIENT.get('/scrape-all', params={'query': 'Paddy', 'limit': 1}).json()['total']
+    assert 70 < total < 1500
+    assert by_cursor == by_offset and len(by_cursor) == total
+
+
+def test_bad_and_expired_cursors():
+    first = CLIENT.get('/scrape-all', params={'limit': 10}).json()
+    cursor = first['next_cursor']
+    version = cursor.split(':', 1)[0]
+
+    assert CLIENT.get('/scrape-all', params={'limit': 10, 'cursor': f'{version}:-1'}).json()['offset'] == 0
+    for bad in ('nonsense', f'{version}:x', f'{version}:-10'):
+        assert CLIENT.get('/scrape-all', params={'limit': 10, 'cursor': bad}).status_code == 400
+
+    # A refreshed dataset invalidates every cursor handed out before it
+    install_fixture(RAW.iloc[::-1].reset_index(drop=True), 12)
+    assert CLIENT.get('/scrape-all', params={'limit': 10, 'cursor': cursor}).status_code == 410
+    assert CLIENT.get('/search', params={'query': 'Paddy', 'limit': 10, 'cursor': cursor}).status_code == 410
+
+
+def test_fields_projection(snapshot):
+    page = CLIENT.get('/scrape-all', params={'limit': 5, 'fields': 'market, modal_price'}).json()
+    assert [list(row) for row in page['data']] == [['market', 'modal_price']] * 5
+    assert [row['modal_price'] for row in page['data']] == snapshot['modal_price'].iloc[:5].tolist()
+
+    repeated = CLIENT.get('/scrape-all', params={'limit': 2, 'fields': 'market,modal_price, market'})
+    assert [list(row) for row in repeated.json()['data']] == [['market', 'modal_price']] * 2
+    streamed = CLIENT.get('/scrape-all', params={'format': 'ndjson', 'limit': 2, 'fields': 'market,market'})
+    assert [list(json.loads(line)) for line in streamed.text.splitlines()] == [['market']] * 2
+
+    unknown = CLIENT.get('/scrape-all', params={'limit': 5, 'fields': 'market,colour'})
+    assert unknown.status_code == 400 and 'colour' in unknown.json()['detail']
+
+
+def ndjson_rows(response):
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert response.text == '' or response.text.endswith('\n')
+    return [json.loads(line) for line in response.text.split('\n')[:-1]]
+
+
+def test_iter_ndjson_frames_every_chunk(snapshot):
+    chunks = list(service.iter_ndjson(snapshot, None, 3, 1003, ['market', 'arrival_date'], chunk_rows=400))
+    assert len(chunks) == 3 and all(chunk.endswith(b'\n') for chunk in chunks)
+    lines = b''.join(chunks).split(b'\n')[:-1]
+    assert len(lines) == 1000
+    first = json.loads(lines[0])
+    assert first == {'market': snapshot['market'].iloc[3], 'arrival_date': RAW['arrival_date'].iloc[3]}
+
+    positions = np.array([5, 8, 13])
+    rows = [json.loads(line) for line in b''.join(service.iter_ndjson(snapshot, positions, 1, 3)).splitlines()]
+    assert [r['market'] for r in rows] == snapshot['market'].iloc[[8, 13]].tolist()
+    assert list(service.iter_ndjson(snapshot, positions, 3, 3)) == []
+
+
+def test_ndjson_paging_and_empty_result(snapshot):
+    response = CLIENT.get('/scrape-all', params={'format': 'ndjson', 'limit': 25, 'offset': 10,
+                                                 'fields': 'market,modal_price'})
+    rows = ndjson_rows(response)
+    assert response.headers['x-total-count'] == '1500'
+    assert [r['market'] for r in rows] == snapshot['market'].iloc[10:35].tolist()
+    assert all(list(r) == ['market', 'modal_price'] for r in rows)
+
+    cursor = CLIENT.get('/scrape-all', params={'query': 'Cotton', 'limit': 40}).json()['next_cursor']
+    after = CLIENT.get('/scrape-all', params={'query': 'Cotton', 'limit': 40, 'offset': 40}).json()
+    streamed = ndjson_rows(CLIENT.get('/scrape-all', params={'format': 'ndjson', 'query': 'Cotton',
+                                                             'limit': 40, 'cursor': cursor}))
+    assert [r['market'] for r in streamed] == [r['market'] for r in after['data']]
+
+    # Same bytes per record as the JSON page (dates not escaped as 15\/01\/2024)
+    params = {'limit': 30, 'offset': 5, 'query': 'Paddy'}
+    streamed = CLIENT.get('/scrape-all', params={**params, 'format': 'ndjson'}).content
+    page = CLIENT.get('/scrape-all', params=params).content
+    assert b'\\/' not in streamed and streamed.count(b'\n') == 30
+    assert b'"data":[' + streamed.rstrip(b'\n').replace(b'\n', b',') + b']' in page
+
+    empty = CLIENT.get('/scrape-all', params={'format': 'ndjson', 'query': 'no-such-crop-anywhere'})
+    assert empty.status_code == 200 and ndjson_rows(empty) == []
+    assert empty.headers['x-total-count'] == '0'
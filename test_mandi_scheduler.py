@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test the refresh scheduler with fast fake refresh jobs
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+import mandi_app
+from mandi_fixtures import sample_goi_records
+from mandi_scheduler import RefreshScheduler
+
+
+class FakeRefresh:
+    """Records run times and the most runs ever in flight at once"""
+
+    def __init__(self, seconds=0.0, results=(True,)):
+        self.seconds = seconds
+        self.results = list(results)
+        self.started = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.started.append(time.monotonic())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            result = self.results[min(len(self.started), len(self.results)) - 1]
+        time.sleep(self.seconds)
+        with self._lock:
+            self.active -= 1
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_runs_on_interval_one_at_a_time():
+    scheduler = RefreshScheduler('test')
+    slow = FakeRefresh(seconds=0.15)
+    fast = FakeRefresh()
+    scheduler.add('slow', slow, interval=0.05, jitter=0)
+    scheduler.add('fast', fast, interval=0.1, jitter=0.2)
+    scheduler.start()
+    try:
+        time.sleep(0.05)
+        assert scheduler.is_running('slow')
+        assert not scheduler.trigger('slow')  # Already running
+        time.sleep(0.5)
+    finally:
+        scheduler.stop()
+
+    assert slow.max_active == 1 and 2 <= len(slow.started) <= 3
+    assert fast.max_active == 1 and 4 <= len(fast.started) <= 7
+    gaps = [b - a for a, b in zip(fast.started, fast.started[1:])]
+    assert all(0.07 < gap < 0.2 for gap in gaps)  # 0.1s +/- 20%
+
+    status = scheduler.status()['jobs']['fast']
+    assert status['last_status'] == 'ok' and status['last_reason'] == 'schedule'
+    assert status['last_duration_seconds'] is not None and status['next_run'] is not None
+
+
+def test_failures_back_off_exponentially():
+    scheduler = RefreshScheduler('test')
+    failing = FakeRefresh(results=[RuntimeError("503"), False, RuntimeError("503"), RuntimeError("503"), True])
+    scheduler.add('goi', failing, interval=10, jitter=0, retry_seconds=0.05, max_backoff=0.15)
+    scheduler.start()
+    try:
+        time.sleep(0.02)
+        assert scheduler.status()['jobs']['goi']['last_error'] == '503'
+        assert not scheduler.trigger('goi')  # Backing off
+        time.sleep(0.55)
+    finally:
+        scheduler.stop()
+
+    gaps = [b - a for a, b in zip(failing.started, failing.started[1:])]
+    assert len(failing.started) == 5
+    for gap, expected in zip(gaps, [0.05, 0.1, 0.15, 0.15]):
+        assert expected - 0.01 < gap < expected + 0.05
+    status = scheduler.status()['jobs']['goi']
+    assert (status['consecutive_failures'], status['errors'], status['runs']) == (0, 4, 5)
+    assert status['next_run_in_seconds'] > 9  # Back on the normal interval
+
+
+def test_trigger_and_wait_without_the_loop():
+    scheduler = RefreshScheduler('test')
+    job = FakeRefresh(seconds=0.1, results=[False, True])
+    scheduler.add('commodityonline', job, interval=60, retry_seconds=60)
+    assert scheduler.trigger('commodityonline')
+    assert not scheduler.wait('commodityonline', timeout=0.01)
+    assert scheduler.wait('commodityonline', timeout=1)
+    assert not scheduler.trigger('commodityonline')  # Failed, so backing off
+    assert scheduler.trigger('commodityonline', force=True)
+    scheduler.wait('commodityonline', timeout=1)
+    status = scheduler.status()
+    assert not status['active'] and status['jobs']['commodityonline']['last_status'] == 'ok'
+
+
+def test_on_demand_jobs_only_run_when_triggered():
+    scheduler = RefreshScheduler('test')
+    browser = FakeRefresh(results=[False, True])
+    scheduler.add('browser', browser, interval=None, retry_seconds=0.1)
+    scheduler.add('api', FakeRefresh(), interval=0.05, jitter=0)
+    scheduler.start()
+    try:
+        time.sleep(0.2)
+        assert browser.started == []
+        status = scheduler.status()['jobs']['browser']
+        assert status['on_demand'] and status['next_run'] is None and status['next_run_in_seconds'] is None
+
+        assert scheduler.trigger('browser') and scheduler.wait('browser', timeout=1)
+        assert not scheduler.trigger('browser')  # Failed, so backing off
+        time.sleep(0.25)
+        assert len(browser.started) == 1  # Never retried on its own
+        assert scheduler.trigger('browser') and scheduler.wait('browser', timeout=1)
+        time.sleep(0.1)
+    finally:
+        scheduler.stop()
+
+    status = scheduler.status()['jobs']['browser']
+    assert len(browser.started) == 2 and status['last_status'] == 'ok' and status['next_run'] is None
+    assert mandi_app.REFRESH_SCHEDULER.status()['jobs']['commoditymarketlive']['on_demand']
+
+
+def test_price_table_cold_start_goes_through_the_scheduler():
+    calls = []
+
+    def fake_fetch(url, api_key, **kwargs):
+        calls.append(url)
+        time.sleep(0.1)
+        return pd.DataFrame(sample_goi_records(100)), {}
+
+    saved = mandi_app.fetch_all_records, mandi_app.CACHE['gov_api']
+    try:
+        mandi_app.fetch_all_records = fake_fetch
+        mandi_app.CACHE['gov_api'] = {'data': None, 'timestamp': None}
+        threads = [threading.Thread(target=mandi_app.get_price_table) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1 and len(mandi_app.get_price_table()) == 100
+        job = mandi_app.REFRESH_SCHEDULER.status()['jobs']['gov_api']
+        assert job['last_reason'] == 'trigger' and job['last_status'] == 'ok'
+    finally:
+        mandi_app.fetch_all_records, mandi_app.CACHE['gov_api'] = saved
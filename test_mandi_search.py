@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test ranked, typo-tolerant search and typeahead over the synthetic GOI fixture
+"""
+
+import pandas as pd
+
+from mandi_fixtures import sample_goi_records
+from mandi_index import PrefixIndex
+from mandi_ingest import compact_goi_frame
+from mandi_search import RankedIndex
+
+RAW = pd.DataFrame(sample_goi_records(3000))
+DF, _ = compact_goi_frame(RAW)
+INDEX = RankedIndex(DF)
+
+
+def names(positions, field):
+    return set(RAW[field].iloc[positions])
+
+
+def test_typos_resolve_to_known_names():
+    positions, scores, total = INDEX.search('tamato', k=20)
+    assert total == (RAW['commodity'] == 'Tomato').sum()
+    assert names(positions, 'commodity') == {'Tomato'}
+
+    positions, _, _ = INDEX.search('Karimnager', k=5)
+    assert names(positions, 'district') == {'Karimnagar'}
+
+
+def test_split_words_are_joined():
+    positions, _, total = INDEX.search('ground nut', k=10)
+    assert total == (RAW['commodity'] == 'Groundnut').sum()
+    assert names(positions, 'commodity') == {'Groundnut'}
+
+
+def test_match_all_and_ranking():
+    positions, scores, total = INDEX.search('karimnagar paddy', k=10, match_all=True)
+    expected = RAW['district'].eq('Karimnagar') & RAW['commodity'].str.startswith('Paddy')
+    assert total == expected.sum()
+    assert list(scores) == sorted(scores, reverse=True)
+
+    _, _, any_total = INDEX.search('karimnagar paddy', k=10)
+    assert any_total > total
+
+
+def test_phrase_requires_adjacent_words():
+    _, _, total = INDEX.search('hybrid local', k=10, phrase=True)
+    assert total == (RAW['variety'] == 'Hybrid/Local').sum()
+    assert INDEX.search('local hybrid', k=10, phrase=True)[2] == 0
+
+
+def test_top_k_is_bounded_and_stable():
+    positions, _, total = INDEX.search('apmc', k=25)
+    assert len(positions) == 25 < total
+    again, _, _ = INDEX.search('apmc', k=25)
+    assert list(positions) == list(again)
+    assert INDEX.search('qqqq', k=5)[2] == 0
+
+
+def test_prefix_suggestions_by_frequency():
+    counts = RAW['market'].value_counts()
+    index = PrefixIndex({'market': counts.to_dict(), 'state': {'Karnataka': 0, 'Kerala': 3}})
+
+    apmc = index.suggest('APMC', limit=3)
+    expected = counts[counts.index.str.contains('APMC')].head(3)
+    assert [s['count'] for s in apmc] == list(expected)
+    assert all('APMC' in s['value'] for s in apmc)
+
+    states = index.suggest('ke', field='state')
+    assert [s['value'] for s in states] == ['Kerala']
+    assert index.suggest('k', limit=50, field='state')[-1] == {'value': 'Karnataka', 'field': 'state', 'count': 0}
+    assert index.suggest('   ') == []
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test the concurrent source fan-out with fake, sleeping scrapers
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import mandi_app
+from mandi_scheduler import RefreshScheduler
+from mandi_sources import fan_out
+
+
+def slow(seconds, rows):
+    def fetch():
+        time.sleep(seconds)
+        return rows
+    return fetch
+
+
+def failing():
+    raise RuntimeError("403 Forbidden")
+
+
+def test_sources_run_concurrently():
+    started = time.perf_counter()
+    data, status = fan_out([
+        ('a', slow(0.3, [{'Market': 'A'}]), 2.0),
+        ('b', slow(0.3, [{'Market': 'B'}, {'Market': 'C'}]), 2.0),
+        ('c', slow(0.3, []), 2.0),
+    ], deadline_seconds=5.0)
+    assert time.perf_counter() - started < 0.6
+    assert [len(data[n]) for n in 'abc'] == [1, 2, 0]
+    assert [status[n]['status'] for n in 'abc'] == ['ok', 'ok', 'empty']
+    assert all(250 <= status[n]['elapsed_ms'] < 600 for n in 'abc')
+
+
+def test_timeouts_and_deadline_return_partial_results():
+    started = time.perf_counter()
+    data, status = fan_out([
+        ('fast', slow(0.05, [{'Market': 'A'}]), 2.0),
+        ('own_timeout', slow(2.0, [{'Market': 'B'}]), 0.2),
+        ('past_deadline', slow(2.0, [{'Market': 'C'}]), 5.0),
+        ('broken', failing, 2.0),
+    ], deadline_seconds=0.5)
+    assert time.perf_counter() - started < 0.8
+    assert list(data) == ['fast']
+    assert status['own_timeout']['status'] == 'timeout' and status['own_timeout']['elapsed_ms'] < 400
+    assert status['past_deadline']['status'] == 'timeout'
+    assert status['broken'] == {'status': 'error', 'records': 0, 'elapsed_ms': status['broken']['elapsed_ms'],
+                                'timeout_seconds': 2.0, 'error': '403 Forbidden'}
+
+
+def test_fallback_starts_when_primary_is_empty():
+    fallbacks = {'requests': ('browser', slow(0.05, [{'Market': 'B'}]), 1.0)}
+    data, status = fan_out([('requests', failing, 1.0)], 2.0, fallbacks)
+    assert data == {'browser': [{'Market': 'B'}]}
+    assert status['browser']['fallback_for'] == 'requests' and status['browser']['status'] == 'ok'
+
+    data, status = fan_out([('requests', slow(0, [{'Market': 'A'}]), 1.0)], 2.0, fallbacks)
+    assert 'browser' not in status
+
+
+@pytest.fixture
+def empty_caches(monkeypatch):
+    for source in ('commoditymarketlive', 'commodity'):
+        monkeypatch.setitem(mandi_app.CACHE, source, {'data': None, 'timestamp': None})
+    # Fresh job state (no backoff left over from other tests), loop not started
+    monkeypatch.setattr(mandi_app, 'REFRESH_SCHEDULER', mandi_app.add_refresh_jobs(RefreshScheduler('test')))
+
+
+def test_combined_list_uses_the_cached_scrapers(monkeypatch, empty_caches):
+    calls = []
+
+    def live():
+        calls.append('commoditymarketlive')
+        time.sleep(0.2)
+        return [{'Commodity': 'Paddy', 'Market': 'Karimnagar', 'Price': '2200'}]
+
+    monkeypatch.setattr(mandi_app, 'scrape_commoditymarketlive_all', live)
+    monkeypatch.setattr(mandi_app, 'scrape_commodityonline_requests', lambda timeout=15: [])
+
+    started = time.perf_counter()
+    result = mandi_app.get_combined_mandi_list(deadline_seconds=5)
+    assert time.perf_counter() - started < 1
+    assert result['count'] == 1 and result['complete']
+    assert result['sources']['commoditymarketlive']['status'] == 'ok'
+    assert result['sources']['commodityonline']['status'] == 'empty'
+
+    again = mandi_app.get_combined_mandi_list(deadline_seconds=5)  # Served from CACHE
+    assert again['data'] == result['data'] and calls == ['commoditymarketlive']
+
+
+def test_combined_chrome_fallback_fills_the_commodity_cache(monkeypatch, empty_caches):
+    calls = []
+    rows = [{'State': 'Telangana', 'District': 'Karimnagar', 'Market': 'Karimnagar', 'Commodity': 'Paddy'}]
+
+    def blocked(timeout=15):
+        calls.append('requests')
+        return []
+
+    def chrome(url):
+        calls.append('chrome')
+        return rows
+
+    monkeypatch.setattr(mandi_app, 'scrape_commoditymarketlive_all', lambda: [])
+    monkeypatch.setattr(mandi_app, 'scrape_commodityonline_requests', blocked)
+    monkeypatch.setattr(mandi_app, 'scrape_with_undetected_chrome', chrome)
+
+    result = mandi_app.get_combined_mandi_list(use_selenium=True, deadline_seconds=5)
+    assert result['sources']['commodityonline_chrome']['status'] == 'ok' and result['data'] == rows
+    assert mandi_app.CACHE['commodity']['data'] == rows
+
+    again = mandi_app.get_combined_mandi_list(use_selenium=True, deadline_seconds=5)
+    assert again['sources']['commodityonline']['status'] == 'ok' and 'commodityonline_chrome' not in again['sources']
+    assert calls == ['requests', 'chrome']
+
+
+def test_combined_list_goes_through_the_scheduler(monkeypatch, empty_caches):
+    calls = []
+
+    def live():
+        calls.append('commoditymarketlive')
+        return []
+
+    monkeypatch.setattr(mandi_app, 'scrape_commoditymarketlive_all', live)
+    monkeypatch.setattr(mandi_app, 'scrape_commodityonline_requests', lambda timeout=15: [{'Market': 'A'}])
+
+    result = mandi_app.get_combined_mandi_list(deadline_seconds=5)
+    assert result['sources']['commoditymarketlive']['status'] == 'empty' and result['count'] == 1
+    jobs = mandi_app.REFRESH_SCHEDULER.status()['jobs']
+    assert jobs['commoditymarketlive']['last_reason'] == 'trigger' and jobs['commoditymarketlive']['on_demand']
+    assert jobs['commodityonline']['last_status'] == 'ok'
+
+    # The failed browser scrape is backing off: no new scrape, cached rows only
+    again = mandi_app.get_combined_mandi_list(deadline_seconds=5)
+    assert again['count'] == 1 and calls == ['commoditymarketlive']
+    assert mandi_app.REFRESH_SCHEDULER.status()['jobs']['commoditymarketlive']['runs'] == 1
+
+
+def test_scrape_endpoints_go_through_the_scheduler(monkeypatch, empty_caches):
+    calls = []
+
+    def blocked(timeout=15):
+        calls.append('commodityonline')
+        return []
+
+    def live():
+        calls.append('commoditymarketlive')
+        return [{'Commodity': 'Paddy', 'Market': 'Karimnagar', 'Price': '2200'}]
+
+    monkeypatch.setattr(mandi_app, 'scrape_commoditymarketlive_all', live)
+    monkeypatch.setattr(mandi_app, 'scrape_commodityonline_requests', blocked)
+    client = TestClient(mandi_app.app)  # No startup: the scheduler loop stays off
+
+    for _ in range(2):
+        body = client.get('/scrape-agmarknet', params={'commodity': 'paddy'}).json()
+        assert body['data'] == mandi_app.CACHE['commoditymarketlive']['data']
+        # The failed scrape backs off: the second request gets sample data without scraping
+        assert client.get('/scrape-commodity').json()['data'] == mandi_app.SAMPLE_COMMODITY_DATA
+    assert calls == ['commoditymarketlive', 'commodityonline']
+
+    jobs = mandi_app.REFRESH_SCHEDULER.status()['jobs']
+    assert (jobs['commoditymarketlive']['runs'], jobs['commoditymarketlive']['last_status']) == (1, 'ok')
+    assert (jobs['commodityonline']['runs'], jobs['commodityonline']['consecutive_failures']) == (1, 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite price history store, /history and the warm-start snapshot
+"""
+
+import datetime
+import pickle
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import mandi_app_service as service
+from mandi_fixtures import sample_goi_records
+from mandi_ingest import compact_goi_frame
+from mandi_store import HistoryStore, load_snapshot, save_snapshot
+
+CLIENT = TestClient(service.app)
+
+
+def typed_records(n, seed, arrival_date):
+    df, _ = compact_goi_frame(pd.DataFrame(sample_goi_records(n, seed=seed, arrival_date=arrival_date)))
+    return df
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    monkeypatch.setattr(service, 'HISTORY_STORE', store)
+    return store
+
+
+def test_same_natural_key_is_stored_once(store):
+    day = typed_records(400, 1, '10/01/2024').drop_duplicates(['market', 'commodity', 'variety', 'grade'])
+    assert store.append(day) == len(day)
+    assert store.append(day) == len(day)
+    assert store.stats() == {'rows': len(day), 'first_date': '2024-01-10', 'last_date': '2024-01-10'}
+
+    # A corrected price for the same key replaces the stored one
+    revised = day.iloc[:1].copy()
+    revised['modal_price'] = 12345
+    store.append(revised)
+    row = revised.iloc[0]
+    rows = store.history(row['commodity'], row['market'])
+    assert store.stats()['rows'] == len(day)
+    assert [r['modal_price'] for r in rows if r['variety'] == row['variety'] and r['grade'] == row['grade']] == [12345]
+
+
+def test_lookups_ignore_case(store):
+    store.append(typed_records(400, 1, '10/01/2024'))
+    exact = store.history('Cotton')
+    assert exact and all(r['commodity'] == 'Cotton' for r in exact)
+    assert store.history(' COTTON ') == exact
+    market = exact[0]['market']
+    assert store.history('cotton', market.upper()) == store.history('Cotton', market)
+    assert store.trend('cOtToN') == store.trend('Cotton')
+
+
+def test_history_endpoint_date_range(store):
+    for seed, day in ((1, '10/01/2024'), (2, '15/01/2024'), (3, '20/01/2024')):
+        store.append(typed_records(300, seed, day))
+
+    body = CLIENT.get('/history', params={'commodity': 'Tomato', 'from': '2024-01-12', 'to': '20/01/2024'}).json()
+    assert {r['arrival_date'] for r in body['data']} == {'2024-01-15', '2024-01-20'}
+    assert [t['arrival_date'] for t in body['trend']] == ['2024-01-15', '2024-01-20']
+    assert body['count'] == len(store.history('Tomato', date_from='2024-01-15'))
+
+    upto = CLIENT.get('/history', params={'commodity': 'tomato', 'to': '2024-01-10'}).json()
+    assert {r['arrival_date'] for r in upto['data']} == {'2024-01-10'}
+    assert CLIENT.get('/history', params={'commodity': 'Tomato', 'from': 'last week'}).status_code == 400
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch, store):
+    raw = pd.DataFrame(sample_goi_records(600))
+    path = str(tmp_path / 'snapshot.pkl')
+    monkeypatch.setattr(service, 'SNAPSHOT_PATH', path)
+    monkeypatch.setattr(service, 'fetch_all_records', lambda *args, **kwargs: (raw.copy(), {}))
+    return path
+
+
+def install_other():
+    raw = pd.DataFrame(sample_goi_records(50, seed=3))
+    df, _ = compact_goi_frame(raw)
+    service.install_snapshot(df, {}, datetime.datetime.now(), 0)
+
+
+def test_snapshot_round_trip(snapshot_path):
+    assert service.refresh_cache()
+    saved_df, version = service.CACHED_DATA, service.CACHED_DATA.attrs['dataset_version']
+    payload = load_snapshot(snapshot_path)
+    assert payload['format'] == service.SNAPSHOT_FORMAT
+    assert payload['indexes']['groups'].df is payload['data']  # Shared references survive
+
+    install_other()
+    assert service.warm_start()
+    assert service.CACHED_DATA.equals(saved_df) and service.CACHED_DATA.dtypes.equals(saved_df.dtypes)
+    assert service.CACHED_DATA.attrs['dataset_version'] == version
+    assert service.CACHED_INDEXES['groups'].df is service.CACHED_DATA
+    assert len(CLIENT.get('/prices', params={'commodity': 'Cotton'}).json()['data']) == \
+        (saved_df['commodity'] == 'Cotton').sum()
+
+
+def test_incompatible_or_corrupt_snapshot_is_ignored(snapshot_path):
+    assert not service.warm_start()  # Missing
+
+    install_other()
+    current = service.CACHED_DATA
+    save_snapshot(snapshot_path, {'format': service.SNAPSHOT_FORMAT - 1, 'data': None, 'indexes': {},
+                                  'timestamp': datetime.datetime.now(), 'version': 1})
+    assert not service.warm_start()
+    save_snapshot(snapshot_path, {'format': service.SNAPSHOT_FORMAT})
+    assert not service.warm_start()
+    save_snapshot(snapshot_path, {'format': service.SNAPSHOT_FORMAT, 'data': 'not a frame', 'indexes': {},
+                                  'timestamp': datetime.datetime.now()})
+    assert not service.warm_start()
+    save_snapshot(snapshot_path, ['not', 'a', 'payload'])
+    assert not service.warm_start()
+
+    with open(snapshot_path, 'wb') as f:
+        f.write(b'\x80\x05not a pickle')
+    assert load_snapshot(snapshot_path) is None
+    assert not service.warm_start()
+    with open(snapshot_path, 'wb') as f:
+        f.write(pickle.dumps({'format': service.SNAPSHOT_FORMAT})[:-4])  # Truncated
+    assert not service.warm_start()
+    assert service.CACHED_DATA is current
+
+
+def test_unchanged_refresh_resaves_snapshot(snapshot_path):
+    assert service.refresh_cache()
+    first = load_snapshot(snapshot_path)
+    assert service.refresh_cache()
+    assert service.REFRESH_STATE['last_ingest']['delta']['unchanged'] == 600
+    again = load_snapshot(snapshot_path)
+    assert again['timestamp'] > first['timestamp'] and again['timestamp'] == service.CACHE_TIMESTAMP
+    assert again['data'].attrs['dataset_version'] == first['data'].attrs['dataset_version']
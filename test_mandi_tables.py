@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the shared table extractor on the saved-HTML fixture corpus
+Well-formed pages must give exactly what the old BeautifulSoup loops gave
+"""
+
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import mandi_tables
+from mandi_fixtures import HTML_FIXTURE_DIR, load_html_fixture
+from mandi_tables import COMMODITYMARKETLIVE_SCHEMA, COMMODITYONLINE_SCHEMA, lxml, parse_tables
+
+PARSERS = ['html.parser'] + (['lxml'] if lxml is not None else [])
+
+
+def bs4_commoditymarketlive(html):
+    """The loop scrape_commoditymarketlive_all used before"""
+    rows = []
+    for table in BeautifulSoup(html, 'html.parser').find_all('table'):
+        for row in table.find_all('tr')[1:]:
+            cols = [c.get_text(strip=True) for c in row.find_all('td')]
+            if len(cols) >= 4 and cols[0] and cols[1] and cols[2]:
+                rows.append({'Commodity': cols[0], 'Market': cols[1], 'Price': cols[2], 'Trend': cols[3],
+                             'Source': 'CommodityMarketLive'})
+    return rows
+
+
+def bs4_commodityonline(html, source='CommodityOnline'):
+    """The loop scrape_commodityonline_requests used before"""
+    table = BeautifulSoup(html, 'html.parser').find('table')
+    rows = []
+    for row in table.find_all('tr')[1:] if table else []:
+        cols = [c.get_text(strip=True) for c in row.find_all('td')]
+        if len(cols) >= 7:
+            rows.append({'State': cols[0], 'District': cols[1], 'Market': cols[2], 'Commodity': cols[3],
+                         'Min Price': cols[4], 'Max Price': cols[5], 'Avg Price': cols[6], 'Source': source})
+    return rows
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_matches_beautifulsoup_on_saved_pages(parser):
+    cml = load_html_fixture('commoditymarketlive_mandi_commodities.html')
+    records = COMMODITYMARKETLIVE_SCHEMA.extract(cml, parser=parser)
+    assert len(records) == 10 and records == bs4_commoditymarketlive(cml)
+
+    online = load_html_fixture('commodityonline_mandi.html')
+    records = COMMODITYONLINE_SCHEMA.extract(online, parser=parser)
+    assert len(records) == 7 and records == bs4_commodityonline(online)
+
+    url = 'https://www.commodityonline.com/mandi'
+    assert COMMODITYONLINE_SCHEMA.extract(online, parser=parser, Source=url) == bs4_commodityonline(online, url)
+
+    blocked = load_html_fixture('commodityonline_blocked.html')
+    assert COMMODITYONLINE_SCHEMA.extract(blocked, parser=parser) == [] == bs4_commodityonline(blocked)
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_messy_markup_reads_like_a_browser(parser):
+    # Omitted </td> and </tr>, entities, comments, a script holding "<tr>"
+    records = COMMODITYMARKETLIVE_SCHEMA.extract(load_html_fixture('commoditymarketlive_messy.html'), parser=parser)
+    assert [(r['Commodity'], r['Market'], r['Price'], r['Trend']) for r in records] == [
+        ('Paddy & Rice', 'Karimnagar(APMC)', '₹ 2,150', '▲ 0.5%'),
+        ('Chilli (Red)', 'Guntur', '₹ 18,200', ''),
+        ('Bajra', 'Jaipur', '₹ 2,350', '▲\xa00.2%'),
+    ]
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_parse_tables_cells(parser):
+    html = """<table><tr><th>A</th><th>B</th></tr>
+              <tr><td> x <b>y</b> </td><td><table><tr><td>inner</td></tr></table></td></tr></table>
+              <table><tr><td>second</td></tr>"""
+    assert parse_tables(html, parser=parser) == [[[], ['xy', 'inner']], [['second']]]
+    assert parse_tables(html, cell_tags=('th', 'td'), parser=parser)[0][0] == ['A', 'B']
+    assert parse_tables('', parser=parser) == []
+
+
+def test_backends_give_identical_records():
+    pytest.importorskip('lxml.html')
+    for name in sorted(os.listdir(HTML_FIXTURE_DIR)):
+        schema = COMMODITYMARKETLIVE_SCHEMA if name.startswith('commoditymarketlive') else COMMODITYONLINE_SCHEMA
+        html = load_html_fixture(name)
+        assert parse_tables(html, ('th', 'td'), 'lxml') == parse_tables(html, ('th', 'td'), 'html.parser')
+        assert schema.extract(html, parser='lxml') == schema.extract(html, parser='html.parser'), name
+
+
+def test_default_parser_prefers_lxml(monkeypatch):
+    html = load_html_fixture('commoditymarketlive_mandi_commodities.html')
+    expected = parse_tables(html, parser='html.parser')
+    used = []
+
+    def fake_lxml(*args):
+        used.append(args)
+        return expected
+    monkeypatch.setattr(mandi_tables, 'lxml', object())
+    monkeypatch.setattr(mandi_tables, '_parse_tables_lxml', fake_lxml)
+    assert COMMODITYMARKETLIVE_SCHEMA.extract(html) == COMMODITYMARKETLIVE_SCHEMA.records(expected)
+    assert len(used) == 1
+
+    # Without lxml the stdlib tokenizer takes over; asking for lxml explicitly fails
+    monkeypatch.setattr(mandi_tables, 'lxml', None)
+    assert parse_tables(html) == expected and len(used) == 1
+    with pytest.raises(ImportError):
+        parse_tables(html, parser='lxml')